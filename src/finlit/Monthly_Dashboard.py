@@ -11,8 +11,8 @@ import streamlit as st
 from sqlalchemy import create_engine
 
 from finlit.constants import TZ
+from finlit.data import session_ledger
 from finlit.data.datasets import AllExpensesDataset, AllIncomeDataset
-from finlit.data.ledger import Ledger
 from finlit.data.transformations import (
     all_expenses_period,
     all_income_period,
@@ -45,7 +45,7 @@ logger = getLogger()
 
 logger.info("Starting the application.")
 logger.debug("Verbose mode is activated.")
-ledger = Ledger(args.ledger)
+ledger = session_ledger(args.ledger, profile=args.profile_load)
 
 
 IDEAL_EXPENSE_RATIO = 0.25
@@ -3,5 +3,7 @@ Data things
 """
 
 from finlit.data.ledger import Ledger
+from finlit.data.loader import LoaderConfig
+from finlit.data.registry import REGISTRY, LedgerRegistry, session_ledger
 
-__all__ = ["Ledger"]
+__all__ = ["Ledger", "LedgerRegistry", "LoaderConfig", "REGISTRY", "session_ledger"]
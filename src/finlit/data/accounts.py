@@ -0,0 +1,121 @@
+"""
+Index of the accounts of a ledger, interned to integer ids.
+
+Accounts are sorted by their components, so an account and all of its
+descendants always get a contiguous range of ids. Filtering postings by an
+account subtree is then a range check over the `account_id` column of the
+postings table, instead of parsing every account string.
+"""
+
+import bisect
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from beancount.core import account, account_types, getters
+
+
+class AccountIndex:
+    """
+    Interned accounts with their type, ancestors and leaf precomputed.
+
+    Every ancestor of a known account is indexed too, even if it was never
+    opened, so that `Assets` or `Assets:Inversiones` can be looked up.
+    """
+
+    def __init__(self, accounts: Iterable[str]) -> None:
+        """
+        Index the given accounts and their ancestors.
+        """
+        names: set[str] = set()
+        for name in accounts:
+            names.update(account.parents(name))
+
+        self._keys = sorted(tuple(account.split(name)) for name in names)
+        self.names: list[str] = [account.join(*key) for key in self._keys]
+        self.ids: dict[str, int] = {name: i for i, name in enumerate(self.names)}
+
+        self.types: list[str] = [
+            account_types.get_account_type(name) for name in self.names
+        ]
+        self.leaves: list[str] = [key[-1] for key in self._keys]
+        self.parents: list[int | None] = [
+            self.ids.get(account.parent(name)) for name in self.names  # type: ignore[]
+        ]
+        self.ancestors: list[tuple[int, ...]] = []
+        for account_id, parent in enumerate(self.parents):
+            above = self.ancestors[parent] if parent is not None else ()
+            self.ancestors.append((*above, account_id))
+
+    def __len__(self) -> int:
+        """
+        Return the number of indexed accounts.
+        """
+        return len(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        """
+        Return whether the account is indexed.
+        """
+        return name in self.ids
+
+    def id(self, name: str) -> int:
+        """
+        Return the id of the account. Raise KeyError if it's unknown.
+        """
+        return self.ids[name]
+
+    def subtree(self, prefix: str) -> range:
+        """
+        Return the ids of the account `prefix` and all of its descendants.
+
+        The prefix is matched component by component, so `Assets:Inv` doesn't
+        match `Assets:Inversiones`. The range is empty for unknown prefixes.
+        """
+        key = tuple(account.split(prefix))
+        start = bisect.bisect_left(self._keys, key)
+        # Descendants sort right after their ancestor and share its components.
+        stop = bisect.bisect_left(self._keys, (*key[:-1], key[-1] + "\0"), lo=start)
+        return range(start, stop)
+
+    def of_type(self, account_type: str) -> range:
+        """
+        Return the ids of the accounts of the given type, e.g. `Assets`.
+        """
+        return self.subtree(account_type)
+
+    def root(self, account_id: int, n: int) -> str:
+        """
+        Return the first `n` components of the account, like BQL's `ROOT`.
+        """
+        ancestors = self.ancestors[account_id]
+        return self.names[ancestors[min(n, len(ancestors)) - 1]]
+
+    def mask(
+        self, account_ids: pa.Array | pa.ChunkedArray, *prefixes: str
+    ) -> pa.Array | pa.ChunkedArray:
+        """
+        Return whether each account id falls under any of the prefixes.
+
+        `account_ids` is usually the `account_id` column of the postings table.
+        """
+        # Ids are never negative, so this starts with every value false.
+        mask = pc.less(account_ids, 0)
+        for prefix in prefixes:
+            ids = self.subtree(prefix)
+            mask = pc.or_(
+                mask,
+                pc.and_(
+                    pc.greater_equal(account_ids, ids.start),
+                    pc.less(account_ids, ids.stop),
+                ),
+            )
+        return mask
+
+
+def build_account_index(entries: Sequence[Any]) -> AccountIndex:
+    """
+    Build the index of every account referenced by the entries.
+    """
+    return AccountIndex(getters.get_accounts(entries))
@@ -0,0 +1,451 @@
+"""
+On-disk cache of loaded ledgers.
+
+Each top-level ledger gets one pickle file holding the loaded entries, errors and
+options, together with the stamps of every included file and the files matched
+by every include directive. The cache is only used when all of those files are
+unchanged and the include globs still match the same files.
+
+The raw parser output of every included file is cached as well, so that a
+ledger where only some files changed only needs to parse those again.
+
+Checkpoints, the opening balances of a ledger at a cut-off date, are kept next
+to them, and so are the price indexes, which only depend on the price
+directives of a ledger, and the net worth histories, stored as Parquet files
+with the day digests they were valued from.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from collections.abc import Iterable
+from logging import getLogger
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import beancount
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from finlit.data.fingerprint import (
+    FileStamp,
+    IncludeGlob,
+    includes_current,
+    stamp_file,
+    stamps_current,
+)
+
+logger = getLogger()
+
+# Bump this whenever the layout of the cached payload changes.
+CACHE_VERSION = 3
+
+
+class CachedLedger(NamedTuple):
+    """
+    The payload stored for a ledger.
+    """
+
+    stamps: list[FileStamp]
+    entries: list[Any]
+    errors: list[Any]
+    options: dict[str, Any]
+    includes: list[IncludeGlob]
+
+
+class ParsedFile(NamedTuple):
+    """
+    The parser output of a single file, before booking and plugins.
+    """
+
+    stamp: FileStamp
+    entries: list[Any]
+    errors: list[Any]
+    options: dict[str, Any]
+
+
+class Checkpoint(NamedTuple):
+    """
+    Entries that stand for everything a ledger holds before a cut-off date.
+
+    `digest` identifies the entries the snapshot was computed from, and
+    `file_digests` maps each file to its content digest and the digest of its
+    entries before the cut-off, so unchanged files needn't be hashed again.
+    """
+
+    cutoff: datetime.date
+    digest: str
+    file_digests: dict[str, tuple[str, str]]
+    entries: list[Any]
+
+
+class CachedPrices(NamedTuple):
+    """
+    The price index of a ledger, with the digest of the prices it was built from.
+    """
+
+    digest: str
+    index: Any
+
+
+class CachedHistory(NamedTuple):
+    """
+    A valued net worth history, with the digests of the days it depends on.
+
+    `digests` are the `NetworthEngine.day_digests` of the ledger the history
+    was valued from, `history` has a row per subset and day, and `fingerprint`
+    is the `Ledger.fingerprint` of that ledger.
+    """
+
+    digests: pd.Series
+    history: pd.DataFrame
+    fingerprint: str = ""
+
+
+def default_cache_dir() -> Path:
+    """
+    Return the directory where finlit keeps its caches.
+    """
+    xdg_cache = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg_cache) if xdg_cache else Path.home() / ".cache"
+    return base / "finlit"
+
+
+def _cache_header() -> tuple[int, str, str]:
+    """
+    Return the versions a cache file must have been written with to be valid.
+    """
+    python_version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    return (CACHE_VERSION, beancount.__version__, python_version)
+
+
+def _path_key(path: str) -> str:
+    """
+    Return a file name friendly key for an absolute path.
+    """
+    return hashlib.sha1(str(path).encode()).hexdigest()  # noqa: S324
+
+
+def _read_pickle(cache_file: Path) -> Any | None:  # noqa: ANN401
+    """
+    Return the payload of a cache file, or None if it's missing or unusable.
+    """
+    if not cache_file.exists():
+        return None
+
+    try:
+        with cache_file.open("rb") as file:
+            header = pickle.load(file)  # noqa: S301
+            if header != _cache_header():
+                logger.info("Cache file %s is outdated; ignoring.", cache_file)
+                return None
+            return pickle.load(file)  # noqa: S301
+    except Exception as exc:  # noqa: BLE001
+        # Unpickling an old or corrupted file fails in many different ways.
+        logger.warning("Cache file %s is unreadable: %s", cache_file, exc)
+        return None
+
+
+def _write_pickle(cache_file: Path, payload: Any) -> None:  # noqa: ANN401
+    """
+    Write the payload, atomically replacing any previous version of the file.
+    """
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            dir=cache_file.parent, prefix=".tmp-", delete=False
+        ) as file:
+            pickle.dump(_cache_header(), file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(file.name, cache_file)  # noqa: PTH105
+    except OSError as exc:
+        logger.warning("Could not write cache file %s: %s", cache_file, exc)
+
+
+class LedgerCache:
+    """
+    Persistent cache of loaded ledgers, keyed by the include tree.
+    """
+
+    def __init__(self, cache_dir: Path, variant: str = "") -> None:
+        """
+        Use `cache_dir` to store the cache files. It's created on demand.
+
+        Ledgers loaded with different settings that change the entries, such as
+        a checkpoint, must use a different `variant`.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.variant = variant
+
+    def cache_file(self, ledger_path: str) -> Path:
+        """
+        Return the cache file used for the given top-level ledger.
+        """
+        suffix = f"-{self.variant}" if self.variant else ""
+        return self.cache_dir / f"ledger-{_path_key(ledger_path)}{suffix}.pickle"
+
+    def load(self, ledger_path: str) -> CachedLedger | None:
+        """
+        Return the cached ledger, or None if it's missing or out of date.
+        """
+        cached: CachedLedger | None = _read_pickle(self.cache_file(ledger_path))
+        if (
+            cached is None
+            or not stamps_current(cached.stamps)
+            or not includes_current(cached.includes)
+        ):
+            return None
+
+        logger.debug("Loaded ledger %s from cache.", ledger_path)
+        return cached
+
+    def store(self, ledger_path: str, cached: CachedLedger) -> None:
+        """
+        Write the ledger to the cache.
+        """
+        _write_pickle(self.cache_file(ledger_path), cached)
+
+
+class CheckpointStore:
+    """
+    Checkpoints of ledgers, one per top-level ledger and cut-off date.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        """
+        Use `cache_dir` to store the checkpoints. It's created on demand.
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def cache_file(self, ledger_path: str, cutoff: datetime.date) -> Path:
+        """
+        Return the file of the checkpoint of the ledger at `cutoff`.
+        """
+        name = f"{_path_key(ledger_path)}-{cutoff.isoformat()}.pickle"
+        return self.cache_dir / "checkpoints" / name
+
+    def load(self, ledger_path: str, cutoff: datetime.date) -> Checkpoint | None:
+        """
+        Return the stored checkpoint, or None if there's none.
+        """
+        return _read_pickle(self.cache_file(ledger_path, cutoff))
+
+    def store(self, ledger_path: str, checkpoint: Checkpoint) -> None:
+        """
+        Write the checkpoint, replacing the previous one for the same cut-off.
+        """
+        _write_pickle(self.cache_file(ledger_path, checkpoint.cutoff), checkpoint)
+
+
+class PriceIndexStore:
+    """
+    Price indexes of ledgers, one per top-level ledger.
+
+    An index is reused as long as the digest of the price directives matches,
+    whatever happens to the rest of the ledger.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        """
+        Use `cache_dir` to store the price indexes. It's created on demand.
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def cache_file(self, ledger_path: str) -> Path:
+        """
+        Return the file of the price index of the ledger.
+        """
+        return self.cache_dir / "prices" / f"{_path_key(ledger_path)}.pickle"
+
+    def load(self, ledger_path: str, digest: str) -> Any | None:  # noqa: ANN401
+        """
+        Return the stored index if it was built from prices with `digest`.
+        """
+        cached: CachedPrices | None = _read_pickle(self.cache_file(ledger_path))
+        if cached is None or cached.digest != digest:
+            return None
+        logger.debug("Loaded the price index of %s from cache.", ledger_path)
+        return cached.index
+
+    def store(self, ledger_path: str, digest: str, index: Any) -> None:  # noqa: ANN401
+        """
+        Write the index, replacing the previous one of the ledger.
+        """
+        _write_pickle(self.cache_file(ledger_path), CachedPrices(digest, index))
+
+
+class NetworthHistoryStore:
+    """
+    Net worth histories of ledgers, as Parquet files.
+
+    Every top-level ledger has one file per `key`, which identifies the subsets,
+    resolution and currency of the history. The digests are kept in the metadata
+    of the file, along with the fingerprint of the ledger.
+    """
+
+    def __init__(self, cache_dir: Path) -> None:
+        """
+        Use `cache_dir` to store the histories. It's created on demand.
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def cache_file(self, ledger_path: str, key: str) -> Path:
+        """
+        Return the file of the history of the ledger with the given key.
+        """
+        return self.cache_dir / "networth" / f"{_path_key(ledger_path)}-{key}.parquet"
+
+    def load(self, ledger_path: str, key: str) -> CachedHistory | None:
+        """
+        Return the stored history, or None if it's missing or unusable.
+        """
+        cache_file = self.cache_file(ledger_path, key)
+        if not cache_file.exists():
+            return None
+
+        try:
+            table = pq.read_table(cache_file)
+            metadata = table.schema.metadata or {}
+            if json.loads(metadata[b"finlit.header"]) != list(_cache_header()):
+                logger.info("Cache file %s is outdated; ignoring.", cache_file)
+                return None
+            digests = json.loads(metadata[b"finlit.digests"])
+            fingerprint = metadata.get(b"finlit.fingerprint", b"").decode()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Cache file %s is unreadable: %s", cache_file, exc)
+            return None
+
+        logger.debug("Loaded the net worth history of %s from cache.", ledger_path)
+        return CachedHistory(
+            pd.Series(digests["digests"], index=digests["days"], dtype="uint64"),
+            table.to_pandas(),
+            fingerprint,
+        )
+
+    def store(self, ledger_path: str, key: str, cached: CachedHistory) -> None:
+        """
+        Write the history, atomically replacing the previous one with the key.
+        """
+        cache_file = self.cache_file(ledger_path, key)
+        digests = {
+            "days": [int(day) for day in cached.digests.index],
+            "digests": [int(digest) for digest in cached.digests],
+        }
+        table = pa.Table.from_pandas(cached.history, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {
+                **(table.schema.metadata or {}),
+                b"finlit.header": json.dumps(_cache_header()),
+                b"finlit.digests": json.dumps(digests),
+                b"finlit.fingerprint": cached.fingerprint,
+            }
+        )
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=cache_file.parent, prefix=".tmp-", delete=False
+            ) as file:
+                pq.write_table(table, file)
+            os.replace(file.name, cache_file)  # noqa: PTH105
+        except OSError as exc:
+            logger.warning("Could not write cache file %s: %s", cache_file, exc)
+
+
+class ParseCache:
+    """
+    Parser output of individual files, on disk and optionally in memory.
+
+    Entries are looked up by the content digest of the file, so an entry is
+    reused only if the file has exactly the same bytes it was parsed from.
+
+    Only the stamps of the files are kept in memory by default, so untouched
+    files needn't be hashed again, and the parser output is read back from
+    disk. With `in_memory`, the parser output is kept in memory too. Either way,
+    files no longer included by any ledger are forgotten (see `retain`).
+    """
+
+    def __init__(self, cache_dir: Path | None, *, in_memory: bool = False) -> None:
+        """
+        Persist parsed files under `cache_dir`, and keep them in memory if asked.
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.in_memory = in_memory
+        self._stamps: dict[str, FileStamp] = {}
+        self._memory: dict[str, ParsedFile] = {}
+        self._trees: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def cache_file(self, path: str) -> Path | None:
+        """
+        Return the cache file for the parsed contents of `path`.
+        """
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / "parsed" / f"{_path_key(path)}.pickle"
+
+    def stamp(self, path: str) -> FileStamp | None:
+        """
+        Stamp the file, reusing the digest of the parsed version if it's untouched.
+        """
+        with self._lock:
+            previous = self._stamps.get(path)
+        return stamp_file(path, previous)
+
+    def get(self, stamp: FileStamp) -> ParsedFile | None:
+        """
+        Return the parser output for the stamped contents, if known.
+        """
+        with self._lock:
+            parsed = self._memory.get(stamp.path)
+        if parsed is not None and parsed.stamp.digest == stamp.digest:
+            return parsed
+
+        cache_file = self.cache_file(stamp.path)
+        if cache_file is None:
+            return None
+        parsed = _read_pickle(cache_file)
+        if parsed is None or parsed.stamp.digest != stamp.digest:
+            return None
+
+        self._remember(parsed)
+        return parsed
+
+    def put(self, parsed: ParsedFile, *, persist: bool = True) -> None:
+        """
+        Remember the parser output of a file, replacing older versions of it.
+        """
+        self._remember(parsed)
+
+        cache_file = self.cache_file(parsed.stamp.path)
+        if persist and cache_file is not None:
+            _write_pickle(cache_file, parsed)
+
+    def _remember(self, parsed: ParsedFile) -> None:
+        """
+        Keep the stamp of a parsed file, and its output when kept in memory.
+        """
+        with self._lock:
+            self._stamps[parsed.stamp.path] = parsed.stamp
+            if self.in_memory:
+                self._memory[parsed.stamp.path] = parsed
+
+    def retain(self, ledger_path: str, paths: Iterable[str]) -> None:
+        """
+        Record the files included by a ledger, and forget the unused ones.
+
+        Files are kept as long as the latest include tree of any ledger that
+        shares this cache has them.
+        """
+        with self._lock:
+            self._trees[ledger_path] = set(paths)
+            used = set().union(*self._trees.values())
+            for path in [path for path in self._stamps if path not in used]:
+                del self._stamps[path]
+            for path in [path for path in self._memory if path not in used]:
+                del self._memory[path]
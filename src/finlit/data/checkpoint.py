@@ -0,0 +1,177 @@
+"""
+Opening-balance checkpoints of a ledger.
+
+A checkpoint replaces every transaction, pad, balance assertion and price
+before a cut-off date with:
+
+- one opening-balance transaction per balance sheet account, dated the day
+  before the cut-off, holding the positions of the account with their cost
+  lots;
+- the last price of every currency pair before the cut-off.
+
+Income and expenses are not carried over; their totals end up in the
+previous-balances equity account. Every other directive, such as opens and
+commodities, is kept as parsed. Booking, plugins and validation then only run
+over the snapshot and the entries from the cut-off on.
+"""
+
+import datetime
+import hashlib
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+from beancount.core import account_types, compare, data, flags, prices
+from beancount.ops import summarize
+from beancount.parser import options as beancount_options
+
+from finlit.data.fingerprint import FileStamp
+
+# Filename in the metadata of the entries created for a checkpoint.
+CHECKPOINT_FILENAME = "<checkpoint>"
+
+# Directives that are summarized by a checkpoint; the rest are kept.
+SUMMARIZED_TYPES = (data.Transaction, data.Pad, data.Balance, data.Price)
+
+
+def split_entries(
+    entries: Iterable[Any], cutoff: datetime.date
+) -> tuple[list[Any], list[Any]]:
+    """
+    Split the entries into the ones before the cut-off and the others.
+    """
+    before: list[Any] = []
+    after: list[Any] = []
+    for entry in entries:
+        (before if entry.date < cutoff else after).append(entry)
+    return before, after
+
+
+def digest_entries(
+    entries: list[Any],
+    stamps: list[FileStamp],
+    previous: dict[str, tuple[str, str]] | None = None,
+) -> tuple[str, dict[str, tuple[str, str]]]:
+    """
+    Return a digest of parsed entries, and the digest of each file's entries.
+
+    Metadata isn't hashed, so moving entries around in a file doesn't change
+    the digest. Files whose contents match `previous` aren't hashed again.
+    """
+    by_file: dict[str, list[Any]] = defaultdict(list)
+    for entry in entries:
+        by_file[entry.meta.get("filename", "")].append(entry)
+
+    file_hashes = {stamp.path: stamp.digest for stamp in stamps}
+    previous = previous or {}
+    file_digests: dict[str, tuple[str, str]] = {}
+    for filename, file_entries in by_file.items():
+        file_hash = file_hashes.get(filename, "")
+        known = previous.get(filename)
+        if file_hash and known is not None and known[0] == file_hash:
+            file_digests[filename] = known
+            continue
+
+        digest = hashlib.sha256()
+        for entry in file_entries:
+            digest.update(compare.hash_entry(entry, exclude_meta=True).encode())
+        file_digests[filename] = (file_hash, digest.hexdigest())
+
+    digest = hashlib.sha256()
+    for filename, (_, file_digest) in sorted(file_digests.items()):
+        digest.update(f"{filename}\0{file_digest}\n".encode())
+    return digest.hexdigest(), file_digests
+
+
+def digest_options(options: dict[str, Any]) -> str:
+    """
+    Return a digest of the options that change how entries are booked.
+    """
+    names = sorted(
+        name
+        for name in options
+        if name.startswith(("name_", "account_", "booking_", "inferred_", "plugin"))
+    )
+    return hashlib.sha256(repr([(n, options[n]) for n in names]).encode()).hexdigest()
+
+
+def build_snapshot(
+    entries: list[Any], cutoff: datetime.date, options: dict[str, Any]
+) -> list[Any]:
+    """
+    Return the entries that stand for the booked `entries` before the cut-off.
+
+    The opening-balance transactions are booked against the previous-balances
+    equity account, which gets an open directive if the ledger has none.
+    """
+    types = beancount_options.get_account_types(options)
+    previous_balances, _, _ = beancount_options.get_previous_accounts(options)
+    summary_date = cutoff - datetime.timedelta(days=1)
+
+    balances, _ = summarize.balance_by_account(entries, cutoff)
+    balance_sheet = {
+        name: balance
+        for name, balance in balances.items()
+        if name != previous_balances
+        and account_types.is_balance_sheet_account(name, types)
+    }
+
+    snapshot: list[Any] = summarize.create_entries_from_balances(
+        balance_sheet,
+        summary_date,
+        previous_balances,
+        True,  # noqa: FBT003
+        data.new_metadata(CHECKPOINT_FILENAME, 0),
+        flags.FLAG_SUMMARIZE,
+        "Opening balance for '{account}' (Checkpoint)",
+    )
+    snapshot.extend(prices.get_last_price_entries(entries, cutoff))
+
+    opened = any(
+        isinstance(entry, data.Open) and entry.account == previous_balances
+        for entry in entries
+    )
+    if not opened:
+        first_date = min((entry.date for entry in entries), default=summary_date)
+        snapshot.append(
+            data.Open(
+                data.new_metadata(CHECKPOINT_FILENAME, 0),
+                min(first_date, summary_date),
+                previous_balances,
+                None,
+                None,
+            )
+        )
+
+    return sorted(snapshot, key=data.entry_sortkey)
+
+
+def apply_snapshot(
+    entries: list[Any], snapshot: list[Any], cutoff: datetime.date
+) -> list[Any]:
+    """
+    Return the parsed entries with the ones summarized by the snapshot replaced.
+    """
+    kept = [
+        entry
+        for entry in entries
+        if entry.date >= cutoff or not isinstance(entry, SUMMARIZED_TYPES)
+    ]
+    return kept + snapshot
+
+
+def drop_derived_prices(entries: list[Any]) -> list[Any]:
+    """
+    Remove the prices that plugins derived from the opening-balance entries.
+
+    Plugins such as `implicit_prices` would otherwise price every lot of the
+    snapshot at its cost, on the day before the cut-off.
+    """
+    return [
+        entry
+        for entry in entries
+        if not (
+            isinstance(entry, data.Price)
+            and entry.meta.get("filename") == CHECKPOINT_FILENAME
+        )
+    ]
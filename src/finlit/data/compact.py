@@ -0,0 +1,123 @@
+"""
+Compact in-memory storage for the entries of large ledgers.
+
+Beancount directives are namedtuples holding meta dicts, `Decimal` numbers and
+a separate copy of every account and currency string, which adds up to a few
+kilobytes per transaction. `CompactEntries` keeps the entries serialized in
+fixed-size blocks instead, where pickling stores each repeated string once per
+block, and rebuilds the directives of a block only when they're accessed.
+"""
+
+import datetime
+import pickle
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterator, Sequence
+from typing import Any, overload
+
+BLOCK_SIZE = 512
+
+# Decoded blocks kept around, so that sequential access decodes each block once.
+DECODED_BLOCKS = 4
+
+
+class CompactEntries(Sequence):
+    """
+    Read-only sequence of entries stored as compressed blocks.
+
+    Indexing and iterating return directives equal to the original ones, but
+    they're rebuilt on demand, so they're new objects on every access to a
+    block that's no longer decoded.
+    """
+
+    __slots__ = ("_blocks", "_block_size", "_decoded", "_length", "_lock", "dates")
+
+    def __init__(self, entries: Sequence[Any], block_size: int = BLOCK_SIZE) -> None:
+        """
+        Serialize the entries in blocks of `block_size`.
+        """
+        self._block_size = block_size
+        self._length = len(entries)
+        self._blocks: list[bytes] = [
+            zlib.compress(
+                pickle.dumps(
+                    list(entries[start : start + block_size]),
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                ),
+                1,
+            )
+            for start in range(0, len(entries), block_size)
+        ]
+        # Dates as ordinals, so the entries can be indexed by date without
+        # rebuilding them.
+        self.dates = array("l", (entry.date.toordinal() for entry in entries))
+        self._decoded: OrderedDict[int, list[Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the size of the serialized entries, in bytes.
+        """
+        return sum(len(block) for block in self._blocks) + self.dates.itemsize * len(
+            self.dates
+        )
+
+    def date(self, index: int) -> datetime.date:
+        """
+        Return the date of an entry without rebuilding it.
+        """
+        return datetime.date.fromordinal(self.dates[index])
+
+    def _block(self, number: int) -> list[Any]:
+        """
+        Return the decoded entries of a block.
+        """
+        with self._lock:
+            block = self._decoded.get(number)
+            if block is not None:
+                self._decoded.move_to_end(number)
+                return block
+
+        block = pickle.loads(zlib.decompress(self._blocks[number]))  # noqa: S301
+        with self._lock:
+            self._decoded[number] = block
+            while len(self._decoded) > DECODED_BLOCKS:
+                self._decoded.popitem(last=False)
+        return block
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries.
+        """
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...  # noqa: ANN401
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Any]: ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        """
+        Return the entry at `index`, or a list of the entries of a slice.
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            msg = "entry index out of range"
+            raise IndexError(msg)
+        number, offset = divmod(index, self._block_size)
+        return self._block(number)[offset]
+
+    def __iter__(self) -> Iterator[Any]:
+        """
+        Iterate over the entries, decoding one block at a time.
+        """
+        for number in range(len(self._blocks)):
+            yield from self._block(number)
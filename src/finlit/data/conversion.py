@@ -0,0 +1,64 @@
+"""
+Conversion stage for tables of postings.
+
+Datasets select the raw amount of each posting, i.e. its number, currency and
+cost currency, and this stage replaces them with one column per target
+currency. Every row is converted at once with the daily price matrix of the
+ledger (see `finlit.data.price_matrix`), the same way as the
+`CONVERT_POSITION` SQL function: with the direct rate, or through the cost
+currency when there's none. Amounts without a rate are NaN.
+"""
+
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+from finlit.data.price_matrix import PriceMatrix
+
+
+def add_conversions(  # noqa: PLR0913
+    frame: pd.DataFrame,
+    price_matrix: PriceMatrix,
+    target_currencies: Sequence[str],
+    *,
+    number: str = "number",
+    currency: str = "currency",
+    cost_currency: str | None = "cost_currency",
+    date: str = "date",
+    column: str = "amount_{}",
+) -> pd.DataFrame:
+    """
+    Return the frame with its amounts converted to every target currency.
+
+    The new columns take the place of the number, currency and cost currency
+    columns, which are dropped.
+
+    Args:
+    ----
+        frame: Table with a row per posting.
+        price_matrix: Daily rates used for the conversions.
+        target_currencies: Currencies to convert to, in the order of the columns.
+        number: Column of the numbers to convert.
+        currency: Column of the currencies of the numbers.
+        cost_currency: Column of the currencies to convert through, if any.
+        date: Column of the dates of the conversions.
+        column: Name of the new columns, formatted with the lowercase currency.
+
+    """
+    converted = price_matrix.convert_many(
+        frame[number].to_numpy(dtype=float, na_value=np.nan),
+        frame[currency],
+        target_currencies,
+        frame[date],
+        via=frame[cost_currency] if cost_currency is not None else None,
+    )
+
+    raw = [name for name in (number, currency, cost_currency) if name is not None]
+    position = sum(
+        1 for name in frame.columns[: frame.columns.get_loc(number)] if name not in raw
+    )
+    result = frame.drop(columns=raw)
+    for offset, (target, values) in enumerate(converted.items()):
+        result.insert(position + offset, column.format(target.lower()), values)
+    return result
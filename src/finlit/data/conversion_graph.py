@@ -0,0 +1,242 @@
+"""
+Conversion paths between the currencies of a ledger.
+
+The pairs of the price map form a graph, with an edge in both directions for
+every quoted pair since beancount inverts each quote. A currency is converted
+with its direct rate on the days it has one, and on the other days along the
+shortest path of that graph with a rate on that day, through any number of
+intermediate currencies, e.g. GGAL to ARS to USD.
+
+The rates of a path are the daily rates of its pairs (see
+`finlit.data.price_matrix`) multiplied day by day, so a projected rate always
+uses the latest quote of every pair. The routes to a target currency are
+computed once for every currency and kept.
+"""
+
+import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+import numpy as np
+from beancount.core import prices
+from beancount.core.number import ONE, ZERO
+
+from finlit.data.price_matrix import PriceMatrix
+
+
+class Routes(NamedTuple):
+    """
+    Daily conversions of every currency into a target currency.
+
+    Attributes
+    ----------
+        rates: Daily rates of each currency, NaN where there's no path.
+        via: Index in the neighbours of each currency of the next currency of
+            the path on each day, or -1 where the direct rate is used.
+
+    """
+
+    rates: dict[str, np.ndarray]
+    via: dict[str, np.ndarray]
+
+
+class ConversionGraph:
+    """
+    Shortest conversion paths and projected daily rates between currencies.
+    """
+
+    def __init__(self, price_matrix: PriceMatrix) -> None:
+        """
+        Build the graph from the pairs of the price matrix.
+        """
+        self.price_matrix = price_matrix
+        neighbours: dict[str, set[str]] = {}
+        for base, quote in price_matrix.pairs:
+            neighbours.setdefault(base, set()).add(quote)
+            neighbours.setdefault(quote, set())
+        # Sorted so that ties between paths of the same length are stable.
+        self.neighbours: dict[str, tuple[str, ...]] = {
+            currency: tuple(sorted(quotes)) for currency, quotes in neighbours.items()
+        }
+        self._routes: dict[str, Routes] = {}
+        self._projected: dict[str, prices.PriceMap] = {}
+
+    @property
+    def currencies(self) -> list[str]:
+        """
+        Return every currency with a price.
+        """
+        return sorted(self.neighbours)
+
+    def routes(self, target_currency: str) -> Routes:
+        """
+        Return the daily conversions of every currency into `target_currency`.
+
+        The routes are computed once per target currency and shared, so they
+        must not be modified.
+        """
+        if target_currency not in self._routes:
+            self._routes[target_currency] = self._search(target_currency)
+        return self._routes[target_currency]
+
+    def _search(self, target_currency: str) -> Routes:
+        """
+        Find the shortest path of every currency on every day.
+
+        Each round extends the paths found so far by one more pair, on the days
+        that don't have a rate yet, until no more days are filled.
+        """
+        days = self.price_matrix.rates.shape[1]
+        rates = {
+            currency: self.price_matrix.series(currency, target_currency).copy()
+            for currency in {*self.currencies, target_currency}
+        }
+        via = {currency: np.full(days, -1, dtype=np.int32) for currency in rates}
+
+        extended = True
+        while extended:
+            extended = False
+            previous = {currency: rate.copy() for currency, rate in rates.items()}
+            for currency, neighbours in self.neighbours.items():
+                missing = np.isnan(rates[currency])
+                if currency == target_currency or not missing.any():
+                    continue
+                for index, neighbour in enumerate(neighbours):
+                    candidate = (
+                        self.price_matrix.series(currency, neighbour)
+                        * previous[neighbour]
+                    )
+                    found = missing & ~np.isnan(candidate)
+                    if found.any():
+                        rates[currency][found] = candidate[found]
+                        via[currency][found] = index
+                        missing &= ~found
+                        extended = True
+
+        for currency in rates:
+            rates[currency].flags.writeable = False
+            via[currency].flags.writeable = False
+        return Routes(rates, via)
+
+    def path(
+        self, currency: str, target_currency: str, date: datetime.date | None
+    ) -> tuple[str, ...] | None:
+        """
+        Return the currencies of the conversion used at `date`, or None.
+
+        The path starts with `currency` and ends with `target_currency`, and
+        has only those two when the direct rate is used.
+        """
+        if currency == target_currency:
+            return (currency,)
+        column = self.price_matrix.column(date)
+        routes = self.routes(target_currency)
+        if column < 0 or np.isnan(self.series(currency, target_currency)[column]):
+            return None
+        path = [currency]
+        while path[-1] != target_currency:
+            step = routes.via[path[-1]][column]
+            if step < 0:
+                path.append(target_currency)
+            else:
+                path.append(self.neighbours[path[-1]][step])
+        return tuple(path)
+
+    def series(self, currency: str, target_currency: str) -> np.ndarray:
+        """
+        Return the daily rates of a currency, NaN where unknown.
+
+        The rates are direct where there's a direct rate, and along the
+        shortest path elsewhere. The days are the calendar of the price matrix.
+        The array is shared, so it must not be modified.
+        """
+        rates = self.routes(target_currency).rates.get(currency)
+        if rates is None:
+            rates = np.full(self.price_matrix.rates.shape[1], np.nan)
+            rates.flags.writeable = False
+        return rates
+
+    def rate(
+        self, currency: str, target_currency: str, date: datetime.date | None
+    ) -> float | None:
+        """
+        Return the rate of a currency at `date`, or None.
+        """
+        if currency == target_currency:
+            return 1.0
+        column = self.price_matrix.column(date)
+        if column < 0:
+            return None
+        rate = self.series(currency, target_currency)[column]
+        return None if np.isnan(rate) else float(rate)
+
+    def projected_price_map(self, target_currency: str) -> prices.PriceMap:
+        """
+        Return the price map with rates to `target_currency` for every currency.
+
+        On the days a currency has no direct rate, the rates of its path, and
+        their inverses, are added to its pair as if they had been quoted on
+        every day the path or its rate changes. Existing quotes are kept. The
+        map is built once per target currency and shared, so it must not be
+        modified.
+        """
+        if target_currency not in self._projected:
+            self._projected[target_currency] = self._project(target_currency)
+        return self._projected[target_currency]
+
+    def _exact_rate(self, path: tuple[str, ...], date: datetime.date) -> Decimal:
+        """
+        Return the product of the quotes along a path at `date`.
+
+        Like `prices.project`, the quotes are multiplied as decimals, so that
+        projected rates are as precise as the quotes themselves.
+        """
+        price_map = self.price_matrix.price_map
+        rate = ONE
+        for base, quote in zip(path, path[1:]):
+            _, price = prices.get_price(price_map, (base, quote), date)
+            rate *= price
+        return rate
+
+    def _project(self, target_currency: str) -> prices.PriceMap:
+        """
+        Add the rates of the shortest paths to a copy of the price map.
+        """
+        routes = self.routes(target_currency)
+        price_map = self.price_matrix.price_map
+        projected: prices.PriceMap = dict(price_map)
+        start = self.price_matrix.start.toordinal()
+        for currency in self.currencies:
+            if currency == target_currency:
+                continue
+            rates = routes.rates[currency]
+            via = routes.via[currency]
+            indirect = via >= 0
+            if not indirect.any():
+                continue
+            # One quote per change of the path or its rate is enough for
+            # `prices.get_price`.
+            starts = indirect & ~np.concatenate([[False], indirect[:-1]])
+            changes = np.flatnonzero(
+                indirect
+                & (
+                    starts
+                    | (np.diff(rates, prepend=np.nan) != 0)
+                    | (np.diff(via, prepend=-1) != 0)
+                )
+            )
+            quotes = []
+            for day in changes:
+                date = datetime.date.fromordinal(start + int(day))
+                path = self.path(currency, target_currency, date)
+                if path is not None:
+                    quotes.append((date, self._exact_rate(path, date)))
+
+            inverses = [
+                (date, ZERO if rate == ZERO else ONE / rate) for date, rate in quotes
+            ]
+            pair = (currency, target_currency)
+            projected[pair] = sorted([*price_map.get(pair, ()), *quotes])
+            inverse = (target_currency, currency)
+            projected[inverse] = sorted([*price_map.get(inverse, ()), *inverses])
+        return projected
@@ -7,11 +7,15 @@ from typing import Any
 
 import pandas as pd
 
+from finlit.data.conversion import add_conversions
 from finlit.data.datasets.dataset import Dataset
 from finlit.data.ledger import Ledger
 
 logger = getLogger()
 
+# Currencies of the amount columns, e.g. `amount_ars`.
+CURRENCIES = ["ARS", "USD"]
+
 
 class AllExpensesDataset(Dataset):
     """
@@ -24,40 +28,33 @@ class AllExpensesDataset(Dataset):
         """
         super().__init__(ledger, table_name)
 
-    def _unpack_frozenset(self, x: frozenset) -> list[str]:
-        """
-        Unpack the frozenset.
-        """
-        if not x:
-            return [""]
-        # (a,) = x
-        # return a
-        return list(x)
-
     def build(self, **_: dict[str, Any]) -> pd.DataFrame:
         """
         Build the table in the database.
+
+        The dates are `datetime64` and the amounts `float64`, NaN without a
+        rate. The pages read the table through DuckDB, which returned those
+        same types for the `date` and `Decimal` values of the BQL table.
         """
-        query = """
+        expenses = self.ledger.accounts.of_type("Expenses")
+        query = f"""
         SELECT
             date AS date,
             account AS account,
-            LEAF(ROOT(account, 2)) as category,
-            LEAF(ROOT(account, 3)) as subcategory,
+            LEAF(ROOT(account, 2)) AS category,
+            LEAF(ROOT(account, 3)) AS subcategory,
             payee AS payee,
             narration AS narration,
-            NUMBER(CONVERT(POSITION, 'ARS', DATE)) AS amount_ars,
-            NUMBER(CONVERT(POSITION, 'USD', DATE)) AS amount_usd,
-            tags
-        WHERE account ~ '^Expenses'
+            number AS number,
+            currency AS currency,
+            cost_currency AS cost_currency,
+            CASE WHEN len(tags) = 0 THEN [''] ELSE tags END AS tags
+        FROM postings
+        WHERE account_id >= {expenses.start} AND account_id < {expenses.stop}
         ORDER BY date DESC
         """
 
-        _types, res = self.ledger.run_query(query)
-
-        all_expenses = pd.DataFrame(res)
-        all_expenses["tags"] = all_expenses["tags"].apply(self._unpack_frozenset)
-
-        # logger.info(all_expenses["tag"].unique())
-
-        return all_expenses
+        # Both currencies are converted in a single pass over the postings.
+        return add_conversions(
+            self.ledger.run_sql(query), self.ledger.price_matrix, CURRENCIES
+        )
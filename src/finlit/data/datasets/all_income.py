@@ -8,11 +8,15 @@ from typing import Any
 import pandas as pd
 import streamlit as st
 
+from finlit.data.conversion import add_conversions
 from finlit.data.datasets.dataset import Dataset
-from finlit.data.ledger import Ledger, ledger_hash
+from finlit.data.ledger import Ledger
 
 logger = getLogger()
 
+# Currencies of the amount columns, e.g. `amount_ars`.
+CURRENCIES = ["ARS", "USD"]
+
 
 class AllIncomeDataset(Dataset):
     """
@@ -30,29 +34,38 @@ class AllIncomeDataset(Dataset):
     @st.cache_data(
         hash_funcs={
             "finlit.data.datasets.all_income.AllIncomeDataset": lambda x: (
-                ledger_hash(x.ledger)
+                x.ledger.fingerprint
             )
         }
     )
     def build(self, **_: dict[str, Any]) -> pd.DataFrame:
         """
         Build the table in the database.
+
+        The dates are `datetime64` and the amounts `float64`, NaN without a
+        rate. The pages read the table through DuckDB, which returned those
+        same types for the `date` and `Decimal` values of the BQL table.
         """
 
         st.session_state["cache_updated"] = True
 
-        query = """
+        income = self.ledger.accounts.of_type("Income")
+        query = f"""
         SELECT
             date AS date,
             account AS account,
             LEAF(ROOT(account, 3)) AS origin,
             payee AS payee,
             narration AS narration,
-            NUMBER(CONVERT(ABS(POSITION), 'ARS', DATE)) AS amount_ars,
-            NUMBER(CONVERT(ABS(POSITION), 'USD', DATE)) AS amount_usd
-        WHERE account ~ '^Income'
+            ABS(number) AS number,
+            currency AS currency,
+            cost_currency AS cost_currency
+        FROM postings
+        WHERE account_id >= {income.start} AND account_id < {income.stop}
         ORDER BY date DESC
         """
 
-        _, res = self.ledger.run_query(query)  # type: ignore[] WHAT?
-        return pd.DataFrame(res)
+        # Both currencies are converted in a single pass over the postings.
+        return add_conversions(
+            self.ledger.run_sql(query), self.ledger.price_matrix, CURRENCIES
+        )
@@ -29,7 +29,7 @@ class BalanceDataset(Dataset):
     # @st.cache_data(
     #     hash_funcs={
     #         "finlit.data.datasets.all_income.AllIncomeDataset": lambda x: (
-    #             ledger_hash(x.ledger)
+    #             x.ledger.fingerprint
     #         )
     #     }
     # )
@@ -38,18 +38,18 @@ class BalanceDataset(Dataset):
         Build the table in the database.
         """
 
+        accounts = self.ledger.accounts.of_type(balance_type)
         query = f"""
         SELECT
-            YEAR AS Year,
-            MONTH AS Month,
-            NUMBER(ONLY('USD', SUM(CONVERT(VALUE(POSITION, DATE), 'USD', DATE)))) AS AMOUNT
-        WHERE Account ~ '^{balance_type}'
+            year AS Year,
+            month AS Month,
+            SUM(VALUE(number, currency, cost_currency, 'USD', date)) AS AMOUNT
+        FROM postings
+        WHERE account_id >= {accounts.start} AND account_id < {accounts.stop}
         GROUP BY 1,2
         """
 
-        _, res = self.ledger.run_query(query)  # type: ignore[] WHAT?
-
-        return pd.DataFrame(res)
+        return self.ledger.run_sql(query)
 
     def build(self, **_: dict[str, str]) -> pd.DataFrame:
         """
@@ -1,34 +1,55 @@
 """
-HERE BE DRAGONS.
+Market value of the assets and liabilities in the ledger file as a timeseries.
 
+It started as a copy of the net worth script by the author of beancount:
 https://github.com/beancount/beanlabs/blob/master/beanlabs/compensation/net-worth-over-time.py#L91
 
-I currently don't understand this code. I will need to come back to it later.
-It's copied from the beancount repository by the author of beancount.
+The daily inventories of that script are now computed in bulk by
+`finlit.data.networth_engine`. Subsets of the postings are best described with a
+`PostingSelector`, which is compiled into a mask at once; filter functions are
+still accepted, but are called once per posting.
 
-It returns the market value of the assets in the ledger file as a timeseries.
+The history can be valued every day, or only at the end of every week, month or
+quarter, so a monthly chart values about 12 days per year instead of 365.
+
+Histories of selectors are kept on disk, in the cache directory of the ledger,
+with the digests of the days they were valued from. A rerun only values the
+days from the first one whose postings or rates changed, and the new days since
+the last run, and keeps the rest.
 """
 
-import collections
 import datetime
-from collections.abc import Callable
+import hashlib
+import os
+from collections.abc import Callable, Mapping, Sequence
 from logging import getLogger
-from typing import Set, Tuple
+from typing import Literal
 
+import numpy as np
 import pandas as pd
-from beancount.core import account_types, convert, data, inventory, prices
-from beancount.core.data import Currency
 from beancount.parser import options
-from dateutil import rrule
 
 from finlit.constants import INITAL_MONTH, INITAL_YEAR
+from finlit.data.cache import CachedHistory, NetworthHistoryStore
 from finlit.data.datasets import Dataset
 from finlit.data.ledger import Ledger
+from finlit.data.networth_engine import NetworthEngine, first_changed_day
+from finlit.data.selectors import PostingSelector
 
 logger = getLogger()
 
 INVESTMENT_PREFIX = "Assets:Inversiones"
 
+Resolution = Literal["daily", "weekly", "month_end", "quarter_end"]
+
+# Pandas frequency of the days valued at each resolution.
+RESOLUTIONS: dict[str, str] = {
+    "daily": "D",
+    "weekly": "W-SUN",
+    "month_end": "ME",
+    "quarter_end": "QE",
+}
+
 
 # TODO: Refactor this class to add the balance, liabilities and assets as attributes
 # of the class.
@@ -59,274 +80,238 @@ class NetworthHistoryDataset(Dataset):
         """
         self.ledger: Ledger = ledger
 
-    def map_to_usd(self, inventory, currency, price_map, date) -> float:
+    def _days(self, resolution: Resolution = "daily") -> list[datetime.date]:
         """
-        Map the inventory to currency.
-
-        Args:
-        ----
-          inventory: The inventory to map.
-          currency: The currency to map to.
-          price_map: The price map to use for conversion.
-          date: The date at which to convert.
+        Return the days to value at the resolution, until today.
 
+        Daily histories start on the second of the first available month. The
+        other ones hold the last day of every week, month or quarter, and today
+        if it isn't one, so the current value is always the last row.
+        """
+        if resolution not in RESOLUTIONS:
+            msg = f"Unknown resolution {resolution!r}, use one of {list(RESOLUTIONS)}"
+            raise ValueError(msg)
+        dtstart = datetime.date(INITAL_YEAR, INITAL_MONTH, 2)
+        dtend = datetime.date.today()  # noqa: DTZ011
+        days = [
+            day.date()
+            for day in pd.date_range(dtstart, dtend, freq=RESOLUTIONS[resolution])
+        ]
+        if not days or days[-1] != dtend:
+            days.append(dtend)
+        return days
+
+    def _with_first_day(self, pd_balance: pd.DataFrame) -> pd.DataFrame:
         """
-        if inventory.is_empty():
-            return 0.0
-        converted = inventory.reduce(
-            convert.convert_position,
-            currency,
-            price_map,
-            date,
+        Prepend the first day of the month, with the balance of the second one.
+        """
+        first_date = pd_balance.iloc[:1].assign(
+            date=pd.Timestamp(INITAL_YEAR, INITAL_MONTH, 1)
         )
+        return pd.concat([first_date, pd_balance], ignore_index=True)
 
-        splitted = converted.split()
-        single_currency = splitted.pop(currency)
-        return single_currency.get_only_position().units.number
-
-    def project_missing_currencies(
+    def build_timeseries(
         self,
-        price_map: prices.PriceMap,
-        date: datetime.date,
-        currencies: Set[Currency],
-        target_currency: Currency,
-    ) -> prices.PriceMap:
+        *,
+        investments: bool = False,
+        filter_func: PostingSelector | Callable | None = None,
+        resolution: Resolution = "daily",
+    ) -> pd.DataFrame:
         """
-        Project missing currencies to convert `commodities` to `target_currency`.
-
-        We want to convert `currencies` to the currency `target_currency`, but the
-        price_map may not contain all the necessary prices. For example, TWD has
-        prices in USD, but we want to convert to CAD. TWD being a currency, it
-        doesn't have a cost, so routines that convert from cost (e.g.,
-        convert.get_value()) will not do their job. What we need to do is convert
-        TWD to CAD via USD. The way we do this is by "projecting" the TWD/USD prices
-        to TWD/CAD via USD/CAD. This is done iva prices.project().
-
-        We don't want to project any more prices than we need to, howerver. This
-        routine is very conservative and automatically finds the subset of
-        commodities which will require projection, and automatically infers through
-        which currencies it has the opportunity to project.
-
-        Note that this function does not use date/time; if no rates are available to
-        at the date required for conversion, the projection will have no effect.
-        Therefore, projecting in this way does not guarantee that projection will
-        completely success using the returned price map (you should assert). If it
-        fails to do so, the solution is to ensure that the ledger contains all
-        necessary prices.
-
-        Args:
-        ----
-          price_map: The original price map to probe.
-          date: The date at which to convert.
-          currencies: The set of currencies you'd like to eventually convert, the
-            subject of conversion.
-          target_currency: The target currency to which you'd like to convert them.
-
-        Returns:
-        -------
-          An updated price map containing projections to make this possible.
+        Build the dataframe for the networth trajectories.
 
+        Every day of the resolution since the first available month is valued at
+        once by the `NetworthEngine`, in USD.
         """
-        # Get a dictionary of which currency is priced in which other.
-        priced_currencies = collections.defaultdict(set)
-        for base, quote in price_map.keys():
-            priced_currencies[base].add(quote)
-
-        # Get a list of the currencies which have prices to the target currency.
-        # This works partly because price maps are symmetrical (e.g., "USD" will
-        # have all the currencies that are converted to it).
-        available_currencies = priced_currencies[target_currency]
-        # For all those remaining commodities, ensure that rates exist to
-        # convert by value to the target currency, by projecting through
-        # an available price conversion.
-        projections = collections.defaultdict(list)
-        for pos_currency in currencies:
-            rate_date, rate = prices.get_price(
-                price_map, (pos_currency, target_currency), date
-            )
-            if rate is None:
-                # Find the available prices for this position.
-                quote_currencies = priced_currencies[pos_currency]
-                inter_currencies = available_currencies & quote_currencies
-                for inter_currency in inter_currencies:
-                    projections[inter_currency].append(pos_currency)
-
-        # Apply the projections.
-        proj_price_map = price_map
-        for inter_currency, commodities in projections.items():
-            proj_price_map = prices.project(
-                proj_price_map,
-                inter_currency,
-                target_currency,
-                commodities,  # type: ignore[]
-            )
-
-        return proj_price_map
+        return self.build_subsets(
+            {"": filter_func}, investments=investments, resolution=resolution
+        )[""]
 
-    def add_to_inventories(
+    def build_subsets(
         self,
-        entries,
-        acctypes,
-        balance,
-        liabilities,
-        assets,
+        subsets: Mapping[str, PostingSelector | Callable | None],
         *,
-        investments=False,
-        filter_func: Callable | None = None,
-    ) -> Tuple[inventory.Inventory, inventory.Inventory, inventory.Inventory]:
+        investments: bool = False,
+        resolution: Resolution = "daily",
+    ) -> dict[str, pd.DataFrame]:
         """
-        Create inventories for the balance sheet.
+        Build the networth trajectories of several subsets of the postings.
+
+        Selectors are compiled into masks of the postings table. The postings
+        are only walked, once for all of them, if there are filter functions.
+        Every day is valued once for all the subsets. Without filter functions,
+        the history is kept on disk and only updated from the first changed day.
 
         Args:
         ----
-          entries: The entries to process.
-          acctypes: The account types map.
-          balance: The balance inventory.
-          liabilities: The liabilities inventory.
-          assets: The assets inventory.
-          investments: Whether to include investment accounts.
-          filter_func: A filter function to apply to the postings.
-
-        Returns:
-        -------
-          A tuple of the balance, liabilities and assets inventories.
+            subsets: Selector or filter function of every subset by name, or
+                None to keep every posting.
+            investments: Whether to only include investment accounts.
+            resolution: Which days to value: `daily`, `weekly`, `month_end` or
+                `quarter_end`.
 
         """
-
-        filter_function = filter_func if filter_func is not None else lambda _: True
-
-        for entry in data.filter_txns(entries):
-            for posting in entry.postings:
-                acctype = account_types.get_account_type(posting.account)
-
-                # Check:
-                # - if the account is an asset or liability
-                # - if the account is an investment account when investments is True
-                # - if the filter function returns True
-                is_asset_or_liability = acctype in (
-                    acctypes.assets,
-                    acctypes.liabilities,
-                )
-
-                investments_filter = (
-                    posting.account.startswith(INVESTMENT_PREFIX)
-                    if investments
-                    else True
-                )
-
-                is_valid = filter_function(posting)
-
-                if is_asset_or_liability and investments_filter and is_valid:
-                    balance.add_position(posting)  # type: ignore[]
-                    if acctype == acctypes.liabilities:
-                        liabilities.add_position(posting)  # type: ignore[]
-                    if acctype == acctypes.assets:
-                        assets.add_position(posting)  # type: ignore[]
-
-        return balance, liabilities, assets
-
-    def build_timeseries(
-        self, *, investments: bool = False, filter_func: Callable | None = None
+        histories = self._value(
+            subsets,
+            self._days(resolution),
+            investments,
+            key=self._history_key(subsets, resolution, investments),
+        )
+        if resolution != "daily":
+            return histories
+        return {
+            name: self._with_first_day(pd_balance)
+            for name, pd_balance in histories.items()
+        }
+
+    def value_on(
+        self,
+        days: Sequence[datetime.date],
+        *,
+        investments: bool = False,
+        filter_func: PostingSelector | Callable | None = None,
     ) -> pd.DataFrame:
         """
-        Build the dataframe for the networth trajectories.
+        Return the net worth on the given days only, sorted by date.
+
+        Useful to look up a single point, like the net worth a year ago, without
+        building the whole history.
         """
-        entries = self.ledger.entries
-        _errors = self.ledger.errors
-        options_map = self.ledger.options
-        acctypes = options.get_account_types(options_map)
-        price_map = prices.build_price_map(entries)
-        operating_currencies = options_map["operating_currency"]
-
-        net_worths_dict = collections.defaultdict(list)
-        index = 0
-        for entry in entries:
-            if isinstance(entry, data.Transaction):
-                dtstart = entry.date
-                break
-
-        dtstart = datetime.datetime(INITAL_YEAR, INITAL_MONTH, 2).date()  # noqa: DTZ001
-        dtend = datetime.date.today()  # noqa: DTZ011
+        return self._value({"": filter_func}, sorted(days), investments)[""]
 
-        period = rrule.rrule(rrule.DAILY, dtstart=dtstart, until=dtend)
-
-        balance = inventory.Inventory()
-        liabilities = inventory.Inventory()
-        assets = inventory.Inventory()
-        for dtime in period:
-            date = dtime.date()
-
-            # Append new entries until the given date.
-            new_entries = []
-            while index < len(entries):
-                entry = entries[index]
-                if entry.date >= date:
-                    break
-                new_entries.append(entry)
-                index += 1
-
-            # Simple global aggregation of all intervening postings to a single
-            # inventory.
-            balance, liabilities, assets = self.add_to_inventories(
-                new_entries,
-                acctypes,
-                balance,
-                liabilities,
-                assets,
-                investments=investments,
-                filter_func=filter_func,
-            )
+    def _history_key(
+        self,
+        subsets: Mapping[str, PostingSelector | Callable | None],
+        resolution: Resolution,
+        investments: bool,  # noqa: FBT001
+    ) -> str | None:
+        """
+        Return the key of the stored history of the subsets, or None.
 
-            for _, currency in enumerate(operating_currencies):
-                # Compute balance at market price values. This will convert all
-                # commodities held at cost to their cost value, and others to the
-                # priced value, if relevant prices exist. Only commodities which
-                # aren't held at cost or which have no price conversion information
-                # providing a conversion currency will remain.
-                value_balance = balance.reduce(convert.get_value, price_map, date)  # type: ignore[]
-
-                # Convert all contents to destination currency.
-                proj_price_map = self.project_missing_currencies(
-                    price_map,  # type: ignore[]
-                    date,
-                    {pos.units.currency for pos in value_balance},
-                    currency,
-                )
-
-                balance_value = self.map_to_usd(balance, currency, proj_price_map, date)
-                balance_liabilities = self.map_to_usd(
-                    liabilities, currency, proj_price_map, date
-                )
-                balance_assets = self.map_to_usd(assets, currency, proj_price_map, date)
-
-                net_worths_dict[currency].append(
-                    (
-                        date,
-                        balance_value,
-                        balance_liabilities,
-                        balance_assets,
-                    )
-                )  # type: ignore[]
-
-        first_date = (
-            datetime.date(INITAL_YEAR, INITAL_MONTH, 1),
-            net_worths_dict["USD"][0][1],
-            net_worths_dict["USD"][0][2],
-            net_worths_dict["USD"][0][3],
+        Histories of filter functions can't be identified, and ledgers without
+        a cache directory or with encrypted files aren't stored.
+        """
+        if self.ledger.config.cache_dir is None or self.ledger.encrypted:
+            return None
+        if any(
+            subset is not None and not isinstance(subset, PostingSelector)
+            for subset in subsets.values()
+        ):
+            return None
+        identity = repr(
+            (
+                sorted((name, repr(subset)) for name, subset in subsets.items()),
+                resolution,
+                investments,
+                "USD",
+                (INITAL_YEAR, INITAL_MONTH),
+                tuple(options.get_account_types(self.ledger.options)),
+            )
         )
+        return hashlib.sha256(identity.encode()).hexdigest()[:16]
 
-        net_worths_dict["USD"] = [first_date] + net_worths_dict["USD"]
-        pd_balance = pd.DataFrame.from_records(
-            net_worths_dict["USD"],
-            columns=["date", "net_worth", "liabilities", "assets"],
-        )
+    def _value(
+        self,
+        subsets: Mapping[str, PostingSelector | Callable | None],
+        days: Sequence[datetime.date],
+        investments: bool,  # noqa: FBT001
+        key: str | None = None,
+    ) -> dict[str, pd.DataFrame]:
+        """
+        Value the days for every subset of the postings.
 
-        pd_balance["date"] = pd.to_datetime(pd_balance["date"])
-        pd_balance["net_worth"] = pd_balance["net_worth"].astype(float)
-        pd_balance["liabilities"] = pd_balance["liabilities"].astype(float)
-        pd_balance["assets"] = pd_balance["assets"].astype(float)
+        With a `key`, the days of the stored history that are still right are
+        reused, and the updated history is stored again.
+        """
+        engine = NetworthEngine(self.ledger, "USD")
+        base = (
+            engine.account_mask(INVESTMENT_PREFIX)
+            if investments
+            else np.ones(len(engine.numbers), dtype=bool)
+        )
+        filtered = {
+            name: subset.mask(self.ledger.postings, self.ledger.accounts)
+            for name, subset in subsets.items()
+            if isinstance(subset, PostingSelector)
+        }
+        functions = {
+            name: subset
+            for name, subset in subsets.items()
+            if subset is not None and not isinstance(subset, PostingSelector)
+        }
+        if functions:
+            filtered.update(engine.posting_masks(functions))
+        masks = {name: base & filtered.get(name, True) for name in subsets}
+
+        if key is None:
+            return engine.value_many(days, masks)
+        return self._update_history(engine, masks, days, key)
+
+    def _update_history(
+        self,
+        engine: NetworthEngine,
+        masks: Mapping[str, np.ndarray],
+        days: Sequence[datetime.date],
+        key: str,
+    ) -> dict[str, pd.DataFrame]:
+        """
+        Value the days missing from the stored history, and store the result.
 
-        return pd_balance
+        If the ledger has the fingerprint the history was valued with, every
+        stored row is still right. Otherwise stored rows are kept until the
+        first day whose digest changed since they were valued. The rest of the
+        days are valued and appended.
+        """
+        store = NetworthHistoryStore(self.ledger.config.cache_dir)  # type: ignore[]
+        ledger_path = os.path.abspath(self.ledger.path)  # noqa: PTH100
+        fingerprint = self.ledger.fingerprint
+        dates = pd.to_datetime(pd.Series(days))
+
+        cached = store.load(ledger_path, key)
+        if cached is not None and set(cached.history["subset"]) != set(masks):
+            cached = None
+        kept = pd.DataFrame()
+        if cached is None:
+            digests = engine.day_digests()
+        elif cached.fingerprint == fingerprint:
+            # Only days after the last build can be missing. Digests of days
+            # not in the stored ones count as changed, so they can be reused.
+            digests = cached.digests
+            kept = cached.history[cached.history["date"].isin(dates)]
+        else:
+            digests = engine.day_digests()
+            changed = first_changed_day(cached.digests, digests)
+            kept = cached.history[cached.history["date"].isin(dates)]
+            if changed is not None:
+                limit = pd.Timestamp(datetime.date.fromordinal(changed))
+                kept = kept[kept["date"] < limit]
+        done = dates.isin(kept["date"]).to_numpy() if len(kept) else [False] * len(days)
+        missing = [day for day, skip in zip(days, done) if not skip]
+        logger.debug("Valuing %s of %s days of net worth.", len(missing), len(days))
+        valued = engine.value_many(missing, masks)
+
+        histories = {
+            name: pd.concat(
+                [
+                    kept[kept["subset"] == name].drop(columns="subset"),
+                    valued[name],
+                ],
+                ignore_index=True,
+            )
+            .sort_values("date")
+            .reset_index(drop=True)
+            if len(kept)
+            else valued[name]
+            for name in masks
+        }
+
+        if missing or cached is None or cached.fingerprint != fingerprint:
+            history = pd.concat(
+                [frame.assign(subset=name) for name, frame in histories.items()],
+                ignore_index=True,
+            )
+            store.store(ledger_path, key, CachedHistory(digests, history, fingerprint))
+        return histories
 
     # @st.cache_data(
     #     hash_funcs={
@@ -339,7 +324,8 @@ class NetworthHistoryDataset(Dataset):
         self,
         *,
         investments: bool = False,
-        filter_func: Callable | None = None,
+        filter_func: PostingSelector | Callable | None = None,
+        resolution: Resolution = "daily",
         **kwargs,
     ) -> pd.DataFrame:
         """
@@ -348,95 +334,20 @@ class NetworthHistoryDataset(Dataset):
         Args:
         ----
             investments (bool): Whether to include investment accounts.
-            filter_func (Callable): A filter function to apply to the postings.
+            filter_func (PostingSelector | Callable): The postings to include,
+                as a selector or a filter function.
+            resolution (Resolution): Which days to value: `daily`, `weekly`,
+                `month_end` or `quarter_end`.
 
         """
-        return self.build_timeseries(investments=investments, filter_func=filter_func)
+        return self.build_timeseries(
+            investments=investments, filter_func=filter_func, resolution=resolution
+        )
 
 
-def networth_hash(ledger: Ledger) -> int:
+def networth_hash(ledger: Ledger) -> str:
     """
     Return the hash of the ledger file.
     """
-    return hash(frozenset([hash(ledger)]))
-
-
-def project_missing_currencies(
-    price_map: prices.PriceMap,
-    date: datetime.date,
-    currencies: Set[Currency],
-    target_currency: Currency,
-) -> prices.PriceMap:
-    """
-    Project missing currencies to convert `commodities` to `target_currency`.
-
-    We want to convert `currencies` to the currency `target_currency`, but the
-    price_map may not contain all the necessary prices. For example, TWD has
-    prices in USD, but we want to convert to CAD. TWD being a currency, it
-    doesn't have a cost, so routines that convert from cost (e.g.,
-    convert.get_value()) will not do their job. What we need to do is convert
-    TWD to CAD via USD. The way we do this is by "projecting" the TWD/USD prices
-    to TWD/CAD via USD/CAD. This is done iva prices.project().
-
-    We don't want to project any more prices than we need to, howerver. This
-    routine is very conservative and automatically finds the subset of
-    commodities which will require projection, and automatically infers through
-    which currencies it has the opportunity to project.
-
-    Note that this function does not use date/time; if no rates are available to
-    at the date required for conversion, the projection will have no effect.
-    Therefore, projecting in this way does not guarantee that projection will
-    completely success using the returned price map (you should assert). If it
-    fails to do so, the solution is to ensure that the ledger contains all
-    necessary prices.
-
-    Args:
-    ----
-      price_map: The original price map to probe.
-      date: The date at which to convert.
-      currencies: The set of currencies you'd like to eventually convert, the
-        subject of conversion.
-      target_currency: The target currency to which you'd like to convert them.
-
-    Returns:
-    -------
-      An updated price map containing projections to make this possible.
-
-    """
-
-    # Get a dictionary of which currency is priced in which other.
-    priced_currencies = collections.defaultdict(set)
-    for base, quote in price_map.keys():
-        priced_currencies[base].add(quote)
-
-    # Get a list of the currencies which have prices to the target currency.
-    # This works partly because price maps are symmetrical (e.g., "USD" will
-    # have all the currencies that are converted to it).
-    available_currencies = priced_currencies[target_currency]
-
-    # For all those remaining commodities, ensure that rates exist to
-    # convert by value to the target currency, by projecting through
-    # an available price conversion.
-    projections = collections.defaultdict(list)
-    for pos_currency in currencies:
-        rate_date, rate = prices.get_price(
-            price_map, (pos_currency, target_currency), date
-        )
-        if rate is None:
-            # Find the available prices for this position.
-            quote_currencies = priced_currencies[pos_currency]
-            inter_currencies = available_currencies & quote_currencies
-            for inter_currency in inter_currencies:
-                projections[inter_currency].append(pos_currency)
-
-    # Apply the projections.
-    proj_price_map = price_map
-    for inter_currency, commodities in projections.items():
-        proj_price_map = prices.project(
-            proj_price_map,
-            inter_currency,
-            target_currency,
-            commodities,  # type: ignore[]
-        )
+    return ledger.fingerprint
 
-    return proj_price_map
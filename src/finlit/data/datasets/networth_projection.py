@@ -3,7 +3,7 @@ Module that contains the NetworthTrajectoryDataset class.
 """
 
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from logging import getLogger
 from typing import Tuple
 
@@ -11,6 +11,7 @@ import numpy as np
 import numpy_financial as npf
 import pandas as pd
 import streamlit as st
+from beancount.core import convert, data, inventory
 from dateutil import rrule
 from dateutil.relativedelta import relativedelta
 
@@ -130,13 +131,6 @@ class NetworthTrajectoryDataset(Dataset):
             )
         )
 
-    def _run_query(self, query: str) -> float:
-        _, res = self.ledger.run_query(query)
-        try:
-            return float(res[0][0].get_only_position().units.number)  # type: ignore # noqa: PGH003
-        except IndexError:
-            return 0.0
-
     def networth_series(self) -> pd.DataFrame:
         """
         Return the networth series.
@@ -152,14 +146,35 @@ class NetworthTrajectoryDataset(Dataset):
 
         series: list[Tuple[date, float]] = []
 
+        # Same as summing CONVERT(VALUE(POSITION, d), 'USD', d) over the assets
+        # and liabilities postings dated up to d, but the holdings are carried
+        # from month to month and only the new entries are visited.
+        accounts = self.ledger.accounts
+        balance_ids = [accounts.of_type("Assets"), accounts.of_type("Liabilities")]
+        price_map = self.ledger.price_map
+        holdings = inventory.Inventory()
+        previous_date = None
+
         for period in periods:
-            query = f"""
-                SELECT SUM(CONVERT(VALUE(POSITION, DATE('{period.date()}')), 'USD', DATE('{period.date()}'))) AS amount_usd
-                WHERE DATE <= DATE('{period.date()}')
-                    AND Account ~ '^Assets|^Liabilities'
-                """
-            amount = self._run_query(query)
-            series.append((period, amount))
+            period_date = period.date()
+            next_date = period_date + timedelta(days=1)
+            for entry in data.filter_txns(
+                self.ledger.entries_between(previous_date, next_date)
+            ):
+                for posting in entry.postings:
+                    account_id = accounts.ids[posting.account]
+                    if any(account_id in ids for ids in balance_ids):
+                        holdings.add_position(posting)
+            previous_date = next_date
+
+            amount = inventory.Inventory()
+            for position in holdings:
+                value = convert.get_value(position, price_map, period_date)
+                amount.add_amount(
+                    convert.convert_amount(value, "USD", price_map, period_date)
+                )
+            usd = amount.get_currency_units("USD").number
+            series.append((period, float(usd)))
 
         return pd.DataFrame(series, columns=["date", "net_worth"])
 
@@ -353,4 +368,4 @@ def networth_hash(ledger: Ledger, params: TrajectoryParams) -> int:
     """
     Return the hash of the ledger file.
     """
-    return hash(frozenset([hash(ledger), hash(params)]))
+    return hash((ledger.fingerprint, hash(params)))
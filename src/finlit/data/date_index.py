@@ -0,0 +1,120 @@
+"""
+Date index over the sorted entries of a ledger.
+
+Loaded entries are sorted by date, so the entries of any date range are a
+contiguous slice that can be found with a binary search. The slices are
+returned as views over the entries, without copying them.
+"""
+
+import bisect
+import datetime
+from array import array
+from collections.abc import Iterator, Sequence
+from typing import Any, overload
+
+from finlit.data.compact import CompactEntries
+
+
+class EntriesView(Sequence):
+    """
+    Read-only view over a contiguous slice of a list of entries.
+    """
+
+    def __init__(self, entries: Sequence[Any], start: int, stop: int) -> None:
+        """
+        View `entries[start:stop]`.
+        """
+        self._entries = entries
+        self._range = range(start, stop)
+
+    @property
+    def start(self) -> int:
+        """
+        Return the offset of the first entry of the view.
+        """
+        return self._range.start
+
+    @property
+    def stop(self) -> int:
+        """
+        Return the offset right after the last entry of the view.
+        """
+        return self._range.stop
+
+    def __len__(self) -> int:
+        """
+        Return the number of entries in the view.
+        """
+        return len(self._range)
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...  # noqa: ANN401
+
+    @overload
+    def __getitem__(self, index: slice) -> "EntriesView": ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        """
+        Return an entry, or a narrower view for slices with no step.
+        """
+        if isinstance(index, slice):
+            sliced = self._range[index]
+            if sliced.step != 1:
+                return [self._entries[i] for i in sliced]
+            return EntriesView(self._entries, sliced.start, sliced.stop)
+        return self._entries[self._range[index]]
+
+    def __iter__(self) -> Iterator[Any]:
+        """
+        Iterate over the entries of the view.
+        """
+        entries = self._entries
+        for i in self._range:
+            yield entries[i]
+
+
+class DateIndex:
+    """
+    Offsets of the entries by date.
+    """
+
+    def __init__(self, entries: Sequence[Any]) -> None:
+        """
+        Index the entries, which must be sorted by date.
+        """
+        self.entries = entries
+        # Dates are stored as ordinals; compact entries already keep them.
+        self.dates: array = (
+            entries.dates
+            if isinstance(entries, CompactEntries)
+            else array("l", (entry.date.toordinal() for entry in entries))
+        )
+
+    def offset(self, date: datetime.date | None) -> int:
+        """
+        Return the offset of the first entry dated on or after `date`.
+
+        None stands for the end of the entries.
+        """
+        if date is None:
+            return len(self.dates)
+        return bisect.bisect_left(self.dates, date.toordinal())
+
+    def between(
+        self, start: datetime.date | None, end: datetime.date | None
+    ) -> EntriesView:
+        """
+        Return the entries dated from `start` included to `end` excluded.
+
+        A None bound leaves that side of the range open.
+        """
+        lo = 0 if start is None else self.offset(start)
+        hi = self.offset(end)
+        return EntriesView(self.entries, lo, max(lo, hi))
+
+    def until(self, date: datetime.date) -> EntriesView:
+        """
+        Return the entries dated on or before `date`.
+        """
+        stop = bisect.bisect_right(self.dates, date.toordinal())
+        return EntriesView(self.entries, 0, stop)
@@ -0,0 +1,192 @@
+"""
+Entry-level differences between two snapshots of a ledger.
+
+Entries are identified by their file, line and a hash of their contents that
+ignores metadata. Entries with the same contents in both snapshots are
+unchanged, even if they moved to another line. Among the rest, an old and a
+new entry at the same file and line are a change, and so are the ones left in
+the same file with the same type and date, since lines shift when something is
+edited above them. The others were removed or added.
+"""
+
+import datetime
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from typing import Any, NamedTuple
+
+from beancount.core import compare, data, getters
+
+
+class EntryKey(NamedTuple):
+    """
+    Stable identity of an entry.
+    """
+
+    filename: str
+    lineno: int
+    content_hash: str
+
+
+def entry_key(entry: Any) -> EntryKey:  # noqa: ANN401
+    """
+    Return the identity of an entry.
+    """
+    meta = entry.meta or {}
+    return EntryKey(
+        meta.get("filename", ""),
+        meta.get("lineno", 0),
+        compare.hash_entry(entry, exclude_meta=True),
+    )
+
+
+def entry_currencies(entry: Any) -> set[str]:  # noqa: ANN401
+    """
+    Return every currency an entry refers to.
+    """
+    currencies: set[str] = set()
+    if isinstance(entry, data.Transaction):
+        for posting in entry.postings:
+            for amount in (posting.units, posting.cost, posting.price):
+                currency = getattr(amount, "currency", None)
+                if isinstance(currency, str):
+                    currencies.add(currency)
+    elif isinstance(entry, data.Price):
+        currencies.update((entry.currency, entry.amount.currency))
+    elif isinstance(entry, data.Balance):
+        currencies.add(entry.amount.currency)
+    elif isinstance(entry, data.Open):
+        currencies.update(entry.currencies or ())
+    elif isinstance(entry, data.Commodity):
+        currencies.add(entry.currency)
+    return currencies
+
+
+@dataclass(frozen=True)
+class LedgerDiff:
+    """
+    Differences between an older and a newer snapshot of a ledger.
+
+    Attributes
+    ----------
+        added: Entries only in the newer snapshot.
+        removed: Entries only in the older snapshot.
+        changed: Pairs of old and new versions of the same entry.
+        accounts: Accounts referred to by any of the entries above.
+        currencies: Currencies referred to by any of the entries above.
+        date_range: First and last date of the entries above, or None.
+
+    """
+
+    added: tuple[Any, ...]
+    removed: tuple[Any, ...]
+    changed: tuple[tuple[Any, Any], ...]
+    accounts: frozenset[str]
+    currencies: frozenset[str]
+    date_range: tuple[datetime.date, datetime.date] | None
+
+    @property
+    def is_empty(self) -> bool:
+        """
+        Return whether both snapshots hold the same entries.
+        """
+        return not (self.added or self.removed or self.changed)
+
+    @property
+    def first_date(self) -> datetime.date | None:
+        """
+        Return the earliest date affected, from which derived data is stale.
+        """
+        return self.date_range[0] if self.date_range is not None else None
+
+
+EMPTY_DIFF = LedgerDiff((), (), (), frozenset(), frozenset(), None)
+
+
+def _affected(
+    entries: Iterable[Any],
+) -> tuple[frozenset[str], frozenset[str], tuple[datetime.date, datetime.date] | None]:
+    """
+    Return the accounts, currencies and date range of the entries.
+    """
+    accounts: set[str] = set()
+    currencies: set[str] = set()
+    dates: list[datetime.date] = []
+    for entry in entries:
+        accounts.update(getters.get_entry_accounts(entry))
+        currencies.update(entry_currencies(entry))
+        dates.append(entry.date)
+    date_range = (min(dates), max(dates)) if dates else None
+    return frozenset(accounts), frozenset(currencies), date_range
+
+
+def diff_entries(
+    old_entries: Sequence[Any],
+    old_keys: Sequence[EntryKey],
+    new_entries: Sequence[Any],
+    new_keys: Sequence[EntryKey],
+) -> LedgerDiff:
+    """
+    Return the differences between two lists of entries and their keys.
+    """
+    # Match unchanged entries by contents first, wherever they are.
+    unmatched_old: dict[str, list[int]] = defaultdict(list)
+    for index, key in enumerate(old_keys):
+        unmatched_old[key.content_hash].append(index)
+
+    new_only: list[int] = []
+    for index, key in enumerate(new_keys):
+        candidates = unmatched_old.get(key.content_hash)
+        if candidates:
+            candidates.pop()
+        else:
+            new_only.append(index)
+    old_only = sorted(i for indexes in unmatched_old.values() for i in indexes)
+
+    # What's left at the same position changed; the rest came or went. Plugins
+    # may create several entries with the metadata of a single line.
+    old_at: dict[tuple[str, int], list[int]] = defaultdict(list)
+    for index in reversed(old_only):
+        old_at[(old_keys[index].filename, old_keys[index].lineno)].append(index)
+
+    changed: list[tuple[Any, Any]] = []
+    added: list[Any] = []
+    for index in new_only:
+        key = new_keys[index]
+        candidates = old_at.get((key.filename, key.lineno)) if key.lineno else None
+        if candidates:
+            changed.append((old_entries[candidates.pop()], new_entries[index]))
+        else:
+            added.append(new_entries[index])
+
+    # Edits above an entry move it to another line; pair what's left by file,
+    # type and date, in order.
+    old_by_day: dict[tuple[str, type, datetime.date], list[int]] = defaultdict(list)
+    for index in sorted(i for indexes in old_at.values() for i in indexes):
+        entry = old_entries[index]
+        old_by_day[(old_keys[index].filename, type(entry), entry.date)].append(index)
+
+    still_added: list[Any] = []
+    for entry in added:
+        candidates = old_by_day.get(
+            ((entry.meta or {}).get("filename", ""), type(entry), entry.date)
+        )
+        if candidates:
+            changed.append((old_entries[candidates.pop(0)], entry))
+        else:
+            still_added.append(entry)
+    added = still_added
+
+    left = sorted(i for indexes in old_by_day.values() for i in indexes)
+    removed = [old_entries[i] for i in left]
+
+    affected = [*added, *removed, *(e for pair in changed for e in pair)]
+    accounts, currencies, date_range = _affected(affected)
+    return LedgerDiff(
+        tuple(added),
+        tuple(removed),
+        tuple(changed),
+        accounts,
+        currencies,
+        date_range,
+    )
@@ -0,0 +1,203 @@
+"""
+DuckDB query engine over the postings table.
+
+This is an alternative to BQL for queries that only look at postings. The
+table is exposed as the `postings` table (see `finlit.data.postings`, plus
+`year` and `month` columns) and the BQL functions the datasets rely on are
+available as macros or UDFs:
+
+- `ROOT(account, n)` and `LEAF(account)`, as in BQL.
+- `NUMBER(x)`, which is the identity since numbers are plain columns.
+- `MATCHES(account, pattern)`, the regex search done by BQL's `~`.
+- `CONVERT(number, currency, target, date)`, the market value of an amount.
+- `CONVERT_POSITION(number, currency, cost_currency, target, date)`, like
+  BQL's `CONVERT(POSITION, target, date)`, implying the rate through the cost
+  currency when there's no direct one.
+- `VALUE(number, currency, cost_currency, target, date)`, like BQL's
+  `CONVERT(VALUE(POSITION, date), target, date)`.
+
+Unlike BQL, the conversions return NULL when there's no rate, instead of
+leaving the amount in its original currency. Rates come from the daily price
+matrix of the ledger (see `finlit.data.price_matrix`), so each UDF call
+converts a whole batch of rows with array lookups.
+"""
+
+import threading
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from duckdb.typing import DATE, DOUBLE, VARCHAR
+
+from finlit.data.price_matrix import PriceMatrix
+
+MACROS = [
+    "CREATE MACRO root(account, n) AS "
+    "array_to_string(string_split(account, ':')[1:n], ':')",
+    "CREATE MACRO leaf(account) AS string_split(account, ':')[-1]",
+    "CREATE MACRO number(x) AS x",
+    "CREATE MACRO matches(account, pattern) AS regexp_matches(account, pattern)",
+]
+
+
+def _numbers(array: pa.Array) -> np.ndarray:
+    """
+    Return a column of numbers as floats, NaN where NULL.
+    """
+    return array.to_numpy(zero_copy_only=False).astype(float)
+
+
+def _strings(array: pa.Array) -> np.ndarray:
+    """
+    Return a column of strings as an object array, None where NULL.
+    """
+    return array.to_numpy(zero_copy_only=False).astype(object)
+
+
+def _dates(array: pa.Array) -> np.ndarray:
+    """
+    Return a column of dates as datetime64 days, NaT where NULL.
+    """
+    return array.to_numpy(zero_copy_only=False).astype("datetime64[D]")
+
+
+def _doubles(values: np.ndarray) -> pa.Array:
+    """
+    Return the results of a function as a DOUBLE column, NULL where NaN.
+
+    The Arrow array shares the buffer of the NumPy array, which it keeps alive
+    until DuckDB releases it.
+    """
+    return pa.array(values, type=pa.float64(), mask=np.isnan(values))
+
+
+class DuckDBEngine:
+    """
+    Run SQL over the postings of a ledger with DuckDB.
+    """
+
+    def __init__(self, postings: pa.Table, price_matrix: PriceMatrix) -> None:
+        """
+        Register the postings table, the macros and the conversion functions.
+        """
+        self.price_matrix = price_matrix
+        self._lock = threading.Lock()
+
+        # Registered Arrow tables are only visible to the connection itself, not
+        # to its cursors, so the postings are copied into a DuckDB table.
+        self._connection = duckdb.connect()
+        self._connection.register("postings_arrow", postings)
+        self._connection.execute(
+            """
+            CREATE TABLE postings AS
+            SELECT *, year(date) AS year, month(date) AS month
+            FROM postings_arrow
+            """
+        )
+        self._connection.unregister("postings_arrow")
+        for macro in MACROS:
+            self._connection.execute(macro)
+
+        self._connection.create_function(
+            "convert",
+            self._convert,
+            [DOUBLE, VARCHAR, VARCHAR, DATE],  # type: ignore[]
+            DOUBLE,  # type: ignore[]
+            type="arrow",  # type: ignore[]
+            null_handling="special",  # type: ignore[]
+        )
+        self._connection.create_function(
+            "convert_position",
+            self._convert_position,
+            [DOUBLE, VARCHAR, VARCHAR, VARCHAR, DATE],  # type: ignore[]
+            DOUBLE,  # type: ignore[]
+            type="arrow",  # type: ignore[]
+            null_handling="special",  # type: ignore[]
+        )
+        self._connection.create_function(
+            "value",
+            self._value,
+            [DOUBLE, VARCHAR, VARCHAR, VARCHAR, DATE],  # type: ignore[]
+            DOUBLE,  # type: ignore[]
+            type="arrow",  # type: ignore[]
+            null_handling="special",  # type: ignore[]
+        )
+
+    def _convert(
+        self,
+        numbers: pa.Array,
+        currencies: pa.Array,
+        targets: pa.Array,
+        dates: pa.Array,
+    ) -> pa.Array:
+        """
+        Convert amounts with the direct rate only.
+        """
+        converted = self.price_matrix.convert(
+            _numbers(numbers),
+            _strings(currencies),
+            _strings(targets),
+            _dates(dates),
+        )
+        return _doubles(converted)
+
+    def _convert_position(  # noqa: PLR0913
+        self,
+        numbers: pa.Array,
+        currencies: pa.Array,
+        cost_currencies: pa.Array,
+        targets: pa.Array,
+        dates: pa.Array,
+    ) -> pa.Array:
+        """
+        Convert positions, implying the rate through their cost currency.
+        """
+        converted = self.price_matrix.convert(
+            _numbers(numbers),
+            _strings(currencies),
+            _strings(targets),
+            _dates(dates),
+            via=_strings(cost_currencies),
+        )
+        return _doubles(converted)
+
+    def _value(  # noqa: PLR0913
+        self,
+        numbers: pa.Array,
+        currencies: pa.Array,
+        cost_currencies: pa.Array,
+        targets: pa.Array,
+        dates: pa.Array,
+    ) -> pa.Array:
+        """
+        Convert the market value of positions held at cost.
+
+        Positions held at cost are first valued in their cost currency at the
+        given date, and that value is then converted with the direct rate.
+        """
+        values = _numbers(numbers)
+        value_currencies = _strings(currencies)
+        cost_currencies = _strings(cost_currencies)
+        days = _dates(dates)
+
+        market_rates = self.price_matrix.lookup(value_currencies, cost_currencies, days)
+        priced = ~np.isnan(market_rates)
+        values[priced] *= market_rates[priced]
+        value_currencies[priced] = cost_currencies[priced]
+
+        converted = self.price_matrix.convert(
+            values, value_currencies, _strings(targets), days
+        )
+        return _doubles(converted)
+
+    def query(self, sql: str) -> pd.DataFrame:
+        """
+        Run the query and return the result as a DataFrame.
+
+        The engine can be shared between threads, but queries run one at a
+        time: DuckDB calling the conversion functions of several queries at
+        once can deadlock on the GIL.
+        """
+        with self._lock:
+            return self._connection.cursor().sql(sql).df()
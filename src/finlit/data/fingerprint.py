@@ -0,0 +1,179 @@
+"""
+Content stamps of the files that make up a ledger.
+
+The stamps only cover the files that were read. Include directives are globs,
+so a new file matching one of them is part of the ledger too; the includes are
+recorded with the files they matched, and expanded again to notice it.
+"""
+
+import glob
+import hashlib
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+CHUNK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class FileStamp:
+    """
+    Identity of an included file at the time it was read.
+    """
+
+    path: str
+    size: int
+    mtime_ns: int
+    digest: str
+
+
+@dataclass(frozen=True)
+class IncludeGlob:
+    """
+    An include directive of a file, with the files it matched.
+    """
+
+    directory: str
+    pattern: str
+    matches: tuple[str, ...]
+
+
+def expand_include(directory: str, pattern: str) -> list[str]:
+    """
+    Return the absolute paths matched by an include pattern, in glob order.
+
+    Relative patterns are relative to `directory`, the one of the including
+    file, as in beancount.
+    """
+    matched = glob.glob(pattern, root_dir=directory, recursive=True)  # noqa: PTH207
+    return [os.path.normpath(os.path.join(directory, path)) for path in matched]  # noqa: PTH118
+
+
+def include_glob(directory: str, pattern: str, matches: Iterable[str]) -> IncludeGlob:
+    """
+    Return the record of an include directive and the files it matched.
+    """
+    return IncludeGlob(directory, pattern, tuple(sorted(matches)))
+
+
+def refresh_includes(includes: list[IncludeGlob]) -> list[IncludeGlob]:
+    """
+    Return the include directives with the files they match now.
+    """
+    return [
+        include_glob(
+            include.directory,
+            include.pattern,
+            expand_include(include.directory, include.pattern),
+        )
+        for include in includes
+    ]
+
+
+def includes_current(includes: list[IncludeGlob]) -> bool:
+    """
+    Return True if every include directive still matches the same files.
+    """
+    return refresh_includes(includes) == includes
+
+
+def file_digest(path: str) -> str:
+    """
+    Return the SHA-256 of the raw bytes of the file.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:  # noqa: PTH123
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def stamp_file(path: str, previous: FileStamp | None = None) -> FileStamp | None:
+    """
+    Stamp the file, or return None if it no longer exists.
+
+    If `previous` has the same size and modification time the file is not read
+    again and its digest is reused.
+    """
+    try:
+        stat = os.stat(path)  # noqa: PTH116
+    except FileNotFoundError:
+        return None
+
+    if (
+        previous is not None
+        and previous.size == stat.st_size
+        and previous.mtime_ns == stat.st_mtime_ns
+    ):
+        return previous
+
+    return FileStamp(path, stat.st_size, stat.st_mtime_ns, file_digest(path))
+
+
+def stamp_files(paths: list[str]) -> list[FileStamp]:
+    """
+    Stamp every existing file in `paths`, sorted by path.
+    """
+    stamps = (stamp_file(path) for path in sorted(paths))
+    return [stamp for stamp in stamps if stamp is not None]
+
+
+def stamps_current(stamps: list[FileStamp]) -> bool:
+    """
+    Return True if none of the stamped files changed on disk.
+
+    A file whose size or modification time changed is hashed again, so touching
+    a file without editing it still counts as unchanged.
+    """
+    for stamp in stamps:
+        current = stamp_file(stamp.path, stamp)
+        if current is None or current.digest != stamp.digest:
+            return False
+    return True
+
+
+def refresh_stamps(
+    stamps: list[FileStamp], includes: Iterable[IncludeGlob] = ()
+) -> list[FileStamp]:
+    """
+    Return up to date stamps for the same files, dropping the ones that are gone.
+
+    Only the files whose size or modification time changed are read again. The
+    files matched by `includes` that weren't stamped yet are stamped too.
+    """
+    refreshed = (stamp_file(stamp.path, stamp) for stamp in stamps)
+    current = [stamp for stamp in refreshed if stamp is not None]
+    known = {stamp.path for stamp in stamps}
+    new = {path for include in includes for path in include.matches} - known
+    return current + stamp_files(list(new))
+
+
+def fingerprint(
+    stamps: list[FileStamp],
+    variant: str = "",
+    includes: Iterable[IncludeGlob] = (),
+) -> str:
+    """
+    Combine the stamps of the included files into a single content fingerprint.
+
+    Only paths and content digests take part, so touching a file doesn't change
+    the fingerprint but editing any included file does. The files matched by
+    every include directive take part too, so a new file matching one does as
+    well. Ledgers loaded from the same files with settings that change the
+    entries, e.g. a checkpoint, pass a different `variant`.
+    """
+    sha = hashlib.sha256()
+    for stamp in sorted(stamps, key=lambda stamp: stamp.path):
+        sha.update(stamp.path.encode())
+        sha.update(b"\0")
+        sha.update(stamp.digest.encode())
+        sha.update(b"\n")
+    for include in sorted(includes, key=lambda i: (i.directory, i.pattern)):
+        sha.update(b"include\0")
+        sha.update(f"{include.directory}\0{include.pattern}\0".encode())
+        sha.update("\0".join(include.matches).encode())
+        sha.update(b"\n")
+    if variant:
+        sha.update(b"variant\0")
+        sha.update(variant.encode())
+    return sha.hexdigest()
@@ -2,50 +2,275 @@
 Load the ledger file and store the entries, errors, and options.
 """
 
+import datetime
+import os
+from contextlib import nullcontext
+from functools import cached_property
+from pathlib import Path
 from typing import Dict, List, Tuple
 
+import pandas as pd
+import pyarrow as pa
+from beancount.core import prices
 from beancount.core.data import Directive
-from beancount.loader import LoadError, load_file
+from beancount.loader import LoadError
 from beancount.query.query import run_query
+from beancount.utils import encryption
+
+from finlit.data.accounts import AccountIndex, build_account_index
+from finlit.data.compact import CompactEntries
+from finlit.data.conversion_graph import ConversionGraph
+from finlit.data.date_index import DateIndex, EntriesView
+from finlit.data.diff import EMPTY_DIFF, EntryKey, LedgerDiff, diff_entries, entry_key
+from finlit.data.duckdb_engine import DuckDBEngine
+from finlit.data.fingerprint import (
+    FileStamp,
+    IncludeGlob,
+    fingerprint,
+    refresh_includes,
+    refresh_stamps,
+)
+from finlit.data.loader import LoaderConfig, load_ledger
+from finlit.data.postings import build_postings_table
+from finlit.data.price_matrix import PriceMatrix, load_price_matrix
+from finlit.data.profiling import LoadProfile, LoadProfiler, profile_phase
+from finlit.data.query_cache import (
+    QUERY_CACHE,
+    QueryCache,
+    copy_rows,
+    normalize_query,
+)
 
 
 class Ledger:
     """
     Returns the entries, errors, and options from the ledger file.
+
+    A ledger is immutable once loaded, since a single instance is shared between
+    pages and sessions. Its public attributes can't be reassigned and the
+    entries must not be modified in place.
     """
 
-    entries: List[Directive]
+    entries: List[Directive] | CompactEntries
     errors: List[LoadError]
     options: Dict[str, str]
+    stamps: List[FileStamp]
+    includes: List[IncludeGlob]
+    fingerprint: str
+    load_profile: LoadProfile | None
 
-    def __init__(self, ledger_path: str) -> None:
+    def __init__(
+        self,
+        ledger_path: str | Path,
+        config: LoaderConfig | None = None,
+        query_cache: QueryCache | None = None,
+    ) -> None:
         """
         Load the ledger file and store the entries, errors, and options.
+
+        Unchanged ledgers are read from the on-disk cache configured in `config`.
+        The fingerprint is computed once here, from the raw bytes of the included
+        files, the files matched by the include globs and the settings of
+        `config` that change the entries, and identifies this snapshot of the
+        ledger in every cache key.
+        Query results are memoized in `query_cache`, which defaults to the cache
+        shared by the whole process.
+
+        With `config.compact`, the entries are kept as `CompactEntries`, a
+        read-only sequence that rebuilds the directives on demand. With
+        `config.profile`, the time and allocations of each load phase are kept
+        in `load_profile`.
         """
         self.path = ledger_path
-        entries, errors, options = load_file(self.path)
+        self.config = config if config is not None else LoaderConfig()
+        self.query_cache = query_cache if query_cache is not None else QUERY_CACHE
+        profiler = LoadProfiler() if self.config.profile else None
+        with profiler if profiler is not None else nullcontext():
+            entries, errors, options, stamps, includes = load_ledger(
+                self.path, self.config, profiler
+            )
+            if self.config.compact:
+                with profile_phase(profiler, "compact"):
+                    entries = CompactEntries(entries)
 
         self.entries = entries
         self.errors = errors
         self.options = options
+        self.stamps = stamps
+        self.includes = includes
+        self.fingerprint = fingerprint(stamps, self.config.cache_variant, includes)
+        self.load_profile = profiler.report() if profiler is not None else None
+        self._disk_stamps = stamps
+        self._frozen = True
+
+    def __setattr__(self, name: str, value: object) -> None:
+        """
+        Refuse to reassign public attributes once the ledger is loaded.
+        """
+        if getattr(self, "_frozen", False) and not name.startswith("_"):
+            msg = f"Ledger is immutable; can't set {name!r}"
+            raise AttributeError(msg)
+        super().__setattr__(name, value)
+
+    def disk_fingerprint(self) -> str:
+        """
+        Return the fingerprint of the included files as they are now on disk.
+
+        Only the files that changed since the previous call are read again, and
+        the include globs are expanded again, so this is cheap when nothing was
+        edited. It differs from `fingerprint` once the ledger on disk no longer
+        matches the loaded entries, including when a new file matches a glob.
+        """
+        includes = refresh_includes(self.includes)
+        self._disk_stamps = refresh_stamps(self._disk_stamps, includes)
+        return fingerprint(self._disk_stamps, self.config.cache_variant, includes)
+
+    @cached_property
+    def accounts(self) -> AccountIndex:
+        """
+        Return the index of the accounts of the ledger, built once.
+        """
+        return build_account_index(self.entries)
+
+    @cached_property
+    def date_index(self) -> DateIndex:
+        """
+        Return the index of the entries by date, built once.
+        """
+        return DateIndex(self.entries)
+
+    def entries_between(
+        self, start: datetime.date | None, end: datetime.date | None
+    ) -> EntriesView:
+        """
+        Return a view of the entries from `start` included to `end` excluded.
+
+        A None bound leaves that side open. The view doesn't copy the entries.
+        """
+        return self.date_index.between(start, end)
+
+    def entries_until(self, date: datetime.date) -> EntriesView:
+        """
+        Return a view of the entries dated on or before `date`.
+        """
+        return self.date_index.until(date)
+
+    @cached_property
+    def postings(self) -> pa.Table:
+        """
+        Return the columnar table of every posting, built once per ledger.
+
+        See `finlit.data.postings` for the columns.
+        """
+        return build_postings_table(self.entries, self.accounts)
+
+    @cached_property
+    def encrypted(self) -> bool:
+        """
+        Return whether any included file is encrypted.
+
+        Data derived from encrypted files is never written to the on-disk caches.
+        """
+        return any(encryption.is_encrypted_file(stamp.path) for stamp in self.stamps)
+
+    @cached_property
+    def price_map(self) -> prices.PriceMap:
+        """
+        Return the price map of the ledger, built once.
+        """
+        return self.price_matrix.price_map
+
+    @cached_property
+    def price_matrix(self) -> PriceMatrix:
+        """
+        Return the forward-filled daily rates of the price map, built once.
+
+        The matrix is cached on disk by a digest of the price directives, so
+        it's only built again when the prices change. Ledgers with encrypted
+        files never write it.
+        """
+        return load_price_matrix(
+            os.path.abspath(self.path),  # noqa: PTH100
+            self.entries,
+            self.config.cache_dir,
+            persist=not self.encrypted,
+        )
+
+    @cached_property
+    def conversion_graph(self) -> ConversionGraph:
+        """
+        Return the conversion paths between the currencies of the price map.
+        """
+        return ConversionGraph(self.price_matrix)
+
+    @cached_property
+    def sql_engine(self) -> DuckDBEngine:
+        """
+        Return the DuckDB engine over the postings table.
+        """
+        return DuckDBEngine(self.postings, self.price_matrix)
 
     def run_query(
         self, query: str
     ) -> Tuple[List[Tuple[str, type]], List[Dict[str, type]]]:
         """
-        Run the query on the entries and return the result.
+        Run the BQL query on the entries and return the result.
+
+        Results are memoized by ledger fingerprint and query text; each call
+        gets its own rows and inventories. Compact entries are rebuilt into a
+        list for the duration of the query.
         """
-        return run_query(self.entries, self.options, query)
+        key = (self.fingerprint, "bql", normalize_query(query))
+        types, rows = self.query_cache.get_or_compute(
+            key, lambda: run_query(list(self.entries), self.options, query)
+        )
+        return list(types), copy_rows(types, rows)
 
-    def __hash__(self) -> int:
+    def run_sql(self, query: str) -> pd.DataFrame:
         """
-        Return the hash of the ledger file.
+        Run the SQL query with DuckDB over the postings table.
+
+        See `finlit.data.duckdb_engine` for the available tables and functions.
+        Results are memoized like in `run_query`; each call gets its own copy.
         """
-        return hash(frozenset([frozenset(str(entr) for entr in self.entries)]))
+        key = (self.fingerprint, "sql", normalize_query(query))
+        result = self.query_cache.get_or_compute(
+            key, lambda: self.sql_engine.query(query)
+        )
+        return result.copy()
 
+    @cached_property
+    def entry_keys(self) -> List[EntryKey]:
+        """
+        Return the stable identity of every entry, computed once.
 
-def ledger_hash(ledger: Ledger) -> int:
-    """
-    Return the hash of the ledger file.
-    """
-    return hash(frozenset(str(entr) for entr in ledger.entries))
+        See `finlit.data.diff` for how entries are identified.
+        """
+        return [entry_key(entry) for entry in self.entries]
+
+    def diff(self, previous: "Ledger") -> LedgerDiff:
+        """
+        Return the entries added, removed and changed since `previous`.
+
+        The diff also tells which accounts, currencies and dates were affected,
+        so derived data only needs to be updated from `diff.first_date` on.
+        """
+        if previous.fingerprint == self.fingerprint:
+            return EMPTY_DIFF
+        return diff_entries(
+            previous.entries, previous.entry_keys, self.entries, self.entry_keys
+        )
+
+    def __hash__(self) -> int:
+        """
+        Return the hash of the ledger contents.
+        """
+        return hash(self.fingerprint)
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Two ledgers are equal when they were loaded from the same contents.
+        """
+        if not isinstance(other, Ledger):
+            return NotImplemented
+        return self.fingerprint == other.fingerprint
@@ -0,0 +1,463 @@
+"""
+Loading pipeline used by the Ledger.
+
+It follows the same steps as `beancount.loader.load_file`: parse the include
+tree, book, run the plugins and validate. Parsing works file by file, so that
+when only some included files changed, the parser output of the others is
+reused and only booking, plugins and validation run over the whole ledger.
+The files that do need parsing can be parsed in parallel worker processes;
+their directives are merged in the same order as a sequential load.
+
+Reusing parsed directives relies on booking and plugins returning new entries
+instead of modifying the ones they receive, which is the beancount convention.
+"""
+
+import copy
+import datetime
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from logging import getLogger
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from beancount.core import data
+from beancount.loader import (
+    LoadError,
+    aggregate_options_map,
+    compute_input_hash,
+    run_transformations,
+)
+from beancount.ops import validation
+from beancount.parser import booking, parser
+from beancount.parser import options as beancount_options
+from beancount.utils import encryption
+
+from finlit.data import checkpoint
+from finlit.data.cache import (
+    CachedLedger,
+    Checkpoint,
+    CheckpointStore,
+    LedgerCache,
+    ParseCache,
+    ParsedFile,
+    default_cache_dir,
+)
+from finlit.data.fingerprint import (
+    FileStamp,
+    IncludeGlob,
+    expand_include,
+    include_glob,
+)
+from finlit.data.price_compaction import compact_prices
+from finlit.data.profiling import LoadProfiler, profile_phase
+
+logger = getLogger()
+
+
+@dataclass(frozen=True)
+class LoaderConfig:
+    """
+    Options that control how a ledger is loaded.
+
+    Attributes
+    ----------
+        cache_dir: Directory for the on-disk ledger cache, or None to disable it.
+        incremental: Reuse the parser output of included files that didn't change.
+            It's read back from `cache_dir`, or from memory with `keep_parsed`.
+        keep_parsed: With `incremental`, also keep the parser output of every
+            included file in memory, trading memory for faster reloads.
+        workers: Number of processes that parse files, or None for one per CPU.
+            With 1, every file is parsed in the calling process.
+        compact: Keep the entries of the ledger serialized and rebuild the
+            directives on demand, trading speed for memory.
+        profile: Record the wall time and allocations of every load phase.
+        checkpoint: Replace the entries before this date with a snapshot of the
+            balances at that date, or None to load every entry.
+        compact_prices: Drop the prices that don't change any valuation, i.e.
+            all but the last quote of a day and quotes that repeat the rate.
+        monthly_prices_before: With `compact_prices`, only keep the last quote
+            of each month before this date.
+
+    """
+
+    cache_dir: Path | None = field(default_factory=default_cache_dir)
+    incremental: bool = True
+    keep_parsed: bool = False
+    workers: int | None = 1
+    compact: bool = False
+    profile: bool = False
+    checkpoint: datetime.date | None = None
+    compact_prices: bool = False
+    monthly_prices_before: datetime.date | None = None
+
+    @property
+    def cache_variant(self) -> str:
+        """
+        Return the ledger cache variant of the settings that change the entries.
+        """
+        parts = []
+        if self.checkpoint is not None:
+            parts.append(f"checkpoint-{self.checkpoint}")
+        if self.compact_prices:
+            parts.append("prices")
+            if self.monthly_prices_before is not None:
+                parts.append(f"monthly-{self.monthly_prices_before}")
+        return "-".join(parts)
+
+
+class LoadResult(NamedTuple):
+    """
+    The loaded ledger, the stamps of the files it was read from and its includes.
+    """
+
+    entries: list[Any]
+    errors: list[Any]
+    options: dict[str, Any]
+    stamps: list[FileStamp]
+    includes: list[IncludeGlob]
+
+
+_parse_caches: dict[tuple[Path | None, bool], ParseCache] = {}
+_parse_caches_lock = threading.Lock()
+
+
+def get_parse_cache(cache_dir: Path | None, *, in_memory: bool = False) -> ParseCache:
+    """
+    Return the process-wide parse cache for `cache_dir`.
+    """
+    key = (cache_dir, in_memory)
+    with _parse_caches_lock:
+        if key not in _parse_caches:
+            _parse_caches[key] = ParseCache(cache_dir, in_memory=in_memory)
+        return _parse_caches[key]
+
+
+def parse_source(path: str) -> ParsedFile:
+    """
+    Parse a single file, stamping exactly the bytes that were parsed.
+    """
+    with open(path, "rb") as file:  # noqa: PTH123
+        stat = os.fstat(file.fileno())
+        contents = file.read()
+
+    stamp = FileStamp(
+        path, stat.st_size, stat.st_mtime_ns, hashlib.sha256(contents).hexdigest()
+    )
+
+    if encryption.is_encrypted_file(path):
+        contents = encryption.read_encrypted_file(path)
+        if isinstance(contents, str):
+            contents = contents.encode()
+
+    entries, errors, options = parser.parse_file(
+        io.BytesIO(contents), report_filename=path
+    )
+    return ParsedFile(stamp, entries, errors, options)
+
+
+def _parse_files(
+    paths: list[str], parse_cache: ParseCache | None, workers: int | None
+) -> list[ParsedFile]:
+    """
+    Return the parser output of the files, in the same order as `paths`.
+
+    Files found in the parse cache aren't parsed again. The others are parsed
+    by a pool of `workers` processes when there's more than one of them.
+    """
+    parsed: dict[str, ParsedFile] = {}
+    if parse_cache is not None:
+        for path in paths:
+            stamp = parse_cache.stamp(path)
+            cached = parse_cache.get(stamp) if stamp is not None else None
+            if cached is not None:
+                parsed[path] = cached
+
+    missing = [path for path in paths if path not in parsed]
+    for path in missing:
+        logger.debug("Parsing %s.", path)
+
+    if len(missing) > 1 and workers != 1:
+        max_workers = min(len(missing), workers or os.cpu_count() or 1)
+        # Forking a process with other threads, like the Streamlit server and
+        # the ledger watcher, can copy locks they hold and deadlock the child.
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            parsed.update(zip(missing, pool.map(parse_source, missing)))
+    else:
+        parsed.update((path, parse_source(path)) for path in missing)
+
+    if parse_cache is not None:
+        for path in missing:
+            # Decrypted contents never leave memory.
+            parse_cache.put(
+                parsed[path], persist=not encryption.is_encrypted_file(path)
+            )
+
+    return [parsed[path] for path in paths]
+
+
+def _expand_includes(
+    parsed: ParsedFile,
+) -> tuple[list[str], list[LoadError], list[IncludeGlob]]:
+    """
+    Return the absolute paths included by a parsed file, and its includes.
+    """
+    cwd = os.path.dirname(parsed.stamp.path)  # noqa: PTH120
+    paths: list[str] = []
+    errors: list[LoadError] = []
+    includes: list[IncludeGlob] = []
+    for pattern in parsed.options["include"]:
+        matched = expand_include(cwd, pattern)
+        if not matched:
+            errors.append(
+                LoadError(
+                    data.new_metadata("<load>", 0),
+                    f'File glob "{pattern}" does not match any files',
+                    None,
+                )
+            )
+        paths.extend(matched)
+        includes.append(include_glob(cwd, pattern, matched))
+    return paths, errors, includes
+
+
+def parse_tree(
+    ledger_path: str, parse_cache: ParseCache | None, workers: int | None = 1
+) -> LoadResult:
+    """
+    Parse the ledger and its includes, in the same order as beancount does.
+
+    Return the unsorted entries, the parse errors, the options of the top-level
+    file merged with the ones of the includes, the stamps of every file and the
+    include directives of every file with the files they matched.
+
+    Beancount reads the include tree breadth first, so the files are parsed one
+    level at a time, which lets the files of a level be parsed in parallel. The
+    results are then merged in the order a sequential load would visit them.
+    """
+    entries: list[Any] = []
+    errors: list[Any] = []
+    options: dict[str, Any] | None = None
+    stamps: list[FileStamp] = []
+    includes: list[IncludeGlob] = []
+
+    level = [os.path.normpath(ledger_path)]
+    seen: set[str] = set()
+    while level:
+        # Decide which paths are parsed before parsing any of them, so that the
+        # errors come out in the same order as with a sequential load.
+        level_errors: dict[int, LoadError] = {}
+        to_parse: list[str] = []
+        for position, path in enumerate(level):
+            if path in seen:
+                level_errors[position] = LoadError(
+                    data.new_metadata("<load>", 0),
+                    f'Duplicate filename parsed: "{path}"',
+                    None,
+                )
+            elif not os.path.exists(path):  # noqa: PTH110
+                level_errors[position] = LoadError(
+                    data.new_metadata("<load>", 0),
+                    f'File "{path}" does not exist',
+                    None,
+                )
+            else:
+                seen.add(path)
+                to_parse.append(path)
+
+        parsed_files = iter(_parse_files(to_parse, parse_cache, workers))
+        next_level: list[str] = []
+        for position in range(len(level)):
+            if position in level_errors:
+                errors.append(level_errors[position])
+                continue
+
+            parsed = next(parsed_files)
+            stamps.append(parsed.stamp)
+            entries.extend(parsed.entries)
+            errors.extend(parsed.errors)
+
+            # The parsed options may be shared with the parse cache; never modify
+            # them in place.
+            if options is None:
+                options = copy.deepcopy(parsed.options)
+            else:
+                aggregate_options_map(options, parsed.options)
+
+            include_paths, include_errors, file_includes = _expand_includes(parsed)
+            next_level.extend(include_paths)
+            errors.extend(include_errors)
+            includes.extend(file_includes)
+        level = next_level
+
+    if options is None:
+        options = copy.deepcopy(beancount_options.OPTIONS_DEFAULTS)
+    options["include"] = sorted(seen)
+    if parse_cache is not None:
+        parse_cache.retain(os.path.normpath(ledger_path), seen)
+
+    return LoadResult(entries, errors, options, stamps, includes)
+
+
+@contextmanager
+def _plugins(profiler: LoadProfiler | None) -> Iterator[Any]:
+    """
+    Measure the plugins; yield the `log_timings` argument of beancount.
+    """
+    if profiler is None:
+        yield None
+        return
+    with profiler.plugins() as log_timings:
+        yield log_timings
+
+
+def book_and_validate(
+    entries: list[Any],
+    errors: list[Any],
+    options: dict[str, Any],
+    profiler: LoadProfiler | None = None,
+) -> tuple[list[Any], list[Any]]:
+    """
+    Run booking, the plugins and validation over parsed entries.
+    """
+    with profile_phase(profiler, "book"):
+        entries = sorted(entries, key=data.entry_sortkey)
+        entries, booking_errors = booking.book(entries, options)
+        errors = [*errors, *booking_errors]
+
+    with _plugins(profiler) as log_timings:
+        entries, errors = run_transformations(entries, errors, options, log_timings)
+
+    with profile_phase(profiler, "validate"):
+        errors.extend(validation.validate(entries, options))
+        options["input_hash"] = compute_input_hash(options["include"])
+
+    return entries, errors
+
+
+def apply_checkpoint(  # noqa: PLR0913
+    path: str,
+    entries: list[Any],
+    errors: list[Any],
+    options: dict[str, Any],
+    stamps: list[FileStamp],
+    cutoff: datetime.date,
+    cache_dir: Path | None,
+) -> list[Any]:
+    """
+    Return the parsed entries with everything before the checkpoint summarized.
+
+    The snapshot is reused while the entries before the cut-off and the booking
+    options stay the same. Otherwise the whole ledger is booked once to compute
+    a new one, which is stored unless an included file is encrypted.
+    """
+    store = CheckpointStore(cache_dir) if cache_dir is not None else None
+    previous = store.load(path, cutoff) if store is not None else None
+
+    before, _ = checkpoint.split_entries(entries, cutoff)
+    entries_digest, file_digests = checkpoint.digest_entries(
+        before, stamps, previous.file_digests if previous is not None else None
+    )
+    digest = f"{entries_digest}:{checkpoint.digest_options(options)}"
+
+    if previous is not None and previous.digest == digest:
+        snapshot = previous.entries
+    else:
+        logger.info("Computing the checkpoint of %s at %s.", path, cutoff)
+        booked, full_errors = book_and_validate(
+            list(entries), list(errors), copy.deepcopy(options)
+        )
+        if len(full_errors) > len(errors):
+            logger.warning(
+                "Booking the full ledger for the checkpoint found %s errors.",
+                len(full_errors) - len(errors),
+            )
+        snapshot = checkpoint.build_snapshot(booked, cutoff, options)
+        if store is not None and not any(
+            encryption.is_encrypted_file(stamp.path) for stamp in stamps
+        ):
+            store.store(path, Checkpoint(cutoff, digest, file_digests, snapshot))
+
+    return checkpoint.apply_snapshot(entries, snapshot, cutoff)
+
+
+def load_ledger(
+    ledger_path: str | Path,
+    config: LoaderConfig,
+    profiler: LoadProfiler | None = None,
+) -> LoadResult:
+    """
+    Load the ledger, going through the on-disk cache when it's enabled.
+
+    The phases of the load are measured with `profiler`, if given.
+    """
+    path = os.path.abspath(ledger_path)  # noqa: PTH100
+    cache = (
+        LedgerCache(config.cache_dir, config.cache_variant)
+        if config.cache_dir is not None
+        else None
+    )
+
+    if cache is not None:
+        with profile_phase(profiler, "cache_read"):
+            cached = cache.load(path)
+        if cached is not None:
+            return LoadResult(
+                cached.entries,
+                cached.errors,
+                cached.options,
+                cached.stamps,
+                cached.includes,
+            )
+
+    parse_cache = (
+        get_parse_cache(config.cache_dir, in_memory=config.keep_parsed)
+        if config.incremental
+        else None
+    )
+
+    started_ns = time.time_ns()
+    with profile_phase(profiler, "parse"):
+        entries, errors, options, stamps, includes = parse_tree(
+            path, parse_cache, config.workers
+        )
+    if config.checkpoint is not None:
+        with profile_phase(profiler, "checkpoint"):
+            entries = apply_checkpoint(
+                path,
+                entries,
+                errors,
+                options,
+                stamps,
+                config.checkpoint,
+                config.cache_dir,
+            )
+    entries, errors = book_and_validate(entries, errors, options, profiler)
+    if config.checkpoint is not None:
+        entries = checkpoint.drop_derived_prices(entries)
+    if config.compact_prices:
+        with profile_phase(profiler, "compact_prices"):
+            entries = compact_prices(entries, config.monthly_prices_before)
+
+    # A file written while we were loading may not match what was parsed, and
+    # decrypted contents are never written to disk.
+    cacheable = all(
+        stamp.mtime_ns < started_ns and not encryption.is_encrypted_file(stamp.path)
+        for stamp in stamps
+    )
+    if cache is not None and cacheable:
+        with profile_phase(profiler, "cache_write"):
+            cache.store(
+                path, CachedLedger(stamps, entries, errors, options, includes)
+            )
+
+    return LoadResult(entries, errors, options, stamps, includes)
@@ -0,0 +1,295 @@
+"""
+Vectorized daily valuation of the assets and liabilities of a ledger.
+
+Instead of adding postings to inventories day by day and converting them, the
+engine works on the postings table (see `finlit.data.postings`):
+
+- Holdings are kept per (account class, currency, cost currency), as a matrix
+  with one column per day, from the cumulative sum of the posting numbers.
+- Rates to the target currency are looked up once per (currency, cost
+  currency) and day, from the price matrix and the conversion graph of the
+  ledger.
+- Values are the products of both, summed per account class.
+
+Conversions follow `beancount.core.convert.convert_position` with the price
+map projected to the target currency: the direct or projected rate when there
+is one, else the rate implied through the cost currency. Holdings without
+either are left out, as they are by an inventory reduced to a single currency.
+Like the inventories, the holdings of a day only include the postings dated
+before it.
+
+The value of a day only depends on the postings before it and on the rates up
+to it, so `day_digests` fingerprints those by day: a history valued from an
+older version of the ledger is still right until the first day whose digest
+changed.
+"""
+
+import datetime
+import hashlib
+from collections.abc import Callable, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+from beancount.core import data
+from beancount.parser import options
+
+from finlit.data.ledger import Ledger
+
+# Account classes, the first axis of the holdings.
+ASSETS = 0
+LIABILITIES = 1
+
+
+class NetworthEngine:
+    """
+    Daily value of the assets and liabilities of a ledger in one currency.
+    """
+
+    def __init__(self, ledger: Ledger, target_currency: str = "USD") -> None:
+        """
+        Prepare the columns of the postings that hold assets or liabilities.
+        """
+        self.ledger = ledger
+        self.target_currency = target_currency
+
+        postings = ledger.postings
+        account_types = options.get_account_types(ledger.options)
+        account_ids = postings["account_id"].to_numpy()
+        assets = ledger.accounts.of_type(account_types.assets)
+        liabilities = ledger.accounts.of_type(account_types.liabilities)
+        is_asset = (account_ids >= assets.start) & (account_ids < assets.stop)
+        is_liability = (account_ids >= liabilities.start) & (
+            account_ids < liabilities.stop
+        )
+
+        self.account_ids = account_ids
+        self.balance_sheet = is_asset | is_liability
+        self.account_class = np.where(is_asset, ASSETS, LIABILITIES)
+        self.numbers = np.nan_to_num(
+            postings["number"].to_numpy(zero_copy_only=False).astype(float)
+        )
+        self.ordinals = (
+            postings["date"].to_numpy(zero_copy_only=False).astype("datetime64[D]")
+        ).astype(np.int64) + datetime.date(1970, 1, 1).toordinal()
+
+        # Every distinct (currency, cost currency) of the postings.
+        currency_codes, currencies = pd.factorize(
+            postings["currency"].to_numpy(zero_copy_only=False)
+        )
+        cost_codes, cost_currencies = pd.factorize(
+            postings["cost_currency"].to_numpy(zero_copy_only=False)
+        )
+        pair_codes = currency_codes * (len(cost_currencies) + 1) + (cost_codes + 1)
+        pairs, self.holding_keys = np.unique(pair_codes, return_inverse=True)
+        self.holdings: list[tuple[str, str | None]] = [
+            (
+                currencies[pair // (len(cost_currencies) + 1)],
+                cost_currencies[pair % (len(cost_currencies) + 1) - 1]
+                if pair % (len(cost_currencies) + 1)
+                else None,
+            )
+            for pair in pairs
+        ]
+
+    def posting_mask(self, predicate: Callable[[data.Posting], bool]) -> np.ndarray:
+        """
+        Return which rows of the postings table match a posting predicate.
+        """
+        return self.posting_masks({"": predicate})[""]
+
+    def posting_masks(
+        self, predicates: Mapping[str, Callable[[data.Posting], bool]]
+    ) -> dict[str, np.ndarray]:
+        """
+        Return the mask of every predicate, from a single walk over the postings.
+        """
+        masks = {name: np.zeros(len(self.numbers), dtype=bool) for name in predicates}
+        checks = [(masks[name], predicate) for name, predicate in predicates.items()]
+        row = 0
+        for entry in data.filter_txns(self.ledger.entries):
+            for posting in entry.postings:
+                for mask, predicate in checks:
+                    mask[row] = predicate(posting)
+                row += 1
+        return masks
+
+    def account_mask(self, prefix: str) -> np.ndarray:
+        """
+        Return which rows of the postings table are in the subtree of `prefix`.
+        """
+        subtree = self.ledger.accounts.subtree(prefix)
+        return (self.account_ids >= subtree.start) & (
+            self.account_ids < subtree.stop
+        )
+
+    def day_digests(self) -> pd.Series:
+        """
+        Return a digest of what the value of each day depends on, by ordinal.
+
+        Postings count from the day after their date, and rates from their own
+        day. Days with neither have no digest. Digests are sums of 64-bit
+        hashes, so the order of the postings of a day doesn't matter.
+        """
+        # Strings are hashed once per distinct value, then spread to the rows.
+        accounts = pd.util.hash_array(
+            np.array(self.ledger.accounts.names, dtype=object)
+        )
+        holdings = pd.util.hash_array(
+            np.array(
+                [f"{currency} {cost}" for currency, cost in self.holdings], dtype=object
+            )
+        )
+        tags = self.ledger.postings["tags"].combine_chunks()
+        tagged = np.zeros(len(self.numbers), dtype=np.uint64)
+        np.add.at(
+            tagged,
+            pc.list_parent_indices(tags).to_numpy(),
+            pd.util.hash_array(
+                pc.list_flatten(tags).to_numpy(zero_copy_only=False).astype(object)
+            ),
+        )
+        selected = self.balance_sheet
+        numbers = pd.util.hash_array(self.numbers[selected])
+        # Odd multipliers mix the columns, so that swapping values between them
+        # changes the hash. Selectors may pick postings by tag.
+        postings = (
+            accounts[self.account_ids[selected]]
+            ^ holdings[self.holding_keys[selected]] * np.uint64(0x9E3779B97F4A7C15)
+            ^ numbers * np.uint64(0xC2B2AE3D27D4EB4F)
+            ^ tagged[selected] * np.uint64(0x165667B19E3779F9)
+        )
+
+        # Every column of the rates, salted with the pairs of their rows.
+        matrix = self.ledger.price_matrix
+        pairs = "\n".join(f"{base}/{quote}" for base, quote in matrix.pairs)
+        salt = np.uint64(int(hashlib.sha256(pairs.encode()).hexdigest()[:16], 16))
+        rates = (
+            pd.util.hash_pandas_object(pd.DataFrame(matrix.rates.T), index=False)
+            .to_numpy()
+            .astype(np.uint64)
+            if matrix.pairs
+            else np.zeros(matrix.rates.shape[1], dtype=np.uint64)
+        ) ^ salt
+
+        days = np.concatenate(
+            [
+                self.ordinals[selected] + 1,
+                matrix.start.toordinal() + np.arange(len(rates)),
+            ]
+        )
+        hashes = np.concatenate([postings, rates])
+        order = np.argsort(days, kind="stable")
+        days, hashes = days[order], hashes[order]
+        starts = np.flatnonzero(np.diff(days, prepend=-1))
+        return pd.Series(
+            np.add.reduceat(hashes, starts) if len(days) else hashes,
+            index=days[starts],
+            dtype=np.uint64,
+        )
+
+    def rates(self, days: np.ndarray) -> np.ndarray:
+        """
+        Return the rate of every holding on every day, NaN where there's none.
+
+        `days` are ordinals; the result has one row per holding.
+        """
+        matrix = self.ledger.price_matrix
+        graph = self.ledger.conversion_graph
+        target = self.target_currency
+
+        offsets = days - matrix.start.toordinal()
+        columns = np.clip(offsets, 0, matrix.rates.shape[1] - 1)
+        before = offsets < 0
+
+        rates = np.full((len(self.holdings), len(days)), np.nan)
+        for row, (currency, cost_currency) in enumerate(self.holdings):
+            if currency == target:
+                rates[row] = 1.0
+                continue
+            rate = graph.series(currency, target)[columns]
+            if cost_currency is not None and cost_currency != target:
+                implied = (
+                    matrix.series(currency, cost_currency)[columns]
+                    * graph.series(cost_currency, target)[columns]
+                )
+                rate = np.where(np.isnan(rate), implied, rate)
+            rates[row] = np.where(before, np.nan, rate)
+        return rates
+
+    def value(self, days: Sequence[datetime.date], mask: np.ndarray) -> pd.DataFrame:
+        """
+        Return the assets, liabilities and net worth of each day.
+
+        Only the postings selected by `mask` that hold assets or liabilities
+        are counted. The holdings of a day include the postings before it.
+        """
+        return self.value_many(days, {"": mask})[""]
+
+    def value_many(
+        self, days: Sequence[datetime.date], masks: Mapping[str, np.ndarray]
+    ) -> dict[str, pd.DataFrame]:
+        """
+        Return the result of `value` for every mask, by name.
+
+        The postings of all the masks are accumulated into a single holdings
+        matrix, and the rates of the days are looked up once.
+        """
+        ordinals = np.array([day.toordinal() for day in days], dtype=np.int64)
+        holdings = len(self.holdings)
+
+        # Row of every (mask, account class, holding) and column of the first
+        # day each posting counts for; postings after the last day are dropped.
+        rows = []
+        columns = []
+        numbers = []
+        for index, mask in enumerate(masks.values()):
+            selected = np.flatnonzero(mask & self.balance_sheet)
+            group = index * 2 + self.account_class[selected]
+            rows.append(group * holdings + self.holding_keys[selected])
+            columns.append(np.searchsorted(ordinals, self.ordinals[selected], "right"))
+            numbers.append(self.numbers[selected])
+
+        deltas = np.zeros((len(masks) * 2 * holdings, len(ordinals) + 1))
+        if masks:
+            np.add.at(
+                deltas,
+                (np.concatenate(rows), np.concatenate(columns)),
+                np.concatenate(numbers),
+            )
+        units = np.cumsum(deltas, axis=1)[:, :-1].reshape(len(masks), 2, holdings, -1)
+
+        values = np.nan_to_num(units * self.rates(ordinals)).sum(axis=2)
+
+        dates = pd.to_datetime(pd.Series(days))
+        return {
+            name: pd.DataFrame(
+                {
+                    "date": dates,
+                    "net_worth": values[index, ASSETS] + values[index, LIABILITIES],
+                    "liabilities": values[index, LIABILITIES],
+                    "assets": values[index, ASSETS],
+                }
+            )
+            for index, name in enumerate(masks)
+        }
+
+
+def first_changed_day(previous: pd.Series, current: pd.Series) -> int | None:
+    """
+    Return the first ordinal whose digest differs between two `day_digests`.
+
+    Days that only have a digest on one side count as changed. None means every
+    day has the same value in both versions of the ledger.
+    """
+    days = previous.index.union(current.index)
+    # Filled with zeros rather than NaN, which would turn the digests into floats.
+    changed = (
+        ~days.isin(previous.index)
+        | ~days.isin(current.index)
+        | (
+            previous.reindex(days, fill_value=0).to_numpy()
+            != current.reindex(days, fill_value=0).to_numpy()
+        )
+    )
+    return int(days[changed.argmax()]) if changed.any() else None
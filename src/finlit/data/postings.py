@@ -0,0 +1,89 @@
+"""
+Columnar table with one row per posting of the ledger.
+"""
+
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+
+import pyarrow as pa
+from beancount.core import data
+
+from finlit.data.accounts import AccountIndex
+
+POSTINGS_SCHEMA = pa.schema(
+    [
+        ("entry_index", pa.int32()),
+        ("date", pa.date32()),
+        ("flag", pa.string()),
+        ("account", pa.string()),
+        ("account_id", pa.int32()),
+        ("payee", pa.string()),
+        ("narration", pa.string()),
+        ("tags", pa.list_(pa.string())),
+        ("number", pa.float64()),
+        ("currency", pa.string()),
+        ("cost_number", pa.float64()),
+        ("cost_currency", pa.string()),
+        ("cost_date", pa.date32()),
+        ("price_number", pa.float64()),
+        ("price_currency", pa.string()),
+    ]
+)
+
+
+def _to_float(number: Decimal | None) -> float | None:
+    """
+    Convert a beancount number to float, keeping missing numbers as nulls.
+    """
+    return float(number) if isinstance(number, Decimal) else None
+
+
+def build_postings_table(entries: Sequence[Any], accounts: AccountIndex) -> pa.Table:
+    """
+    Build the postings table of the transactions in `entries`.
+
+    Numbers are stored as float64, which is what every dataset ends up using.
+    `entry_index` is the position of the transaction in `entries`, so a row can
+    always be traced back to its directive. `account_id` is the id of the
+    account in `accounts`.
+    """
+    columns: dict[str, list[Any]] = {name: [] for name in POSTINGS_SCHEMA.names}
+
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, data.Transaction):
+            continue
+
+        tags = sorted(entry.tags) if entry.tags else []
+        for posting in entry.postings:
+            units = posting.units
+            cost = posting.cost
+            price = posting.price
+
+            columns["entry_index"].append(index)
+            columns["date"].append(entry.date)
+            columns["flag"].append(posting.flag or entry.flag)
+            columns["account"].append(posting.account)
+            columns["account_id"].append(accounts.ids[posting.account])
+            columns["payee"].append(entry.payee)
+            columns["narration"].append(entry.narration)
+            columns["tags"].append(tags)
+            columns["number"].append(_to_float(units.number))
+            columns["currency"].append(units.currency)
+            columns["cost_number"].append(
+                _to_float(cost.number) if cost is not None else None
+            )
+            columns["cost_currency"].append(
+                cost.currency if cost is not None else None
+            )
+            columns["cost_date"].append(
+                getattr(cost, "date", None) if cost is not None else None
+            )
+            columns["price_number"].append(
+                _to_float(price.number) if price is not None else None
+            )
+            columns["price_currency"].append(
+                price.currency if price is not None else None
+            )
+
+    return pa.table(columns, schema=POSTINGS_SCHEMA)
@@ -0,0 +1,71 @@
+"""
+Compaction of the price directives of a ledger.
+
+Imported quote streams hold many prices that don't change any valuation:
+several quotes of a pair on the same day, of which beancount only uses the
+last, and quotes that repeat the previous rate. Dropping them leaves every rate
+looked up by day unchanged, while the price map and every index built from it
+shrink.
+
+Optionally, the history before a date is thinned further to the last quote of
+each month, which does change valuations on the days in between.
+
+Pairs that are quoted in both directions, e.g. USD in ARS and ARS in USD, are
+left as they are: beancount merges both lists into one, and dropping quotes
+from either side could change which one wins.
+"""
+
+import datetime
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+
+from beancount.core import data
+
+
+def compact_prices(
+    entries: Sequence[Any], monthly_before: datetime.date | None = None
+) -> list[Any]:
+    """
+    Return the entries without the prices that don't change any valuation.
+
+    Prices dated before `monthly_before` are reduced to the last quote of each
+    month. The entries must be sorted, and are kept in the same order.
+    """
+    pairs = {
+        (entry.currency, entry.amount.currency)
+        for entry in entries
+        if isinstance(entry, data.Price)
+    }
+
+    # The last quote of every pair and day, or month, wins.
+    last: dict[tuple[str, str, datetime.date], int] = {}
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, data.Price):
+            continue
+        base, quote = entry.currency, entry.amount.currency
+        if (quote, base) in pairs:
+            continue
+        period = entry.date
+        if monthly_before is not None and period < monthly_before:
+            period = period.replace(day=1)
+        last[(base, quote, period)] = index
+
+    # Of those, only the quotes that change the rate matter.
+    kept: set[int] = set()
+    previous: dict[tuple[str, str], Decimal] = {}
+    for index in sorted(last.values()):
+        entry = entries[index]
+        pair = (entry.currency, entry.amount.currency)
+        if previous.get(pair) == entry.amount.number:
+            continue
+        previous[pair] = entry.amount.number
+        kept.add(index)
+
+    return [
+        entry
+        for index, entry in enumerate(entries)
+        if index in kept
+        or not isinstance(entry, data.Price)
+        or (entry.amount.currency, entry.currency) in pairs
+    ]
@@ -0,0 +1,336 @@
+"""
+Dense matrix of daily exchange rates, built from a beancount price map.
+
+`prices.get_price` bisects the list of quotes of a pair on every lookup. The
+matrix instead holds one row per (base, quote) pair of the price map and one
+column per day, from the first quote until today, forward-filled with the
+latest known quote. Looking up a rate is then an array access, and whole
+columns of amounts can be converted at once.
+
+Lookups follow `prices.get_price`: a currency is worth one of itself, days
+before the first quote of a pair have no rate, and rates after the last day of
+the calendar are the last known ones.
+
+The matrix only depends on the price directives, so it's cached on disk by a
+digest of them and survives edits to the rest of the ledger.
+"""
+
+import datetime
+import hashlib
+from collections.abc import Iterable, Sequence
+from logging import getLogger
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from beancount.core import data, prices
+
+from finlit.data.cache import PriceIndexStore
+
+logger = getLogger()
+
+# Ordinal of 1970-01-01, day zero of NumPy's datetime64.
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def _ordinals(dates: Any) -> np.ndarray:  # noqa: ANN401
+    """
+    Return the dates as an array of proleptic Gregorian ordinals.
+
+    Accepts sequences of `datetime.date`, NumPy datetime64 arrays and pandas
+    datetime columns. Missing dates become -1, which no date has.
+    """
+    days = np.asarray(dates)
+    if not np.issubdtype(days.dtype, np.datetime64):
+        days = pd.to_datetime(pd.Series(list(days)), errors="coerce").to_numpy()
+    days = days.astype("datetime64[D]")
+    ordinals = days.astype(np.int64) + EPOCH_ORDINAL
+    ordinals[np.isnat(days)] = -1
+    return ordinals
+
+
+def _currencies(currencies: Any, size: int) -> np.ndarray:  # noqa: ANN401
+    """
+    Return the currencies as an object array, repeating a single currency.
+    """
+    if currencies is None or isinstance(currencies, str):
+        return np.full(size, currencies, dtype=object)
+    return np.asarray(currencies, dtype=object)
+
+
+class PriceMatrix:
+    """
+    Forward-filled daily rates of every pair of a price map.
+    """
+
+    def __init__(
+        self,
+        price_map: prices.PriceMap,
+        end: datetime.date | None = None,
+    ) -> None:
+        """
+        Build the matrix from the first quote until `end`, by default today.
+        """
+        quoted = [
+            (pair, quotes) for pair, quotes in sorted(price_map.items()) if quotes
+        ]
+        first = min((quotes[0][0] for _, quotes in quoted), default=None)
+        last = max((quotes[-1][0] for _, quotes in quoted), default=None)
+        today = end if end is not None else datetime.date.today()  # noqa: DTZ011
+
+        self.price_map = price_map
+        self.start: datetime.date = first if first is not None else today
+        self.end: datetime.date = max(today, last) if last is not None else today
+        self._start_ordinal = self.start.toordinal()
+        days = self.end.toordinal() - self._start_ordinal + 1
+
+        self.pairs: dict[tuple[str, str], int] = {}
+        self.rates = np.full((len(quoted), days), np.nan)
+        calendar = np.arange(days)
+        for row, (pair, quotes) in enumerate(quoted):
+            self.pairs[pair] = row
+            quote_days = np.array(
+                [date.toordinal() - self._start_ordinal for date, _ in quotes]
+            )
+            quote_rates = np.array([float(rate) for _, rate in quotes])
+            # Index of the latest quote on or before each day.
+            latest = np.searchsorted(quote_days, calendar, side="right") - 1
+            known = latest >= 0
+            self.rates[row, known] = quote_rates[latest[known]]
+
+    def extended(self, end: datetime.date) -> "PriceMatrix":
+        """
+        Return the matrix with its calendar extended until `end`, if later.
+
+        The new days carry the last known rates. The matrix itself isn't
+        modified.
+        """
+        extra = end.toordinal() - self.end.toordinal()
+        if extra <= 0:
+            return self
+        matrix = object.__new__(PriceMatrix)
+        matrix.__dict__.update(self.__dict__)
+        matrix.end = end
+        matrix.rates = np.concatenate(
+            [self.rates, np.repeat(self.rates[:, -1:], extra, axis=1)], axis=1
+        )
+        return matrix
+
+    @property
+    def calendar(self) -> pd.DatetimeIndex:
+        """
+        Return the days of the columns of the matrix.
+        """
+        return pd.date_range(self.start, self.end, freq="D")
+
+    def column(self, date: datetime.date | None) -> int:
+        """
+        Return the column of a date: -1 before the calendar, the last one after.
+        """
+        if date is None:
+            return self.rates.shape[1] - 1
+        offset = date.toordinal() - self._start_ordinal
+        return -1 if offset < 0 else min(offset, self.rates.shape[1] - 1)
+
+    def rate(
+        self, currency: str, target_currency: str, date: datetime.date | None
+    ) -> float | None:
+        """
+        Return the rate of `currency` in `target_currency` at `date`, or None.
+        """
+        if currency == target_currency:
+            return 1.0
+        row = self.pairs.get((currency, target_currency))
+        column = self.column(date)
+        if row is None or column < 0:
+            return None
+        rate = self.rates[row, column]
+        return None if np.isnan(rate) else float(rate)
+
+    def series(self, currency: str, target_currency: str) -> np.ndarray:
+        """
+        Return the daily rates of a pair over the calendar, NaN where unknown.
+        """
+        if currency == target_currency:
+            return np.ones(self.rates.shape[1])
+        row = self.pairs.get((currency, target_currency))
+        if row is None:
+            return np.full(self.rates.shape[1], np.nan)
+        return self.rates[row]
+
+    def _lookup(
+        self, currencies: np.ndarray, targets: np.ndarray, ordinals: np.ndarray
+    ) -> np.ndarray:
+        """
+        Return the rates of aligned arrays of currencies, targets and ordinals.
+        """
+        offsets = ordinals - self._start_ordinal
+        columns = np.minimum(offsets, self.rates.shape[1] - 1)
+        valid = (ordinals >= 0) & (offsets >= 0)
+
+        # Rows of the matrix by the codes of each distinct (currency, target).
+        currency_codes, currency_names = pd.factorize(currencies)
+        target_codes, target_names = pd.factorize(targets)
+        pair_rows = np.full((len(currency_names) + 1, len(target_names) + 1), -1)
+        identity = np.zeros_like(pair_rows, dtype=bool)
+        for i, currency in enumerate(currency_names):
+            for j, target in enumerate(target_names):
+                identity[i, j] = currency == target
+                pair_rows[i, j] = self.pairs.get((currency, target), -1)
+
+        # Missing currencies have code -1, i.e. the last row or column, unknown.
+        rows = pair_rows[currency_codes, target_codes]
+        known = (rows >= 0) & valid
+        result = np.full(len(currencies), np.nan)
+        result[known] = self.rates[rows[known], columns[known]]
+        result[identity[currency_codes, target_codes]] = 1.0
+        return result
+
+    def lookup(
+        self,
+        currencies: Sequence[str | None],
+        target_currencies: Sequence[str | None] | str,
+        dates: Any,  # noqa: ANN401
+    ) -> np.ndarray:
+        """
+        Return the rates of many (currency, target, date) triples at once.
+
+        `target_currencies` may be a single currency for every row. The result
+        is NaN where there's no rate, or a currency or date is missing, and one
+        wherever a currency is converted to itself.
+        """
+        currencies = _currencies(currencies, 0)
+        targets = _currencies(target_currencies, len(currencies))
+        return self._lookup(currencies, targets, _ordinals(dates))
+
+    def _convert(  # noqa: PLR0913
+        self,
+        numbers: np.ndarray,
+        currencies: np.ndarray,
+        targets: np.ndarray,
+        ordinals: np.ndarray,
+        via: np.ndarray | None,
+    ) -> np.ndarray:
+        """
+        Convert aligned arrays, going through `via` where there's no direct rate.
+        """
+        rates = self._lookup(currencies, targets, ordinals)
+
+        if via is not None:
+            missing = np.isnan(rates) & pd.notna(via) & (via != targets)
+            if missing.any():
+                to_via = self._lookup(
+                    currencies[missing], via[missing], ordinals[missing]
+                )
+                from_via = self._lookup(
+                    via[missing], targets[missing], ordinals[missing]
+                )
+                rates[missing] = to_via * from_via
+
+        return numbers * rates
+
+    def convert(  # noqa: PLR0913
+        self,
+        numbers: Any,  # noqa: ANN401
+        currencies: Sequence[str | None],
+        target_currencies: Sequence[str | None] | str,
+        dates: Any,  # noqa: ANN401
+        via: Sequence[str | None] | None = None,
+    ) -> np.ndarray:
+        """
+        Convert whole arrays of amounts, NaN where there's no rate.
+
+        Like `beancount.core.convert.convert_amount`, amounts without a direct
+        rate are converted through the currency in `via`, usually the cost
+        currency of the position.
+        """
+        currencies = _currencies(currencies, 0)
+        return self._convert(
+            np.asarray(numbers, dtype=float),
+            currencies,
+            _currencies(target_currencies, len(currencies)),
+            _ordinals(dates),
+            None if via is None else _currencies(via, len(currencies)),
+        )
+
+    def convert_many(  # noqa: PLR0913
+        self,
+        numbers: Any,  # noqa: ANN401
+        currencies: Sequence[str | None],
+        target_currencies: Sequence[str],
+        dates: Any,  # noqa: ANN401
+        via: Sequence[str | None] | None = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Convert whole arrays of amounts into each of the target currencies.
+
+        Same as calling `convert` once per target currency, but the inputs are
+        only prepared once.
+        """
+        numbers = np.asarray(numbers, dtype=float)
+        currencies = _currencies(currencies, 0)
+        ordinals = _ordinals(dates)
+        via = None if via is None else _currencies(via, len(currencies))
+        return {
+            target: self._convert(
+                numbers,
+                currencies,
+                _currencies(target, len(currencies)),
+                ordinals,
+                via,
+            )
+            for target in target_currencies
+        }
+
+
+def digest_prices(entries: Iterable[Any]) -> str:
+    """
+    Return a digest of the price directives among the entries.
+
+    Only the date, currency and amount of each price count, so moving prices
+    around in the files doesn't change the digest.
+    """
+    digest = hashlib.sha256()
+    for entry in entries:
+        if isinstance(entry, data.Price):
+            digest.update(
+                f"{entry.date}\0{entry.currency}\0{entry.amount.number}\0"
+                f"{entry.amount.currency}\n".encode()
+            )
+    return digest.hexdigest()
+
+
+def load_price_matrix(
+    ledger_path: str,
+    entries: Iterable[Any],
+    cache_dir: Path | None,
+    *,
+    persist: bool = True,
+) -> PriceMatrix:
+    """
+    Return the price matrix of the entries, from the on-disk cache if possible.
+
+    The cached matrix is extended until today, since its calendar ends on the
+    day it was built.
+
+    Args:
+    ----
+        ledger_path: Absolute path of the top-level ledger file.
+        entries: The loaded entries of the ledger.
+        cache_dir: Directory of the caches, or None to always build the matrix.
+        persist: Whether a matrix that had to be built is written to the cache.
+
+    """
+    price_entries = [entry for entry in entries if isinstance(entry, data.Price)]
+    store = PriceIndexStore(cache_dir) if cache_dir is not None else None
+    digest = digest_prices(price_entries)
+
+    matrix: PriceMatrix | None = (
+        store.load(ledger_path, digest) if store is not None else None
+    )
+    if matrix is None:
+        matrix = PriceMatrix(prices.build_price_map(price_entries))
+        if store is not None and persist:
+            store.store(ledger_path, digest, matrix)
+    return matrix.extended(datetime.date.today())  # noqa: DTZ011
@@ -0,0 +1,257 @@
+"""
+Wall time and memory allocation of the phases of a ledger load.
+"""
+
+import re
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import pandas as pd
+
+# Format of the timing lines beancount writes after running each plugin.
+_PLUGIN_TIMING = re.compile(r"Operation: '(?P<name>[^']+)'")
+
+# Placeholder name of a plugin until beancount reports it as done.
+_NEXT_PLUGIN = "plugin"
+
+# Tracing is process-wide, so it's shared by every profiler that is running,
+# and only stopped by the last one if a profiler started it.
+_tracing_lock = threading.Lock()
+_tracing_profilers = 0
+_started_tracing = False
+
+
+@dataclass(frozen=True)
+class PhaseProfile:
+    """
+    Measurements of a single phase.
+
+    Attributes
+    ----------
+        name: Name of the phase, or the module name of a plugin.
+        seconds: Wall time spent in the phase.
+        allocated_bytes: Memory still allocated at the end of the phase.
+        peak_bytes: Highest memory allocated during the phase.
+        children: The nested phases, e.g. one per plugin.
+
+    """
+
+    name: str
+    seconds: float
+    allocated_bytes: int
+    peak_bytes: int
+    children: tuple["PhaseProfile", ...] = ()
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """
+    Report of a ledger load, phase by phase.
+    """
+
+    phases: tuple[PhaseProfile, ...]
+
+    @property
+    def seconds(self) -> float:
+        """
+        Return the wall time of the whole load.
+        """
+        return sum(phase.seconds for phase in self.phases)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Return the report as plain dicts and lists.
+        """
+        return {"seconds": self.seconds, "phases": [asdict(p) for p in self.phases]}
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Return one row per phase, with nested phases named `parent/child`.
+        """
+        rows = []
+
+        def add(phase: PhaseProfile, prefix: str) -> None:
+            name = f"{prefix}{phase.name}"
+            rows.append((name, phase.seconds, phase.allocated_bytes, phase.peak_bytes))
+            for child in phase.children:
+                add(child, f"{name}/")
+
+        for phase in self.phases:
+            add(phase, "")
+        return pd.DataFrame(
+            rows, columns=["phase", "seconds", "allocated_bytes", "peak_bytes"]
+        )
+
+    def format(self) -> str:
+        """
+        Return the report as a human readable table.
+        """
+        lines = [f"{'phase':<48} {'time':>9} {'allocated':>11} {'peak':>11}"]
+
+        def add(phase: PhaseProfile, depth: int) -> None:
+            name = "  " * depth + phase.name
+            lines.append(
+                f"{name:<48} {phase.seconds * 1000:7.0f}ms "
+                f"{phase.allocated_bytes / 2**20:9.1f}MB "
+                f"{phase.peak_bytes / 2**20:9.1f}MB"
+            )
+            for child in phase.children:
+                add(child, depth + 1)
+
+        for phase in self.phases:
+            add(phase, 0)
+        lines.append(f"{'total':<48} {self.seconds * 1000:7.0f}ms")
+        return "\n".join(lines)
+
+
+@dataclass
+class _OpenPhase:
+    """
+    A phase that is still being measured.
+    """
+
+    name: str
+    started: float
+    allocated: int
+    peak: int = 0
+    children: list[PhaseProfile] = field(default_factory=list)
+
+
+class LoadProfiler:
+    """
+    Measure the phases of a load.
+
+    Allocations are traced with `tracemalloc`, which is started while there
+    are profiled loads if it isn't running already, and left running if
+    something else started it. Tracing is process-wide: the allocations and
+    peaks include those of every other thread, e.g. other sessions loading at
+    the same time, and concurrent profilers reset each other's peaks. It only
+    sees this process, so the files parsed by worker processes only show up
+    in the wall time.
+    """
+
+    def __init__(self) -> None:
+        """
+        Start with no phases.
+        """
+        self._phases: list[PhaseProfile] = []
+        self._stack: list[_OpenPhase] = []
+
+    def __enter__(self) -> "LoadProfiler":
+        """
+        Start tracing allocations, unless they're traced already.
+        """
+        global _tracing_profilers, _started_tracing  # noqa: PLW0603
+        with _tracing_lock:
+            if _tracing_profilers == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+            _tracing_profilers += 1
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """
+        Stop tracing allocations after the last profiler, if one started it.
+        """
+        global _tracing_profilers, _started_tracing  # noqa: PLW0603
+        with _tracing_lock:
+            _tracing_profilers -= 1
+            if _tracing_profilers == 0 and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+
+    def _open(self, name: str) -> None:
+        """
+        Start measuring a phase, nested in the current one if any.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            # Resetting the peak below would lose the one of the enclosing phase.
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, peak)
+        tracemalloc.reset_peak()
+        self._stack.append(_OpenPhase(name, time.perf_counter(), current))
+
+    def _pop(self) -> tuple[_OpenPhase, float, int, int]:
+        """
+        Stop measuring the current phase; return it with its measurements.
+        """
+        phase = self._stack.pop()
+        seconds = time.perf_counter() - phase.started
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(phase.peak, peak)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, peak)
+        return phase, seconds, current - phase.allocated, peak - phase.allocated
+
+    def _close(self) -> None:
+        """
+        Stop measuring the current phase and record it.
+        """
+        phase, seconds, allocated, peak = self._pop()
+        profile = PhaseProfile(
+            phase.name, seconds, allocated, peak, tuple(phase.children)
+        )
+        if self._stack:
+            self._stack[-1].children.append(profile)
+        else:
+            self._phases.append(profile)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Measure the block as a phase, nested in the current one if any.
+        """
+        self._open(name)
+        try:
+            yield
+        finally:
+            self._close()
+
+    @contextmanager
+    def plugins(self) -> Iterator[Callable[[str], None]]:
+        """
+        Measure the block as the plugins phase, with one child per plugin.
+
+        Yield the function to pass as `log_timings` to beancount, which calls it
+        after running each plugin. Every plugin is measured from the end of the
+        previous one, so importing it is included.
+        """
+        with self.phase("plugins"):
+            self._open(_NEXT_PLUGIN)
+            try:
+                yield self._plugin_done
+            finally:
+                # Whatever ran after the last plugin only counts in the total.
+                self._pop()
+
+    def _plugin_done(self, message: str) -> None:
+        """
+        Record the plugin that just finished and start measuring the next one.
+        """
+        match = _PLUGIN_TIMING.search(message)
+        if match is not None:
+            self._stack[-1].name = match["name"]
+        self._close()
+        self._open(_NEXT_PLUGIN)
+
+    def report(self) -> LoadProfile:
+        """
+        Return the phases measured so far.
+        """
+        return LoadProfile(tuple(self._phases))
+
+
+def profile_phase(
+    profiler: LoadProfiler | None, name: str
+) -> AbstractContextManager[None]:
+    """
+    Measure the block as a phase of `profiler`, or do nothing without one.
+    """
+    return profiler.phase(name) if profiler is not None else nullcontext()
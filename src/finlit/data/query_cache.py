@@ -0,0 +1,192 @@
+"""
+Memoization of query results, shared by every ledger of the process.
+
+Cached results are shared, so callers get copies of whatever they could modify:
+the frames of SQL queries and the inventories in the rows of BQL queries.
+"""
+
+import copy
+import re
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, TypeVar
+
+import pandas as pd
+from beancount.core.inventory import Inventory
+
+logger = getLogger()
+
+T = TypeVar("T")
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Quoted literals are kept verbatim; whitespace anywhere else is collapsed.
+_QUERY_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|(\s+)""")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Return the query with insignificant whitespace collapsed.
+
+    Queries that only differ in indentation or line breaks share a cache entry,
+    while whitespace inside string literals is left untouched.
+    """
+
+    def replace(match: re.Match) -> str:
+        literal, _ = match.groups()
+        return literal if literal is not None else " "
+
+    return _QUERY_TOKENS.sub(replace, query).strip()
+
+
+def estimate_size(value: Any) -> int:  # noqa: ANN401
+    """
+    Return an estimate of the memory held by a query result, in bytes.
+
+    BQL results are lists of rows holding amounts and inventories, so the
+    containers are walked recursively. Shared objects are counted once.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+
+    size = 0
+    seen: set[int] = set()
+    pending = [value]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+    return size
+
+
+def copy_rows(types: list[tuple[str, type]], rows: list[Any]) -> list[Any]:
+    """
+    Return copies of BQL result rows that the caller can modify.
+
+    Inventories are the only mutable values in BQL results, so only the
+    columns holding them are copied and every other value is shared.
+    """
+    columns = [index for index, (_, dtype) in enumerate(types) if dtype is Inventory]
+    if not columns:
+        return list(rows)
+
+    copied = []
+    for row in rows:
+        values = list(row)
+        for index in columns:
+            values[index] = copy.copy(values[index])
+        copied.append(row._make(values))
+    return copied
+
+
+@dataclass(frozen=True)
+class QueryCacheStats:
+    """
+    Counters of a query cache.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results under a memory budget.
+
+    Results larger than the whole budget are returned but never stored.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """
+        Keep at most `max_bytes` of results, evicting the least recently used.
+        """
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        """
+        Drop entries until the cache fits its budget. Must hold the lock.
+        """
+        while self._items and self._size_bytes > self.max_bytes:
+            _, (_, size) = self._items.popitem(last=False)
+            self._size_bytes -= size
+            self._evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """
+        Return the cached result for `key`, computing and storing it on a miss.
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self._hits += 1
+                return self._items[key][0]
+            self._misses += 1
+
+        value = compute()
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            logger.debug("Query result of %s bytes is over the budget.", size)
+            return value
+
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = (value, size)
+                self._size_bytes += size
+                self._evict()
+        return value
+
+    def resize(self, max_bytes: int) -> None:
+        """
+        Change the memory budget, evicting entries if it shrank.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Drop every entry. The counters are kept.
+        """
+        with self._lock:
+            self._items.clear()
+            self._size_bytes = 0
+
+    @property
+    def stats(self) -> QueryCacheStats:
+        """
+        Return the current counters.
+        """
+        with self._lock:
+            return QueryCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._items),
+                size_bytes=self._size_bytes,
+                max_bytes=self.max_bytes,
+            )
+
+
+QUERY_CACHE = QueryCache()
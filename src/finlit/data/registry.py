@@ -0,0 +1,251 @@
+"""
+Process-wide registry of loaded ledgers.
+
+Streamlit runs every page script once per rerun and per browser session. The
+registry makes all of them share a single parsed `Ledger` per path and
+fingerprint instead of loading the file again each time.
+"""
+
+import os
+import threading
+import weakref
+from collections import defaultdict
+from dataclasses import replace
+from logging import getLogger
+from pathlib import Path
+
+import streamlit as st
+
+from finlit.data.ledger import Ledger
+from finlit.data.loader import LoaderConfig
+from finlit.data.watcher import DEFAULT_INTERVAL, LedgerWatcher
+
+logger = getLogger()
+
+SESSION_KEY_PREFIX = "finlit.ledger:"
+
+
+class LedgerRegistry:
+    """
+    Thread-safe, reference-counted store of shared ledgers.
+
+    The latest snapshot of every path is always kept. Older snapshots stay alive
+    only while somebody still holds a reference to them, so a session that is
+    mid-render keeps a consistent ledger after the file was edited.
+
+    Watched paths are reloaded by a background thread, and `acquire` returns their
+    current snapshot without looking at the files.
+    """
+
+    def __init__(self, config: LoaderConfig | None = None) -> None:
+        """
+        Load every ledger with `config`.
+        """
+        self.config = config if config is not None else LoaderConfig()
+        self._lock = threading.Lock()
+        self._path_locks: dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._current: dict[str, Ledger] = {}
+        self._snapshots: dict[tuple[str, str], Ledger] = {}
+        self._refcounts: dict[tuple[str, str], int] = defaultdict(int)
+        self._watchers: dict[str, LedgerWatcher] = {}
+
+    def _load_current(self, path: str) -> Ledger:
+        """
+        Return the snapshot matching the ledger on disk, loading it if needed.
+        """
+        current = self._current.get(path)
+        if current is not None:
+            disk_fingerprint = current.disk_fingerprint()
+            if disk_fingerprint == current.fingerprint:
+                return current
+
+            # The files may have gone back to a snapshot that is still alive.
+            with self._lock:
+                known = self._snapshots.get((path, disk_fingerprint))
+            if known is not None:
+                return known
+
+        logger.info("Loading ledger %s.", path)
+        ledger = Ledger(path, self.config)
+        if ledger.load_profile is not None:
+            logger.info("Loaded %s:\n%s", path, ledger.load_profile.format())
+        return ledger
+
+    def _install(self, path: str, ledger: Ledger) -> None:
+        """
+        Make `ledger` the current snapshot of `path`. Must hold the lock.
+        """
+        previous = self._current.get(path)
+        self._current[path] = ledger
+        self._snapshots[(path, ledger.fingerprint)] = ledger
+
+        if previous is not None and previous is not ledger:
+            previous_key = (path, previous.fingerprint)
+            if not self._refcounts.get(previous_key):
+                self._snapshots.pop(previous_key, None)
+
+    def _take(self, path: str, ledger: Ledger) -> Ledger:
+        """
+        Take a reference to an installed snapshot. Must hold the lock.
+        """
+        self._refcounts[(path, ledger.fingerprint)] += 1
+        return ledger
+
+    def acquire(self, ledger_path: str | Path) -> Ledger:
+        """
+        Return the shared ledger for `ledger_path` and take a reference to it.
+
+        Every call must be paired with a call to `release`.
+        """
+        path = os.path.abspath(ledger_path)  # noqa: PTH100
+
+        with self._lock:
+            current = self._current.get(path)
+            if current is not None and path in self._watchers:
+                return self._take(path, current)
+            path_lock = self._path_locks[path]
+
+        # Concurrent sessions asking for the same path wait for a single load.
+        with path_lock:
+            ledger = self._load_current(path)
+
+        with self._lock:
+            self._install(path, ledger)
+            return self._take(path, ledger)
+
+    def refresh(self, ledger_path: str | Path) -> bool:
+        """
+        Reload the ledger if its files changed and swap in the new snapshot.
+
+        Readers keep getting the previous snapshot until the new one is fully
+        loaded. Return True if a new snapshot was installed.
+        """
+        path = os.path.abspath(ledger_path)  # noqa: PTH100
+        with self._lock:
+            path_lock = self._path_locks[path]
+
+        with path_lock:
+            ledger = self._load_current(path)
+
+        with self._lock:
+            if self._current.get(path) is ledger:
+                return False
+            self._install(path, ledger)
+            return True
+
+    def watch(
+        self, ledger_path: str | Path, interval: float = DEFAULT_INTERVAL
+    ) -> None:
+        """
+        Start reloading the ledger in the background. Watching twice is a no-op.
+        """
+        path = os.path.abspath(ledger_path)  # noqa: PTH100
+        with self._lock:
+            if path in self._watchers:
+                return
+            watcher = LedgerWatcher(self, path, interval)
+            self._watchers[path] = watcher
+        watcher.start()
+
+    def unwatch(self, ledger_path: str | Path) -> None:
+        """
+        Stop reloading the ledger in the background.
+        """
+        path = os.path.abspath(ledger_path)  # noqa: PTH100
+        with self._lock:
+            watcher = self._watchers.pop(path, None)
+        if watcher is not None:
+            watcher.stop()
+
+    def release(self, ledger: Ledger) -> None:
+        """
+        Drop a reference taken with `acquire`.
+        """
+        path = os.path.abspath(ledger.path)  # noqa: PTH100
+        key = (path, ledger.fingerprint)
+        with self._lock:
+            self._refcounts[key] -= 1
+            if self._refcounts[key] > 0:
+                return
+            del self._refcounts[key]
+            if self._current.get(path) is not ledger:
+                self._snapshots.pop(key, None)
+
+    def lease(self, ledger_path: str | Path) -> "LedgerLease":
+        """
+        Acquire the ledger and return a lease that releases it when dropped.
+        """
+        return LedgerLease(self, self.acquire(ledger_path))
+
+    def refcount(self, ledger: Ledger) -> int:
+        """
+        Return the number of references held on this snapshot.
+        """
+        path = os.path.abspath(ledger.path)  # noqa: PTH100
+        with self._lock:
+            return self._refcounts.get((path, ledger.fingerprint), 0)
+
+    def clear(self) -> None:
+        """
+        Forget every ledger. Outstanding references stay valid but aren't shared.
+        """
+        for path in list(self._watchers):
+            self.unwatch(path)
+        with self._lock:
+            self._current.clear()
+            self._snapshots.clear()
+            self._refcounts.clear()
+
+
+class LedgerLease:
+    """
+    A reference to a shared ledger, released explicitly or when garbage collected.
+    """
+
+    def __init__(self, registry: LedgerRegistry, ledger: Ledger) -> None:
+        """
+        Hold a reference already acquired from `registry`.
+        """
+        self.ledger = ledger
+        self._finalizer = weakref.finalize(self, registry.release, ledger)
+
+    def release(self) -> None:
+        """
+        Release the reference. Calling it more than once is a no-op.
+        """
+        self._finalizer()
+
+
+REGISTRY = LedgerRegistry()
+
+
+def session_ledger(
+    ledger_path: str | Path,
+    registry: LedgerRegistry = REGISTRY,
+    *,
+    watch: bool = True,
+    profile: bool = False,
+) -> Ledger:
+    """
+    Return the shared ledger for the current Streamlit session.
+
+    Each session holds one lease per path. It's swapped on every rerun, so the
+    session picks up edits to the ledger, and it's released when the session
+    state is discarded. With `watch`, edits are reloaded in the background and
+    reruns never wait for a parse once the first load is done. With `profile`,
+    the registry profiles every load from then on and logs the report.
+    """
+    if profile and not registry.config.profile:
+        registry.config = replace(registry.config, profile=True)
+
+    key = f"{SESSION_KEY_PREFIX}{os.path.abspath(ledger_path)}"  # noqa: PTH100
+    lease = registry.lease(ledger_path)
+    if watch:
+        registry.watch(ledger_path)
+
+    previous: LedgerLease | None = st.session_state.get(key)
+    st.session_state[key] = lease
+    if previous is not None:
+        previous.release()
+
+    return lease.ledger
@@ -0,0 +1,93 @@
+"""
+Declarative selection of the postings of a ledger.
+
+Filtering with a Python function calls it once per posting. A selector instead
+describes the postings to keep, and is compiled once into a boolean mask over
+the postings table (see `finlit.data.postings`):
+
+- Account prefixes and patterns are resolved against the account index, once
+  per account rather than once per posting, into the set of selected account
+  ids.
+- Tags and currencies are matched on whole columns at once.
+"""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from finlit.data.accounts import AccountIndex
+
+
+@dataclass(frozen=True)
+class PostingSelector:
+    """
+    Postings to keep, by account, tag and currency.
+
+    Attributes
+    ----------
+        accounts: Account prefixes, e.g. `Assets:Inversiones:ARG`, which select
+            the account and all its descendants.
+        patterns: Regular expressions searched in the account names.
+        tags: Tags of the transactions.
+        currencies: Currencies of the units of the postings.
+
+    A posting is selected when it matches every non-empty criterion, and a
+    criterion matches when any of its values does. The empty selector keeps
+    every posting.
+
+    """
+
+    accounts: tuple[str, ...] = ()
+    patterns: tuple[str, ...] = ()
+    tags: tuple[str, ...] = ()
+    currencies: tuple[str, ...] = ()
+
+    def account_ids(self, accounts: AccountIndex) -> np.ndarray | None:
+        """
+        Return whether each account id is selected, or None for every account.
+        """
+        if not self.accounts and not self.patterns:
+            return None
+        by_prefix = np.zeros(len(accounts), dtype=bool)
+        for prefix in self.accounts:
+            subtree = accounts.subtree(prefix)
+            by_prefix[subtree.start : subtree.stop] = True
+        if not self.patterns:
+            return by_prefix
+
+        compiled = [re.compile(pattern) for pattern in self.patterns]
+        by_pattern = np.array(
+            [any(regex.search(name) for regex in compiled) for name in accounts.names],
+            dtype=bool,
+        )
+        return by_pattern if not self.accounts else by_prefix & by_pattern
+
+    def mask(self, postings: pa.Table, accounts: AccountIndex) -> np.ndarray:
+        """
+        Return which rows of the postings table are selected.
+        """
+        mask = np.ones(postings.num_rows, dtype=bool)
+
+        selected = self.account_ids(accounts)
+        if selected is not None:
+            mask &= selected[postings["account_id"].to_numpy()]
+
+        if self.tags:
+            tags = postings["tags"].combine_chunks()
+            tagged = np.zeros(postings.num_rows, dtype=bool)
+            matches = pc.is_in(pc.list_flatten(tags), value_set=pa.array(self.tags))
+            rows = pc.list_parent_indices(tags).to_numpy()
+            tagged[rows[matches.to_numpy(zero_copy_only=False)]] = True
+            mask &= tagged
+
+        if self.currencies:
+            mask &= (
+                pc.is_in(postings["currency"], value_set=pa.array(self.currencies))
+                .to_numpy(zero_copy_only=False)
+                .astype(bool)
+            )
+
+        return mask
@@ -8,20 +8,21 @@ It returns a DataFrame with the net worth of the user over time.
 """
 
 from datetime import datetime
-from decimal import Decimal
 from typing import TypedDict
 
 from altair import pd
-from beancount.core import convert, data, inventory, prices
-from beancount.core.account import root
+from beancount.core import convert, data
+from beancount.core.amount import Amount
+from beancount.core.number import D
 
-# from finlit.data.transformations.networth_history import project_missing_currencies
-from finlit.data.datasets.networth_history import project_missing_currencies
 from finlit.data.ledger import Ledger
 
 INVESTMENT_PREFIX = "Assets:Inversiones"
 MAIN_CURR = "USD"
 
+# Holdings are summed as floats; anything smaller than this is a closed position.
+NOMINAL_TOLERANCE = 1e-9
+
 
 class Asset(TypedDict):
     """
@@ -76,20 +77,11 @@ class PorfolioAssets:
         """
         Get the entries.
         """
-        price_map = prices.build_price_map(self.ledger.entries)
-
         today = datetime.now().date()  # noqa: DTZ005
 
-        index = 0
-
         commodities: dict[str, Asset] = {}
-        allocs: dict[str, inventory.Inventory] = {}
-
-        # Append new entries until the given date.
-        while index < len(self.ledger.entries):
-            entry = self.ledger.entries[index]
+        for entry in self.ledger.entries:
             if isinstance(entry, data.Commodity) and entry.currency not in commodities:
-                # commodities[entry.currency] = Asset[entry.currency, entry)
                 meta = {
                     e: entry.meta[e]
                     for e in entry.meta
@@ -103,43 +95,52 @@ class PorfolioAssets:
                     entry.meta.get("portfolio", ""),
                     meta if meta else None,
                 )
-            if isinstance(entry, data.Transaction):
-                for posting in entry.postings:
-                    if root(2, posting.account) == INVESTMENT_PREFIX:
-                        if posting.units.currency not in allocs:
-                            allocs[posting.units.currency] = inventory.Inventory()
-                        allocs[posting.units.currency].add_position(posting)  # type: ignore[]
-            index += 1
-
-        usd_proj_price_map = project_missing_currencies(
-            price_map,  # type: ignore[]
-            today,
-            set(commodities.keys()),  # type: ignore[]
-            MAIN_CURR,
+
+        # Units held in the investment accounts, per currency and cost currency.
+        postings = self.ledger.postings
+        investments = self.ledger.accounts.mask(
+            postings["account_id"], INVESTMENT_PREFIX
+        )
+        holdings = (
+            postings.filter(investments)
+            .group_by(["currency", "cost_currency"])
+            .aggregate([("number", "sum")])
+            .to_pylist()
         )
 
+        usd_proj_price_map = self.ledger.conversion_graph.projected_price_map(
+            MAIN_CURR
+        )
+
+        allocs: dict[str, tuple[float, float]] = {}
+        for holding in holdings:
+            curr = holding["currency"]
+            number = holding["number_sum"]
+            cost_currency = holding["cost_currency"]
+
+            # Same conversion as reducing an inventory with convert_position:
+            # directly, or implied through the cost currency.
+            value = convert.convert_amount(
+                Amount(D(str(number)), curr),
+                MAIN_CURR,
+                usd_proj_price_map,
+                today,
+                via=(cost_currency,) if cost_currency else None,
+            )
+            value_number = float(value.number) if value.currency == MAIN_CURR else 0
+            nominal, total = allocs.get(curr, (0.0, 0.0))
+            allocs[curr] = (nominal + number, total + value_number)
+
         del_currencies = [curr for curr in commodities if curr not in allocs]
         for curr in del_currencies:
             del commodities[curr]
 
-        for curr, inv in allocs.items():
-            nominales = inv.reduce(convert.get_units)
-            nominal_units: Decimal | None = nominales.get_currency_units(curr).number
-
-            if nominal_units and nominal_units > 0:
-                value = inv.reduce(
-                    convert.convert_position,
-                    MAIN_CURR,  # type: ignore[]
-                    usd_proj_price_map,  # type: ignore[]
-                    today,  # type: ignore[]
-                )  # type: ignore[]
-
-                commodities[curr]["nominales"] = (
-                    float(nominal_units) if nominal_units else 0
-                )
-
-                value_units: Decimal | None = value.get_currency_units(MAIN_CURR).number
-                commodities[curr]["value"] = float(value_units) if value_units else 0
+        for curr, (nominal, value) in allocs.items():
+            if curr not in commodities:
+                continue
+            if nominal > NOMINAL_TOLERANCE:
+                commodities[curr]["nominales"] = nominal
+                commodities[curr]["value"] = value
             else:
                 del commodities[curr]
         return commodities
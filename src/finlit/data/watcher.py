@@ -0,0 +1,64 @@
+"""
+Background reloading of ledgers when their files change.
+"""
+
+import threading
+from logging import getLogger
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from finlit.data.registry import LedgerRegistry
+
+logger = getLogger()
+
+DEFAULT_INTERVAL = 1.0
+
+
+class LedgerWatcher(threading.Thread):
+    """
+    Daemon thread that polls the include tree of a ledger and reloads it.
+
+    Polling stats the included files, reads the ones whose size or modification
+    time changed, and expands the include globs again so that new matching files
+    are picked up too (see `Ledger.disk_fingerprint`). The new snapshot is
+    parsed in this thread and swapped into the registry once it's complete.
+    """
+
+    def __init__(
+        self,
+        registry: "LedgerRegistry",
+        ledger_path: str,
+        interval: float = DEFAULT_INTERVAL,
+    ) -> None:
+        """
+        Watch `ledger_path` on behalf of `registry` every `interval` seconds.
+        """
+        super().__init__(name=f"finlit-watcher:{ledger_path}", daemon=True)
+        self.registry = registry
+        self.ledger_path = ledger_path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        """
+        Poll until stopped.
+        """
+        while not self._stop_event.wait(self.interval):
+            self._poll()
+
+    def _poll(self) -> None:
+        """
+        Reload the ledger once if its files changed.
+        """
+        try:
+            if self.registry.refresh(self.ledger_path):
+                logger.info("Reloaded ledger %s.", self.ledger_path)
+        except Exception:
+            # Keep serving the previous snapshot; the next poll will retry.
+            logger.exception("Could not reload ledger %s.", self.ledger_path)
+
+    def stop(self) -> None:
+        """
+        Ask the thread to stop after the current poll.
+        """
+        self._stop_event.set()
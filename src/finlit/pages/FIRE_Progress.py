@@ -10,7 +10,7 @@ import pytz
 import streamlit as st
 from streamlit.components.v1 import html
 
-from finlit.data import Ledger
+from finlit.data import session_ledger
 from finlit.data.datasets import (
     AllExpensesDataset,
     AllIncomeDataset,
@@ -41,7 +41,7 @@ parser = create_parser()
 args = parser.parse_args()
 setup_logger(verbose=args.verbose)
 logger = getLogger()
-ledger = Ledger(args.ledger)
+ledger = session_ledger(args.ledger, profile=args.profile_load)
 
 
 #######################
@@ -121,13 +121,13 @@ expenses = calculate.average_expenses(all_expenses, trailing_months)
 
 
 networth_history = NetworthHistoryDataset(ledger)
-bal_df = networth_history.build()
+# The end of every month, and today as the last row
+bal_df = networth_history.build(resolution="month_end")
 net_worth = bal_df.iloc[-1].net_worth
 invested_money = calculate.invested_money(ledger)
 
-test_df = bal_df.copy()
-# Filter only the last day of the month. I'm using the 28th as a proxy.
-test_df = test_df[(test_df["date"].dt.day == 28)]  # noqa: PLR2004
+one_year_ago = (pd.Timestamp(bal_df.iloc[-1].date) - pd.DateOffset(years=1)).date()
+last_year_net_worth = networth_history.value_on([one_year_ago]).iloc[0].net_worth
 
 # Trajectory parameters
 params = TrajectoryParams(
@@ -180,8 +180,6 @@ metrics_cols[3].metric("Optimal Contribution", format_number(optimal_contrib))
 networth_cols = st.columns([1, 3])
 
 with networth_cols[0]:
-    last_year_net_worth = bal_df.iloc[-365].net_worth
-
     net_worth_indicator = nw_indicator(
         net_worth, last_year_net_worth, "Net Worth", "YoY variation"
     )
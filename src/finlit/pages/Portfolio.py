@@ -2,15 +2,15 @@
 Portfolio dashboard for personal finances.
 """  # noqa: N999
 
-from collections.abc import Callable
 from logging import getLogger
 
 import pytz
 import streamlit as st
 from streamlit.components.v1 import html
 
-from finlit.data import Ledger
+from finlit.data import session_ledger
 from finlit.data.datasets import NetworthHistoryDataset
+from finlit.data.selectors import PostingSelector
 from finlit.data.transformations.portfolio_assets import PorfolioAssets
 from finlit.utils import create_parser, setup_logger, style_css
 from finlit.viz.portfolio.holdings_piechart import holdings_chart
@@ -29,7 +29,7 @@ parser = create_parser()
 args = parser.parse_args()
 setup_logger(verbose=args.verbose)
 logger = getLogger()
-ledger = Ledger(args.ledger)
+ledger = session_ledger(args.ledger, profile=args.profile_load)
 
 #######################
 # CSS styling
@@ -71,23 +71,6 @@ p_df["portfolio"] = p_df["portfolio"].apply(
 )
 
 
-def creater_filter_func(portfolio: str) -> Callable:
-    """
-    Create a filter function for the portfolio.
-    """
-
-    def filter_func(x) -> bool:  # noqa: ANN001
-        prefix = f"Assets:Inversiones:{portfolio}"
-
-        if x.account.lower()[: len(prefix)] == prefix.lower():
-            logger.info(
-                f"len(prefix), x.account.lower()[: len(prefix)].lower()): {len(prefix), x.account.lower()[: len(prefix)].lower()}"
-            )
-        return x.account.lower()[: len(prefix)] == prefix.lower()
-
-    return filter_func
-
-
 # Filter by portfolio equal to global
 global_porfolio = p_df.loc[p_df["portfolio"] == "Global"]
 argy_porfolio = p_df.loc[p_df["portfolio"] == "Argentina"]
@@ -95,24 +78,25 @@ argy_porfolio = p_df.loc[p_df["portfolio"] == "Argentina"]
 # Investment history
 investment_history = NetworthHistoryDataset(ledger)
 
-argy_func = creater_filter_func("ARG")
-re_func = creater_filter_func("RE")
-global_func = creater_filter_func("US")
-
-# All investments
-investment_history_df = investment_history.build(investments=True)
-# Argentina investments
-argy_investment_history_df = investment_history.build(
-    investments=True, filter_func=argy_func
-)
-# Real State investments
-re_investment_history_df = investment_history.build(
-    investments=True, filter_func=re_func
-)
-# Global investments
-global_investment_history_df = investment_history.build(
-    investments=True, filter_func=global_func
+argy_selector = PostingSelector(accounts=("Assets:Inversiones:ARG",))
+re_selector = PostingSelector(accounts=("Assets:Inversiones:RE",))
+global_selector = PostingSelector(accounts=("Assets:Inversiones:US",))
+
+# All investments, and the Argentina, Real State and Global investments, from a
+# single valuation of every day
+histories = investment_history.build_subsets(
+    {
+        "all": None,
+        "argy": argy_selector,
+        "realestate": re_selector,
+        "global": global_selector,
+    },
+    investments=True,
 )
+investment_history_df = histories["all"]
+argy_investment_history_df = histories["argy"]
+re_investment_history_df = histories["realestate"]
+global_investment_history_df = histories["global"]
 
 nw_subsets = [
     NetworthSubset("argy", argy_investment_history_df, color="coral"),
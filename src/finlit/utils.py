@@ -67,6 +67,14 @@ def create_parser() -> ArgumentParser:
         help="Verbose flag for rebuild database",
     )
 
+    parser.add_argument(
+        "--profile-load",
+        dest="profile_load",
+        required=False,
+        action=BooleanOptionalAction,
+        help="Log the time and memory spent in each phase of the ledger load",
+    )
+
     # Add arguments for Postgres connection: host, port, user, password, database
     parser.add_argument(
         "--host",
@@ -24,7 +24,8 @@ def networth_summary(source_df: pd.DataFrame) -> alt.LayerChart:
 
     Args:
     ----
-        source_df (pd.DataFrame): DataFrame with the net worth projections.
+        source_df (pd.DataFrame): Net worth history, at month end or daily
+            resolution.
         balance_df (pd.DataFrame): DataFrame with the balance sheet data.
 
     """
@@ -34,10 +35,10 @@ def networth_summary(source_df: pd.DataFrame) -> alt.LayerChart:
     first_day = pd.Timestamp(today.year, today.month, 1)
     line_color = CYAN_COLOR
 
-    # Less than today
-    # Filter only the first day of the month
+    # The end of every month before the current one. Daily histories are
+    # reduced to the same points.
     source_df = source_df[
-        (source_df["date"].dt.day == 28) & (source_df["date"] < first_day)
+        source_df["date"].dt.is_month_end & (source_df["date"] < first_day)
     ]
 
     nearest = alt.selection_point(
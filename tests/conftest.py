@@ -0,0 +1,85 @@
+"""
+Shared fixtures for the tests.
+"""
+
+import collections
+import datetime
+import textwrap
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from beancount.core import prices
+from finlit.data.ledger import Ledger
+from finlit.data.loader import LoaderConfig
+
+
+@pytest.fixture()
+def write_file(tmp_path: Path) -> Callable[[str, str], Path]:
+    """
+    Return a function that writes a dedented file under the temporary directory.
+    """
+
+    def write(name: str, contents: str) -> Path:
+        path = tmp_path / name
+        path.write_text(textwrap.dedent(contents))
+        return path
+
+    return write
+
+
+@pytest.fixture()
+def cache_dir(tmp_path: Path) -> Path:
+    """
+    Return an empty cache directory.
+    """
+    return tmp_path / "cache"
+
+
+@pytest.fixture()
+def load(cache_dir: Path) -> Callable[..., Ledger]:
+    """
+    Return a function that loads a ledger, caching under `cache_dir` by default.
+    """
+
+    def load_ledger(path: Path, **settings: object) -> Ledger:
+        config = LoaderConfig(**{"cache_dir": cache_dir, **settings})  # type: ignore[]
+        return Ledger(path, config)
+
+    return load_ledger
+
+
+@pytest.fixture()
+def project_missing() -> Callable[..., prices.PriceMap]:
+    """
+    Return the projection of the price map the net worth history used to do.
+
+    Every currency without a rate to the target currency at `date` is
+    projected through each currency both are quoted in, with `prices.project`.
+    """
+
+    def project_missing_currencies(
+        price_map: prices.PriceMap,
+        date: datetime.date,
+        currencies: set[str],
+        target_currency: str,
+    ) -> prices.PriceMap:
+        priced = collections.defaultdict(set)
+        for base, quote in price_map:
+            priced[base].add(quote)
+
+        projections = collections.defaultdict(list)
+        for currency in currencies:
+            _, rate = prices.get_price(price_map, (currency, target_currency), date)
+            if rate is None:
+                for inter_currency in priced[target_currency] & priced[currency]:
+                    projections[inter_currency].append(currency)
+
+        projected = price_map
+        for inter_currency, commodities in projections.items():
+            projected = prices.project(
+                projected, inter_currency, target_currency, commodities
+            )
+        return projected
+
+    return project_missing_currencies
@@ -0,0 +1,89 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from beancount.core import account
+from finlit.data.ledger import Ledger
+
+# `Assets:Inv` shares a string prefix with `Assets:Inversiones`, but isn't part
+# of its subtree.
+LEDGER = """
+    2023-01-01 open Assets:Cash
+    2023-01-01 open Assets:Inv
+    2023-01-01 open Assets:Inversiones:ARG:GGAL
+    2023-01-01 open Assets:Inversiones:USA
+    2023-01-01 open Liabilities:Card
+    2023-01-01 open Income:Job:Salary
+    2023-01-01 open Expenses:Food:Restaurant
+    2023-01-01 open Equity:Opening
+
+    2023-01-02 * "Salary"
+      Assets:Cash  1000 USD
+      Income:Job:Salary
+
+    2023-01-03 * "Invest"
+      Assets:Inversiones:ARG:GGAL  10 GGAL {10 USD}
+      Assets:Inversiones:USA  200 USD
+      Assets:Inv  100 USD
+      Assets:Cash
+
+    2023-01-04 * "Dinner"
+      Expenses:Food:Restaurant  30 USD
+      Liabilities:Card
+"""
+
+PREFIXES = [
+    "Assets",
+    "Assets:Inv",
+    "Assets:Inversiones",
+    "Assets:Inversiones:ARG",
+    "Expenses:Food",
+    "Income",
+    "Assets:Unknown",
+]
+
+
+@pytest.fixture()
+def ledger(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> Ledger:
+    return load(write_file("main.beancount", LEDGER), cache_dir=None)
+
+
+def in_subtree(name: str, prefix: str) -> bool:
+    return name == prefix or name.startswith(prefix + ":")
+
+
+@pytest.mark.parametrize("prefix", PREFIXES)
+def test_subtrees_match_the_account_components(ledger: Ledger, prefix: str) -> None:
+    accounts = ledger.accounts
+    names = ledger.postings["account"].to_pylist()
+
+    assert [accounts.names[i] for i in accounts.subtree(prefix)] == sorted(
+        name for name in accounts.names if in_subtree(name, prefix)
+    )
+    mask = accounts.mask(ledger.postings["account_id"], prefix).to_pylist()
+    assert mask == [in_subtree(name, prefix) for name in names]
+
+
+def test_accounts_know_their_type_ancestors_and_roots(ledger: Ledger) -> None:
+    accounts = ledger.accounts
+
+    # Every ancestor is indexed, even if it was never opened.
+    assert "Assets:Inversiones:ARG" in accounts
+    assert "Assets:Inversiones:AR" not in accounts
+    for name in accounts.names:
+        account_id = accounts.id(name)
+        assert accounts.types[account_id] == account.split(name)[0]
+        assert accounts.leaves[account_id] == account.leaf(name)
+        assert [accounts.names[i] for i in accounts.ancestors[account_id]] == list(
+            reversed(list(account.parents(name)))
+        )
+        for n in range(1, 5):
+            assert accounts.root(account_id, n) == account.root(n, name)
+
+    assert [accounts.names[i] for i in accounts.of_type("Liabilities")] == [
+        "Liabilities",
+        "Liabilities:Card",
+    ]
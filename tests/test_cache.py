@@ -0,0 +1,74 @@
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+from beancount import loader
+from finlit.data.cache import LedgerCache
+from finlit.data.ledger import Ledger
+
+LEDGER = """
+    option "operating_currency" "USD"
+
+    2023-01-01 open Assets:Cash USD
+    2023-01-01 open Expenses:Food USD
+
+    include "food.beancount"
+"""
+
+FOOD = """
+    2023-01-05 * "Market"
+      Expenses:Food  10 USD
+      Assets:Cash
+"""
+
+
+def test_cached_ledger_matches_beancount(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+    write_file("food.beancount", FOOD)
+
+    expected, _, _ = loader.load_file(str(path))
+    first = load(path)
+    second = load(path)
+
+    assert first.entries == expected
+    assert second.entries == expected
+    assert second.fingerprint == first.fingerprint
+
+
+def test_edited_include_invalidates_cache(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    cache_dir: Path,
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+    food = write_file("food.beancount", FOOD)
+    first = load(path)
+    assert LedgerCache(cache_dir).load(os.path.abspath(path)) is not None  # noqa: PTH100
+
+    food.write_text(food.read_text().replace("10 USD", "12 USD"))
+    second = load(path)
+
+    assert second.fingerprint != first.fingerprint
+    assert second.entries == loader.load_file(str(path))[0]
+
+
+def test_new_file_matching_an_include_glob_invalidates_cache(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    cache_dir: Path,
+) -> None:
+    path = write_file("main.beancount", LEDGER.replace("food", "y/*"))
+    (path.parent / "y").mkdir()
+    write_file("y/a.beancount", FOOD)
+    first = load(path)
+    assert len(first.entries) == 3  # noqa: PLR2004
+
+    write_file("y/b.beancount", FOOD.replace("10 USD", "12 USD"))
+    assert LedgerCache(cache_dir).load(os.path.abspath(path)) is None  # noqa: PTH100
+    second = load(path)
+
+    assert second.entries == loader.load_file(str(path))[0]
+    assert len(second.entries) == 4  # noqa: PLR2004
@@ -0,0 +1,124 @@
+import datetime
+from collections.abc import Callable
+from pathlib import Path
+
+from beancount.core import data, inventory, prices
+from beancount.ops import summarize
+from finlit.data.ledger import Ledger
+
+# GGAL is bought in two lots before the cut-off and one of them is sold after
+# it, and the balance assertions after the cut-off rely on the snapshot.
+LEDGER = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash ARS
+    2023-01-01 open Assets:Broker:GGAL GGAL
+    2023-01-01 open Liabilities:Card ARS
+    2023-01-01 open Equity:Opening
+    2023-01-01 open Income:Salary ARS
+    2023-01-01 open Expenses:Food ARS
+
+    2023-01-02 * "Opening"
+      Assets:Cash  100000 ARS
+      Equity:Opening
+
+    2023-01-05 * "Buy"
+      Assets:Broker:GGAL  10 GGAL {400 ARS}
+      Assets:Cash
+
+    2023-02-01 * "Buy"
+      Assets:Broker:GGAL  5 GGAL {500 ARS}
+      Assets:Cash
+
+    2023-02-10 * "Dinner"
+      Expenses:Food  3000 ARS
+      Liabilities:Card
+
+    2023-02-15 price GGAL 450 ARS
+    2023-02-20 price GGAL 480 ARS
+
+    2023-04-01 * "Sell"
+      Assets:Broker:GGAL  -3 GGAL {400 ARS} @ 600 ARS
+      Assets:Cash  1800 ARS
+      Income:Salary  -600 ARS
+
+    2023-04-02 balance Assets:Broker:GGAL  12 GGAL
+    2023-04-02 balance Liabilities:Card  -3000 ARS
+
+    2023-04-10 price GGAL 600 ARS
+"""
+
+CUTOFF = datetime.date(2023, 3, 1)
+
+# The first lot is edited before the cut-off.
+EDITED = LEDGER.replace("10 GGAL {400 ARS}", "20 GGAL {400 ARS}").replace(
+    "balance Assets:Broker:GGAL  12 GGAL", "balance Assets:Broker:GGAL  22 GGAL"
+)
+
+
+def balance_sheet(ledger: Ledger) -> dict[str, inventory.Inventory]:
+    """
+    Return the final positions, with their lots, of the assets and liabilities.
+    """
+    balances, _ = summarize.balance_by_account(ledger.entries)
+    return {
+        name: balance
+        for name, balance in balances.items()
+        if name.startswith(("Assets:", "Liabilities:"))
+    }
+
+
+def assert_matches_full_load(checkpointed: Ledger, full: Ledger) -> None:
+    assert checkpointed.errors == []
+    assert full.errors == []
+    assert balance_sheet(checkpointed) == balance_sheet(full)
+
+    full_prices = prices.build_price_map(full.entries)
+    checkpoint_prices = prices.build_price_map(checkpointed.entries)
+    for offset in range(60):
+        day = CUTOFF + datetime.timedelta(days=offset)
+        assert prices.get_price(checkpoint_prices, ("GGAL", "ARS"), day) == (
+            prices.get_price(full_prices, ("GGAL", "ARS"), day)
+        )
+
+    def after_cutoff(ledger: Ledger) -> list[data.Transaction]:
+        return [
+            entry for entry in data.filter_txns(ledger.entries) if entry.date >= CUTOFF
+        ]
+
+    assert after_cutoff(checkpointed) == after_cutoff(full)
+
+
+def test_checkpoint_matches_a_full_load(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+
+    checkpointed = load(path, checkpoint=CUTOFF)
+    full = load(path, cache_dir=None)
+
+    assert_matches_full_load(checkpointed, full)
+    # Both lots are carried over with their cost and date.
+    ggal = balance_sheet(checkpointed)["Assets:Broker:GGAL"]
+    assert sorted(
+        (position.units.number, position.cost.number, position.cost.date)
+        for position in ggal
+    ) == [
+        (5, 500, datetime.date(2023, 2, 1)),
+        (7, 400, datetime.date(2023, 1, 5)),
+    ]
+
+
+def test_edit_before_the_cutoff_invalidates_the_checkpoint(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+    assert_matches_full_load(
+        load(path, checkpoint=CUTOFF), load(path, cache_dir=None)
+    )
+
+    write_file("main.beancount", EDITED)
+    assert_matches_full_load(
+        load(path, checkpoint=CUTOFF), load(path, cache_dir=None)
+    )
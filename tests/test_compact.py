@@ -0,0 +1,76 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from finlit.data.compact import DECODED_BLOCKS, CompactEntries
+from finlit.data.ledger import Ledger
+
+LEDGER = """
+    2023-01-01 open Assets:Cash
+    2023-01-01 open Assets:Broker:GGAL
+    2023-01-01 open Expenses:Food
+    2023-01-01 open Equity:Opening
+
+    2023-01-02 * "Opening" #start
+      Assets:Cash  100000 ARS
+      Equity:Opening
+
+    2023-01-05 price GGAL 400 ARS
+"""
+
+# One transaction a day, so that the entries span many blocks.
+DAILY = """
+    2023-{month:02}-{day:02} * "Market" "Day {day}" ^receipt-{month}-{day}
+      Expenses:Food  {day}.50 ARS
+      Assets:Cash
+
+    2023-{month:02}-{day:02} * "Buy"
+      Assets:Broker:GGAL  1 GGAL {{{day}00 ARS}}
+      Assets:Cash
+"""
+
+QUERY = "SELECT account, SUM(position) AS balance GROUP BY account ORDER BY account"
+
+
+@pytest.fixture()
+def path(write_file: Callable[[str, str], Path]) -> Path:
+    daily = "".join(
+        DAILY.format(month=month, day=day)
+        for month in range(2, 5)
+        for day in range(1, 29)
+    )
+    return write_file("main.beancount", LEDGER + daily)
+
+
+def test_compact_ledger_has_the_same_entries(
+    path: Path,
+    load: Callable[..., Ledger],
+) -> None:
+    full = load(path, cache_dir=None)
+    compact = load(path, cache_dir=None, compact=True)
+
+    assert isinstance(compact.entries, CompactEntries)
+    assert list(compact.entries) == full.entries
+    assert compact.run_query(QUERY) == full.run_query(QUERY)
+
+
+def test_blocks_are_decoded_on_any_access(
+    path: Path,
+    load: Callable[..., Ledger],
+) -> None:
+    entries = load(path, cache_dir=None).entries
+    block_size = 7
+    compact = CompactEntries(entries, block_size=block_size)
+    assert len(entries) > block_size * DECODED_BLOCKS * 2
+
+    # Going back and forth across blocks decodes the evicted ones again.
+    indexes = [0, len(entries) - 1, block_size, 3, -1, -len(entries), 100, 1]
+    for index in indexes * 2:
+        assert compact[index] == entries[index]
+    assert compact[5:40] == entries[5:40]
+    assert compact[::-9] == entries[::-9]
+    assert [compact.date(i) for i in range(len(compact))] == [
+        entry.date for entry in entries
+    ]
+    with pytest.raises(IndexError):
+        compact[len(entries)]
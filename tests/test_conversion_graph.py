@@ -0,0 +1,72 @@
+import datetime
+from collections.abc import Callable
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from beancount.core import prices
+from finlit.data.ledger import Ledger
+
+# ARS is only quoted in EUR until June, when it gets a direct rate. GGAL is
+# only quoted in ARS, so it's always two pairs away from USD.
+LEDGER = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash ARS
+
+    2023-01-01 price ARS 0.01 EUR
+    2023-01-01 price EUR 1.1 USD
+    2023-03-15 price ARS 0.008 EUR
+    2023-06-01 price ARS 0.004 USD
+    2023-02-01 price GGAL 500 ARS
+"""
+
+DAYS = [
+    datetime.date(2023, 1, 1) + datetime.timedelta(days=offset)
+    for offset in range(365)
+]
+
+
+@pytest.fixture()
+def ledger(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> Ledger:
+    return load(write_file("main.beancount", LEDGER), cache_dir=None)
+
+
+def test_path_is_used_on_days_without_a_direct_rate(ledger: Ledger) -> None:
+    graph = ledger.conversion_graph
+
+    assert graph.rate("ARS", "USD", datetime.date(2023, 3, 1)) == pytest.approx(0.011)
+    assert graph.path("ARS", "USD", datetime.date(2023, 3, 1)) == ("ARS", "EUR", "USD")
+    assert graph.rate("ARS", "USD", datetime.date(2023, 7, 1)) == pytest.approx(0.004)
+    assert graph.path("ARS", "USD", datetime.date(2023, 7, 1)) == ("ARS", "USD")
+    assert graph.rate("ARS", "USD", datetime.date(2022, 12, 31)) is None
+
+    # Before June GGAL goes through EUR too, then through the direct ARS rate.
+    assert graph.rate("GGAL", "USD", datetime.date(2023, 3, 1)) == pytest.approx(5.5)
+    assert graph.rate("GGAL", "USD", datetime.date(2023, 7, 1)) == pytest.approx(2)
+
+
+def test_projected_prices_match_beancount_projection(
+    ledger: Ledger,
+    project_missing: Callable[..., prices.PriceMap],
+) -> None:
+    price_map = ledger.price_matrix.price_map
+    projected = ledger.conversion_graph.projected_price_map("USD")
+
+    for day in DAYS:
+        expected = project_missing(price_map, day, {"ARS"}, "USD")
+        for pair in (("ARS", "USD"), ("USD", "ARS")):
+            assert prices.get_price(projected, pair, day)[1] == (
+                prices.get_price(expected, pair, day)[1]
+            ), (day, pair)
+
+    # Projected rates are the exact products of the quotes.
+    assert prices.get_price(projected, ("ARS", "USD"), datetime.date(2023, 4, 1)) == (
+        datetime.date(2023, 3, 15),
+        Decimal("0.0088"),
+    )
+    assert prices.get_price(
+        projected, ("GGAL", "USD"), datetime.date(2023, 4, 1)
+    ) == (datetime.date(2023, 3, 15), Decimal("4.4000"))
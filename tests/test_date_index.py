@@ -0,0 +1,84 @@
+import datetime
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any
+
+import pytest
+from finlit.data.ledger import Ledger
+
+# Several entries share a date, and there are gaps between the dates.
+LEDGER = """
+    2023-01-01 open Assets:Cash
+    2023-01-01 open Expenses:Food
+    2023-01-01 open Equity:Opening
+
+    2023-01-02 * "Opening"
+      Assets:Cash  1000 USD
+      Equity:Opening
+
+    2023-01-05 * "Lunch"
+      Expenses:Food  10 USD
+      Assets:Cash
+
+    2023-01-05 * "Dinner"
+      Expenses:Food  20 USD
+      Assets:Cash
+
+    2023-01-05 balance Assets:Cash  1000 USD
+
+    2023-02-10 * "Market"
+      Expenses:Food  30 USD
+      Assets:Cash
+
+    2023-02-11 balance Assets:Cash  940 USD
+"""
+
+BOUNDS = [
+    None,
+    *(datetime.date(2022, 12, 31) + datetime.timedelta(days=n) for n in range(45)),
+]
+
+
+def dated(
+    entries: Iterable[Any], start: datetime.date | None, end: datetime.date | None
+) -> list[Any]:
+    return [
+        entry
+        for entry in entries
+        if (start is None or entry.date >= start) and (end is None or entry.date < end)
+    ]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_views_hold_the_entries_of_the_date_range(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    compact: bool,  # noqa: FBT001
+) -> None:
+    ledger = load(write_file("main.beancount", LEDGER), cache_dir=None, compact=compact)
+    entries = list(ledger.entries)
+
+    for start in BOUNDS:
+        for end in BOUNDS:
+            view = ledger.entries_between(start, end)
+            assert list(view) == dated(entries, start, end), (start, end)
+            assert len(view) == len(dated(entries, start, end))
+
+    for day in BOUNDS[1:]:
+        until = ledger.entries_until(day)
+        assert list(until) == dated(entries, None, day + datetime.timedelta(days=1))
+
+
+def test_views_slice_without_copying(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    ledger = load(write_file("main.beancount", LEDGER), cache_dir=None)
+    view = ledger.entries_between(datetime.date(2023, 1, 2), None)
+    entries = dated(ledger.entries, datetime.date(2023, 1, 2), None)
+
+    narrower = view[1:-1]
+    assert list(narrower) == entries[1:-1]
+    assert narrower.start == view.start + 1
+    assert view[::2] == entries[::2]
+    assert view[-1] is entries[-1]
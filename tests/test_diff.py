@@ -0,0 +1,133 @@
+import datetime
+from collections.abc import Callable
+from decimal import Decimal
+from pathlib import Path
+
+from beancount.core import compare, data
+from finlit.data.diff import EMPTY_DIFF, diff_entries, entry_key
+from finlit.data.ledger import Ledger
+
+BEFORE = """
+    2023-01-01 open Assets:Cash USD
+    2023-01-01 open Equity:Opening USD
+    2023-01-01 open Expenses:Food USD
+    2023-01-01 open Expenses:Rent USD
+
+    2023-01-02 * "Salary"
+      Assets:Cash  1000 USD
+      Equity:Opening
+
+    2023-02-01 * "Rent"
+      Expenses:Rent  300 USD
+      Assets:Cash
+
+    2023-03-05 * "Market"
+      Expenses:Food  10 USD
+      Assets:Cash
+
+    2023-03-06 * "Market"
+      Expenses:Food  20 USD
+      Assets:Cash
+"""
+
+# A note pushes every entry below it down two lines, the rent is raised, the
+# first market is deleted and a new one is added at the end.
+AFTER = """
+    2023-01-01 open Assets:Cash USD
+    2023-01-01 open Equity:Opening USD
+    2023-01-01 open Expenses:Food USD
+    2023-01-01 open Expenses:Rent USD
+
+    2023-01-02 note Assets:Cash "Opened the account"
+
+    2023-01-02 * "Salary"
+      Assets:Cash  1000 USD
+      Equity:Opening
+
+    2023-02-01 * "Rent"
+      Expenses:Rent  350 USD
+      Assets:Cash
+
+    2023-03-06 * "Market"
+      Expenses:Food  20 USD
+      Assets:Cash
+
+    2023-04-01 * "Market"
+      Expenses:Food  15 USD
+      Assets:Cash
+"""
+
+
+def test_diff_matches_a_content_comparison(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", BEFORE)
+    before = load(path, cache_dir=None)
+    write_file("main.beancount", AFTER)
+    after = load(path, cache_dir=None)
+
+    diff = after.diff(before)
+
+    # Every entry that beancount finds only on one side is reported exactly
+    # once, either on its own or as half of a change.
+    _, only_before, only_after = compare.compare_entries(before.entries, after.entries)
+    old = [*diff.removed, *(old for old, _ in diff.changed)]
+    new = [*diff.added, *(new for _, new in diff.changed)]
+    assert sorted(map(compare.hash_entry, old)) == sorted(
+        map(compare.hash_entry, only_before)
+    )
+    assert sorted(map(compare.hash_entry, new)) == sorted(
+        map(compare.hash_entry, only_after)
+    )
+
+    # The moved salary and second market aren't reported at all.
+    [(old_rent, new_rent)] = [
+        pair for pair in diff.changed if isinstance(pair[0], data.Transaction)
+    ]
+    assert old_rent.postings[0].units.number == Decimal(300)
+    assert new_rent.postings[0].units.number == Decimal(350)
+    assert [entry.date for entry in diff.removed] == [datetime.date(2023, 3, 5)]
+    assert {entry.date for entry in diff.added} == {
+        datetime.date(2023, 1, 2),
+        datetime.date(2023, 4, 1),
+    }
+
+    assert diff.first_date == datetime.date(2023, 1, 2)
+    assert diff.currencies == {"USD"}
+    assert {"Expenses:Rent", "Expenses:Food", "Assets:Cash"} <= diff.accounts
+
+
+def test_same_contents_have_no_diff(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", BEFORE)
+    before = load(path, cache_dir=None)
+    after = load(path, cache_dir=None)
+
+    assert after.diff(before) is EMPTY_DIFF
+    assert EMPTY_DIFF.first_date is None
+
+
+def test_entries_without_metadata_are_diffed(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    ledger = load(write_file("main.beancount", BEFORE), cache_dir=None)
+    # Plugins may create entries without any metadata.
+    price = data.Price(
+        None,  # type: ignore[arg-type]
+        datetime.date(2023, 3, 5),
+        "EUR",
+        data.Amount(Decimal("1.1"), "USD"),
+    )
+    entries = [*ledger.entries, price]
+
+    diff = diff_entries(
+        ledger.entries, ledger.entry_keys, entries, [entry_key(e) for e in entries]
+    )
+
+    assert list(diff.added) == [price]
+    assert not diff.removed
+    assert not diff.changed
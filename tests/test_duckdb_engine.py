@@ -0,0 +1,110 @@
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from finlit.data.datasets import AllExpensesDataset
+from finlit.data.ledger import Ledger
+from finlit.data.transformations import calculate
+from finlit.data.transformations.all_expenses_period import all_expenses_period
+from finlit.data.transformations.expenses_showcase import expenses_showcase
+
+LEDGER = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash
+    2023-01-01 open Equity:Opening
+
+    2023-02-01 price ARS 0.01 USD
+
+    2023-01-02 * "Before the first price"
+      Assets:Cash  1000 ARS
+      Equity:Opening
+
+    2023-03-01 * "Salary"
+      Assets:Cash  2000 ARS
+      Assets:Cash  10 USD
+      Equity:Opening
+"""
+
+EXPENSES = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash
+    2023-01-01 open Expenses:Food:Restaurant
+    2023-01-01 open Expenses:Home:Rent
+
+    2023-01-01 price ARS 0.01 USD
+    2023-03-15 price ARS 0.008 USD
+
+    2023-03-02 * "Rent"
+      Expenses:Home:Rent  50000 ARS
+      Assets:Cash
+
+    2023-03-20 * "Dinner" #exclude
+      Expenses:Food:Restaurant  12.50 USD
+      Assets:Cash
+
+    2023-04-01 * "Dinner"
+      Expenses:Food:Restaurant  3000 ARS
+      Assets:Cash
+"""
+
+QUERY = """
+    SELECT date, number, currency, CONVERT(number, currency, 'USD', date) AS usd
+    FROM postings
+    WHERE account = 'Assets:Cash'
+    ORDER BY date, currency
+"""
+
+
+@pytest.fixture()
+def ledger(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> Ledger:
+    return load(write_file("main.beancount", LEDGER), cache_dir=None)
+
+
+def test_conversions_are_null_without_a_rate(ledger: Ledger) -> None:
+    result = ledger.sql_engine.query(QUERY)
+
+    assert result["currency"].tolist() == ["ARS", "ARS", "USD"]
+    assert pd.isna(result["usd"][0])
+    assert result["usd"][1:].tolist() == pytest.approx([20, 10])
+
+
+def test_queries_can_run_from_several_threads(ledger: Ledger) -> None:
+    expected = ledger.sql_engine.query(QUERY)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(ledger.sql_engine.query, [QUERY] * 16))
+
+    for result in results:
+        pd.testing.assert_frame_equal(result, expected)
+
+
+def test_pages_read_the_expenses_like_the_bql_table(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    ledger = load(write_file("main.beancount", EXPENSES), cache_dir=None)
+    expenses = AllExpensesDataset(ledger, "all_expenses").build()
+    # The types of the table built with BQL: dates and decimals.
+    bql_expenses = expenses.assign(
+        date=expenses["date"].dt.date,
+        amount_ars=[Decimal(str(amount)) for amount in expenses["amount_ars"]],
+        amount_usd=[Decimal(str(amount)) for amount in expenses["amount_usd"]],
+    )
+
+    for net_expenses in (False, True):
+        period = all_expenses_period(expenses, "2023-03-01", net_expenses)
+        bql_period = all_expenses_period(bql_expenses, "2023-03-01", net_expenses)
+
+        pd.testing.assert_frame_equal(period, bql_period)
+        pd.testing.assert_frame_equal(
+            expenses_showcase(period), expenses_showcase(bql_period)
+        )
+        assert calculate.sum_field(period, "Amount_Usd") == pytest.approx(
+            500 + (0 if net_expenses else 12.5)
+        )
@@ -0,0 +1,110 @@
+import datetime
+from collections.abc import Callable
+from pathlib import Path
+
+from finlit.data.ledger import Ledger
+from finlit.data.query_cache import QueryCache
+
+LEDGER = """
+    2023-01-01 open Assets:Cash USD
+    2023-01-01 open Equity:Opening USD
+    2023-01-01 open Expenses:Food USD
+
+    2023-01-02 * "Salary"
+      Assets:Cash  1000 USD
+      Equity:Opening
+
+    2023-03-05 * "Market"
+      Expenses:Food  10 USD
+      Assets:Cash
+"""
+
+QUERY = "SELECT date, account, number"
+
+
+def test_checkpoint_is_part_of_the_fingerprint(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+    query_cache = QueryCache()
+    full = Ledger(path, load(path).config, query_cache)
+    checkpointed = Ledger(
+        path,
+        load(path, checkpoint=datetime.date(2023, 2, 1)).config,
+        query_cache,
+    )
+
+    assert checkpointed.fingerprint != full.fingerprint
+    assert checkpointed != full
+    assert checkpointed.disk_fingerprint() == checkpointed.fingerprint
+
+    # Each ledger gets the results of its own entries, in either order.
+    assert len(full.run_query(QUERY)[1]) == 4  # noqa: PLR2004
+    assert len(checkpointed.run_query(QUERY)[1]) != 4  # noqa: PLR2004
+    assert len(full.run_query(QUERY)[1]) == 4  # noqa: PLR2004
+
+
+PRICES = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash ARS
+
+    2023-01-02 * "Salary"
+      Assets:Cash  1000 ARS
+      Assets:Cash  -1000 ARS
+
+    2023-01-05 price ARS 0.010 USD
+    2023-01-05 price ARS 0.011 USD
+    2023-01-06 price ARS 0.011 USD
+    2023-02-10 price ARS 0.012 USD
+    2023-02-20 price ARS 0.013 USD
+"""
+
+
+def test_price_compaction_is_part_of_the_fingerprint(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", PRICES)
+    full = load(path)
+    compact = load(path, compact_prices=True)
+    monthly = load(
+        path, compact_prices=True, monthly_prices_before=datetime.date(2023, 3, 1)
+    )
+
+    fingerprints = {full.fingerprint, compact.fingerprint, monthly.fingerprint}
+    assert len(fingerprints) == 3  # noqa: PLR2004
+    assert compact.disk_fingerprint() == compact.fingerprint
+
+    # The snapshots are told apart, so their differences show up.
+    diff = compact.diff(full)
+    assert len(diff.removed) == 2  # noqa: PLR2004
+    assert diff.first_date == datetime.date(2023, 1, 5)
+    assert not monthly.diff(compact).is_empty
+
+
+def test_new_file_matching_an_include_glob_changes_the_fingerprint(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", 'include "y/*.beancount"\n')
+    (path.parent / "y").mkdir()
+    write_file("y/a.beancount", LEDGER)
+    query_cache = QueryCache()
+    first = Ledger(path, load(path).config, query_cache)
+    assert len(first.run_query(QUERY)[1]) == 4  # noqa: PLR2004
+    assert first.disk_fingerprint() == first.fingerprint
+
+    write_file(
+        "y/b.beancount",
+        """
+        2023-04-01 * "Market"
+          Expenses:Food  5 USD
+          Assets:Cash
+        """,
+    )
+    second = Ledger(path, load(path).config, query_cache)
+
+    assert first.disk_fingerprint() != first.fingerprint
+    assert first.disk_fingerprint() == second.fingerprint
+    assert len(second.run_query(QUERY)[1]) == 6  # noqa: PLR2004
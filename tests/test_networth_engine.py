@@ -0,0 +1,146 @@
+import datetime
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import pytest
+from beancount.core import account_types, convert, data, inventory, prices
+from beancount.parser import options
+from finlit.data.datasets.networth_history import (
+    INVESTMENT_PREFIX,
+    NetworthHistoryDataset,
+)
+from finlit.data.ledger import Ledger
+
+# ARS only has a direct USD rate from June, and is projected through EUR before.
+PROJECTED = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash ARS
+    2023-01-01 open Equity:Opening ARS
+
+    2023-01-01 price ARS 0.01 EUR
+    2023-01-01 price EUR 1.1 USD
+    2023-06-01 price ARS 0.004 USD
+
+    2023-01-02 * "Salary"
+      Assets:Cash  1000 ARS
+      Equity:Opening
+"""
+
+# GGAL is held at cost in ARS, is unpriced until March, and is converted
+# through the cost currency after that.
+AT_COST = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash ARS
+    2023-01-01 open Assets:Inversiones:ARG:GGAL GGAL
+    2023-01-01 open Liabilities:Card USD
+    2023-01-01 open Equity:Opening
+    2023-01-01 open Expenses:Food
+
+    2023-01-01 price ARS 0.01 EUR
+    2023-01-01 price EUR 1.1 USD
+    2023-06-01 price ARS 0.004 USD
+
+    2023-01-02 * "Opening"
+      Assets:Cash  100000 ARS
+      Equity:Opening
+
+    2023-02-01 * "Buy"
+      Assets:Inversiones:ARG:GGAL  10 GGAL {400 ARS}
+      Assets:Cash  -4000 ARS
+
+    2023-03-10 price GGAL 450 ARS
+
+    2023-04-01 * "Dinner"
+      Expenses:Food  20 USD
+      Liabilities:Card
+
+    2023-08-01 * "Sell"
+      Assets:Inversiones:ARG:GGAL  -4 GGAL {400 ARS} @ 600 ARS
+      Assets:Cash  2400 ARS
+      Equity:Opening
+"""
+
+DAYS = [
+    datetime.date(2023, 1, 2) + datetime.timedelta(days=offset)
+    for offset in range(364)
+]
+
+
+def baseline_history(
+    ledger: Ledger,
+    days: list[datetime.date],
+    project_missing: Callable[..., prices.PriceMap],
+    *,
+    investments: bool,
+) -> np.ndarray:
+    """
+    Value the days like the net worth history used to, one inventory at a time.
+    """
+    acctypes = options.get_account_types(ledger.options)
+    price_map = prices.build_price_map(ledger.entries)
+
+    def to_usd(
+        holdings: inventory.Inventory,
+        price_map: prices.PriceMap,
+        day: datetime.date,
+    ) -> float:
+        converted = holdings.reduce(convert.convert_position, "USD", price_map, day)
+        usd = converted.split().get("USD", inventory.Inventory())
+        position = usd.get_only_position()
+        return float(position.units.number) if position is not None else 0.0
+
+    rows = []
+    for day in days:
+        balance = inventory.Inventory()
+        liabilities = inventory.Inventory()
+        assets = inventory.Inventory()
+        for entry in data.filter_txns(ledger.entries):
+            if entry.date >= day:
+                break
+            for posting in entry.postings:
+                acctype = account_types.get_account_type(posting.account)
+                if acctype not in (acctypes.assets, acctypes.liabilities):
+                    continue
+                if investments and not posting.account.startswith(INVESTMENT_PREFIX):
+                    continue
+                balance.add_position(posting)
+                if acctype == acctypes.liabilities:
+                    liabilities.add_position(posting)
+                else:
+                    assets.add_position(posting)
+
+        value_balance = balance.reduce(convert.get_value, price_map, day)
+        projected = project_missing(
+            price_map, day, {pos.units.currency for pos in value_balance}, "USD"
+        )
+        rows.append(
+            [
+                to_usd(balance, projected, day),
+                to_usd(liabilities, projected, day),
+                to_usd(assets, projected, day),
+            ]
+        )
+    return np.array(rows)
+
+
+@pytest.mark.parametrize("investments", [False, True])
+@pytest.mark.parametrize("contents", [PROJECTED, AT_COST], ids=["projected", "cost"])
+def test_engine_matches_daily_inventories(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    project_missing: Callable[..., prices.PriceMap],
+    contents: str,
+    investments: bool,  # noqa: FBT001
+) -> None:
+    ledger = load(write_file("main.beancount", contents), cache_dir=None)
+
+    history = NetworthHistoryDataset(ledger).value_on(DAYS, investments=investments)
+    expected = baseline_history(ledger, DAYS, project_missing, investments=investments)
+
+    assert [day.date() for day in history["date"]] == DAYS
+    np.testing.assert_allclose(
+        history[["net_worth", "liabilities", "assets"]].to_numpy(),
+        expected,
+        rtol=1e-9,
+    )
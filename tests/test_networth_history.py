@@ -0,0 +1,162 @@
+import datetime
+import logging
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from finlit.data.datasets.networth_history import NetworthHistoryDataset, Resolution
+from finlit.data.ledger import Ledger
+from finlit.data.networth_engine import NetworthEngine
+from finlit.data.selectors import PostingSelector
+
+LEDGER = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash ARS
+    2023-01-01 open Assets:Bank USD
+    2023-01-01 open Equity:Opening
+
+    2023-01-01 price ARS 0.010 USD
+    2023-03-01 price ARS 0.008 USD
+    2023-06-01 price ARS 0.006 USD
+    2023-09-01 price ARS 0.004 USD
+
+    2023-01-02 * "Opening"
+      Assets:Cash  100000 ARS
+      Assets:Bank  500 USD
+      Equity:Opening
+
+    2023-04-01 * "Salary"
+      Assets:Cash  50000 ARS
+      Equity:Opening
+"""
+
+# The June price is edited and a transaction is added in August.
+EDITED = LEDGER.replace("0.006 USD", "0.005 USD") + """
+    2023-08-01 * "Bonus"
+      Assets:Bank  100 USD
+      Equity:Opening
+"""
+
+
+SUBSETS = {"all": None, "cash": PostingSelector(accounts=("Assets:Cash",))}
+
+
+def valued_days(caplog: pytest.LogCaptureFixture) -> list[int]:
+    """
+    Return how many days each build since the last call had to value.
+    """
+    counts = [
+        int(record.args[0])  # type: ignore[index]
+        for record in caplog.records
+        if record.msg == "Valuing %s of %s days of net worth."
+    ]
+    caplog.clear()
+    return counts
+
+
+def test_history_is_updated_from_the_first_changed_day(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    caplog.set_level(logging.DEBUG)
+    path = write_file("main.beancount", LEDGER)
+    days = NetworthHistoryDataset(load(path))._days()  # noqa: SLF001
+
+    first = NetworthHistoryDataset(load(path)).build()
+    assert valued_days(caplog) == [len(days)]
+
+    write_file("main.beancount", EDITED)
+    updated = NetworthHistoryDataset(load(path)).build()
+    fresh = NetworthHistoryDataset(load(path, cache_dir=None)).build()
+
+    # Days before the edited price are kept, the rest are valued again.
+    assert valued_days(caplog) == [
+        sum(day >= datetime.date(2023, 6, 1) for day in days)
+    ]
+    pd.testing.assert_frame_equal(updated, fresh)
+    assert not updated.equals(first)
+
+
+def test_unchanged_ledger_reuses_the_history(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    cache_dir: Path,
+    caplog: pytest.LogCaptureFixture,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    caplog.set_level(logging.DEBUG)
+    path = write_file("main.beancount", LEDGER)
+    first = NetworthHistoryDataset(load(path)).build()
+    [stored] = (cache_dir / "networth").glob("*.parquet")
+    written = stored.stat().st_mtime_ns
+    caplog.clear()
+
+    def fail(_: NetworthEngine) -> pd.Series:
+        raise AssertionError
+
+    # The fingerprint matches, so nothing is hashed, valued or written.
+    monkeypatch.setattr(NetworthEngine, "day_digests", fail)
+    second = NetworthHistoryDataset(load(path)).build()
+
+    assert valued_days(caplog) == [0]
+    assert stored.stat().st_mtime_ns == written
+    pd.testing.assert_frame_equal(second, first)
+
+
+@pytest.mark.parametrize("resolution", ["weekly", "month_end", "quarter_end"])
+def test_resolutions_sample_the_daily_history(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    resolution: Resolution,
+) -> None:
+    dataset = NetworthHistoryDataset(
+        load(write_file("main.beancount", LEDGER), cache_dir=None)
+    )
+    days = pd.to_datetime(pd.Series(dataset._days(resolution)))  # noqa: SLF001
+
+    daily = dataset.build_subsets(SUBSETS)
+    sampled = dataset.build_subsets(SUBSETS, resolution=resolution)
+
+    for name, history in sampled.items():
+        assert history["date"].tolist() == days.tolist()
+        expected = daily[name][daily[name]["date"].isin(days)]
+        pd.testing.assert_frame_equal(history, expected.reset_index(drop=True))
+
+
+def test_subsets_are_updated_from_the_changed_day(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    caplog.set_level(logging.DEBUG)
+    path = write_file("main.beancount", LEDGER)
+    days = NetworthHistoryDataset(load(path))._days()  # noqa: SLF001
+    first = NetworthHistoryDataset(load(path)).build_subsets(SUBSETS)
+    caplog.clear()
+
+    # Only the digest of the day of the new transaction changes, and it counts
+    # in the net worth from the next day on.
+    changed = datetime.date(2023, 8, 1)
+    write_file(
+        "main.beancount",
+        LEDGER
+        + """
+        2023-08-01 * "Gift"
+          Assets:Cash  1000 ARS
+          Equity:Opening
+        """,
+    )
+    updated = NetworthHistoryDataset(load(path)).build_subsets(SUBSETS)
+    fresh = NetworthHistoryDataset(load(path, cache_dir=None)).build_subsets(SUBSETS)
+
+    assert valued_days(caplog) == [sum(day > changed for day in days)]
+    limit = pd.Timestamp(changed)
+    for name in SUBSETS:
+        pd.testing.assert_frame_equal(updated[name], fresh[name])
+        before = updated[name]["date"] <= limit
+        pd.testing.assert_frame_equal(
+            updated[name][before], first[name][first[name]["date"] <= limit]
+        )
+        assert not updated[name][~before].equals(first[name][~before])
@@ -0,0 +1,39 @@
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+from finlit.data.ledger import Ledger
+
+MAIN = """
+    2023-01-01 open Assets:Cash USD
+    2023-01-01 open Expenses:Food USD
+
+    include "a.beancount"
+    include "b.beancount"
+"""
+
+TRANSACTION = """
+    2023-01-0{day} * "Market"
+      Expenses:Food  10 USD
+      Assets:Cash
+"""
+
+
+def test_parallel_parse_from_a_thread_matches_sequential(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", MAIN)
+    write_file("a.beancount", TRANSACTION.format(day=2))
+    write_file("b.beancount", TRANSACTION.format(day=3))
+
+    # Loads from watcher threads must not fork the threaded process.
+    loaded: list[Ledger] = []
+    thread = threading.Thread(
+        target=lambda: loaded.append(load(path, cache_dir=None, workers=2))
+    )
+    thread.start()
+    thread.join(timeout=60)
+
+    assert loaded
+    assert loaded[0].entries == load(path, cache_dir=None, workers=1).entries
@@ -0,0 +1,90 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from finlit.data import loader
+from finlit.data.ledger import Ledger
+
+MAIN = """
+    2023-01-01 open Assets:Cash USD
+    2023-01-01 open Expenses:Food USD
+
+    include "a.beancount"
+    include "b.beancount"
+"""
+
+TRANSACTION = """
+    2023-01-0{day} * "Market"
+      Expenses:Food  {amount} USD
+      Assets:Cash
+"""
+
+
+@pytest.fixture()
+def parsed(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """
+    Record the files that are actually parsed.
+    """
+    paths: list[str] = []
+    parse_source = loader.parse_source
+
+    def recording_parse_source(path: str) -> loader.ParsedFile:
+        paths.append(Path(path).name)
+        return parse_source(path)
+
+    monkeypatch.setattr(loader, "parse_source", recording_parse_source)
+    return paths
+
+
+def test_only_changed_files_are_parsed(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    parsed: list[str],
+) -> None:
+    path = write_file("main.beancount", MAIN)
+    write_file("a.beancount", TRANSACTION.format(day=2, amount=10))
+    b = write_file("b.beancount", TRANSACTION.format(day=3, amount=20))
+    load(path)
+    assert sorted(parsed) == ["a.beancount", "b.beancount", "main.beancount"]
+
+    parsed.clear()
+    b.write_text(b.read_text().replace("20 USD", "25 USD"))
+    ledger = load(path)
+
+    assert parsed == ["b.beancount"]
+    assert ledger.entries[-1].postings[0].units.number == 25  # noqa: PLR2004
+
+
+def test_parser_output_is_only_kept_in_memory_on_request(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    path = write_file("main.beancount", MAIN)
+    write_file("a.beancount", TRANSACTION.format(day=2, amount=10))
+    write_file("b.beancount", TRANSACTION.format(day=3, amount=20))
+    files = {str(path.parent / f"{name}.beancount") for name in ("main", "a", "b")}
+
+    load(path, cache_dir=None)
+    assert not files & set(loader.get_parse_cache(None)._memory)  # noqa: SLF001
+
+    load(path, cache_dir=None, keep_parsed=True)
+    in_memory = loader.get_parse_cache(None, in_memory=True)
+    assert files <= set(in_memory._memory)  # noqa: SLF001
+
+
+def test_files_no_longer_included_are_forgotten(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+    cache_dir: Path,
+) -> None:
+    path = write_file("main.beancount", MAIN)
+    write_file("a.beancount", TRANSACTION.format(day=2, amount=10))
+    b = write_file("b.beancount", TRANSACTION.format(day=3, amount=20))
+    load(path, keep_parsed=True)
+
+    path.write_text(path.read_text().replace('include "b.beancount"', ""))
+    load(path, keep_parsed=True)
+
+    parse_cache = loader.get_parse_cache(cache_dir, in_memory=True)
+    assert str(b) not in parse_cache._memory  # noqa: SLF001
+    assert str(b) not in parse_cache._stamps  # noqa: SLF001
@@ -0,0 +1,130 @@
+import calendar
+import datetime
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+from beancount.core import data, prices
+from finlit.data.ledger import Ledger
+
+# Several quotes a day, repeated rates, quotes in every month and a pair quoted
+# both ways.
+LEDGER = """
+    2023-01-01 commodity ARS
+
+    2023-01-03 price ARS 0.0100 USD
+    2023-01-03 price ARS 0.0101 USD
+    2023-01-10 price ARS 0.0101 USD
+    2023-01-20 price ARS 0.0098 USD
+    2023-02-01 price ARS 0.0095 USD
+    2023-02-14 price ARS 0.0095 USD
+    2023-02-27 price ARS 0.0093 USD
+    2023-03-02 price ARS 0.0090 USD
+    2023-03-02 price ARS 0.0091 USD
+    2023-03-15 price ARS 0.0091 USD
+    2023-03-30 price ARS 0.0089 USD
+    2023-04-03 price ARS 0.0088 USD
+    2023-04-03 price ARS 0.0087 USD
+    2023-04-10 price ARS 0.0087 USD
+    2023-04-20 price ARS 0.0085 USD
+    2023-05-05 price ARS 0.0080 USD
+    2023-05-05 price ARS 0.0080 USD
+
+    2023-01-05 price EUR 1.08 USD
+    2023-02-05 price EUR 1.07 USD
+    2023-02-20 price EUR 1.09 USD
+    2023-04-12 price EUR 1.10 USD
+
+    2023-01-15 price GBP 1.20 USD
+    2023-02-15 price USD 0.82 GBP
+    2023-02-15 price GBP 1.21 USD
+    2023-04-15 price USD 0.81 GBP
+"""
+
+CUTOFF = datetime.date(2023, 4, 1)
+
+PAIRS = [
+    (base, quote)
+    for base in ("ARS", "USD", "EUR", "GBP")
+    for quote in ("ARS", "USD", "EUR", "GBP")
+    if base != quote
+]
+
+DAYS = [datetime.date(2022, 12, 20) + datetime.timedelta(days=n) for n in range(200)]
+
+
+def month_ends() -> list[datetime.date]:
+    """
+    Return the last day of every month before the cut-off.
+    """
+    return [
+        datetime.date(2023, month, calendar.monthrange(2023, month)[1])
+        for month in range(1, CUTOFF.month)
+    ]
+
+
+@pytest.fixture()
+def full(write_file: Callable[[str, str], Path], load: Callable[..., Ledger]) -> Ledger:
+    return load(write_file("main.beancount", LEDGER), cache_dir=None)
+
+
+@pytest.mark.parametrize("monthly_before", [None, CUTOFF])
+def test_compacted_prices_convert_like_every_price(
+    full: Ledger,
+    load: Callable[..., Ledger],
+    monthly_before: datetime.date | None,
+) -> None:
+    compact = load(
+        Path(full.path),
+        cache_dir=None,
+        compact_prices=True,
+        monthly_prices_before=monthly_before,
+    )
+    assert sum(isinstance(entry, data.Price) for entry in compact.entries) < sum(
+        isinstance(entry, data.Price) for entry in full.entries
+    )
+
+    start = monthly_before or DAYS[0]
+    for day in DAYS:
+        if day < start:
+            continue
+        for pair in PAIRS:
+            assert prices.get_price(compact.price_map, pair, day)[1] == (
+                prices.get_price(full.price_map, pair, day)[1]
+            ), (pair, day)
+            currency, target = pair
+            assert compact.price_matrix.rate(currency, target, day) == (
+                full.price_matrix.rate(currency, target, day)
+            ), (pair, day)
+
+
+def test_month_ends_before_the_cutoff_keep_the_last_price(
+    full: Ledger,
+    load: Callable[..., Ledger],
+) -> None:
+    compact = load(
+        Path(full.path),
+        cache_dir=None,
+        compact_prices=True,
+        monthly_prices_before=CUTOFF,
+    )
+
+    for day in month_ends():
+        for pair in PAIRS:
+            assert prices.get_price(compact.price_map, pair, day)[1] == (
+                prices.get_price(full.price_map, pair, day)[1]
+            ), (pair, day)
+
+    # Only the last quote of each month is left before the cut-off.
+    dates = [
+        entry.date
+        for entry in compact.entries
+        if isinstance(entry, data.Price)
+        and entry.currency == "ARS"
+        and entry.date < CUTOFF
+    ]
+    assert dates == [
+        datetime.date(2023, 1, 20),
+        datetime.date(2023, 2, 27),
+        datetime.date(2023, 3, 30),
+    ]
@@ -0,0 +1,59 @@
+import datetime
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+from beancount.core import prices
+from finlit.data.ledger import Ledger
+from finlit.data.price_matrix import PriceMatrix
+
+# Two quotes on the same day, a pair quoted both ways and a zero price, which
+# beancount doesn't invert.
+LEDGER = """
+    2023-01-01 commodity ARS
+
+    2023-01-10 price ARS 0.010 USD
+    2023-01-10 price ARS 0.011 USD
+    2023-02-01 price ARS 0.009 USD
+    2023-03-01 price USD 120 ARS
+    2023-01-15 price EUR 1.1 USD
+    2023-02-15 price EUR 1.05 USD
+    2023-02-01 price OPT 0 USD
+    2023-03-01 price OPT 2 USD
+"""
+
+CURRENCIES = ["ARS", "USD", "EUR", "OPT", "GBP"]
+
+# From before the first quote until after the end of the calendar.
+DAYS = [
+    datetime.date(2023, 1, 1) + datetime.timedelta(days=offset)
+    for offset in range(100)
+]
+
+
+def test_rates_match_beancount_lookups(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> None:
+    ledger = load(write_file("main.beancount", LEDGER), cache_dir=None)
+    price_map = prices.build_price_map(ledger.entries)
+    matrix = PriceMatrix(price_map, end=datetime.date(2023, 3, 10))
+
+    triples = [
+        (currency, target, day)
+        for currency in CURRENCIES
+        for target in CURRENCIES
+        for day in DAYS
+    ]
+    expected = []
+    for currency, target, day in triples:
+        _, rate = prices.get_price(price_map, (currency, target), day)
+        expected.append(np.nan if rate is None else float(rate))
+        assert matrix.rate(currency, target, day) == (
+            None if rate is None else float(rate)
+        ), (currency, target, day)
+
+    currencies, targets, days = zip(*triples)
+    np.testing.assert_array_equal(
+        matrix.lookup(list(currencies), list(targets), list(days)), expected
+    )
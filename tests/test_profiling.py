@@ -0,0 +1,29 @@
+import tracemalloc
+
+from finlit.data.profiling import LoadProfiler
+
+
+def test_tracing_started_elsewhere_is_left_running() -> None:
+    tracemalloc.start()
+    try:
+        with LoadProfiler() as profiler, profiler.phase("load"):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_tracing_lasts_until_the_last_profiler_exits() -> None:
+    assert not tracemalloc.is_tracing()
+    first = LoadProfiler().__enter__()
+    second = LoadProfiler().__enter__()
+
+    first.__exit__(None, None, None)
+    assert tracemalloc.is_tracing()
+    with second.phase("load"):
+        data = [bytes(1000) for _ in range(100)]
+
+    second.__exit__(None, None, None)
+    assert not tracemalloc.is_tracing()
+    assert second.report().phases[0].peak_bytes >= 100_000  # noqa: PLR2004
+    assert data
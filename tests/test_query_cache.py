@@ -0,0 +1,91 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+from beancount.core import amount
+from beancount.core.number import D
+from finlit.data.ledger import Ledger
+from finlit.data.loader import LoaderConfig
+from finlit.data.query_cache import QueryCache, estimate_size
+
+LEDGER = """
+    2023-01-01 open Assets:Cash USD
+    2023-01-01 open Equity:Opening USD
+
+    2023-01-02 * "Salary"
+      Assets:Cash  1000 USD
+      Equity:Opening
+"""
+
+BALANCES = "SELECT account, SUM(position) AS balance GROUP BY account ORDER BY account"
+
+
+def frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({"number": range(rows)}, dtype=float)
+
+
+def test_least_recently_used_results_are_evicted_over_the_budget() -> None:
+    size = estimate_size(frame(100))
+    cache = QueryCache(max_bytes=2 * size)
+
+    cache.get_or_compute("a", lambda: frame(100))
+    cache.get_or_compute("b", lambda: frame(100))
+    cache.get_or_compute("a", lambda: frame(100))
+    cache.get_or_compute("c", lambda: frame(100))
+
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 3, 1)
+    assert stats.entries == 2  # noqa: PLR2004
+    assert stats.size_bytes <= stats.max_bytes
+
+    # "b" was the least recently used.
+    computed: list[str] = []
+    for key in ("a", "c", "b"):
+        cache.get_or_compute(key, lambda key=key: computed.append(key) or frame(100))
+    assert computed == ["b"]
+
+    # Results larger than the whole budget are never stored.
+    cache.get_or_compute("big", lambda: frame(1000))
+    cache.get_or_compute("big", lambda: frame(1000))
+    assert cache.stats.misses == 6  # noqa: PLR2004
+    assert cache.stats.size_bytes <= cache.stats.max_bytes
+
+    cache.resize(size)
+    assert cache.stats.entries == 1
+
+
+def test_results_are_invalidated_when_the_ledger_changes(
+    write_file: Callable[[str, str], Path],
+    cache_dir: Path,
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+    config = LoaderConfig(cache_dir=cache_dir)
+    cache = QueryCache()
+
+    ledger = Ledger(path, config, cache)
+    _, first = ledger.run_query(BALANCES)
+    assert Ledger(path, config, cache).run_query(BALANCES)[1] == first
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+    write_file("main.beancount", LEDGER.replace("1000 USD", "1500 USD"))
+    edited = Ledger(path, config, cache)
+    _, rows = edited.run_query(BALANCES)
+
+    assert edited.fingerprint != ledger.fingerprint
+    assert cache.stats.misses == 2  # noqa: PLR2004
+    assert rows[0].balance.get_currency_units("USD").number == D(1500)
+
+
+def test_cached_rows_are_copied(
+    write_file: Callable[[str, str], Path],
+    cache_dir: Path,
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+    ledger = Ledger(path, LoaderConfig(cache_dir=cache_dir), QueryCache())
+
+    _, rows = ledger.run_query(BALANCES)
+    rows[0].balance.add_amount(amount.Amount(D(5), "USD"))
+    rows.clear()
+
+    _, again = ledger.run_query(BALANCES)
+    assert again[0].balance.get_currency_units("USD").number == D(1000)
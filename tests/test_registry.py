@@ -0,0 +1,132 @@
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+import streamlit as st
+from finlit.data.loader import LoaderConfig
+from finlit.data.registry import LedgerRegistry, session_ledger
+
+LEDGER = """
+    2023-01-01 open Assets:Cash
+    2023-01-01 open Equity:Opening
+
+    2023-01-02 * "Opening"
+      Assets:Cash  100 USD
+      Equity:Opening
+"""
+
+EDITED = LEDGER.replace("100 USD", "1000 USD")
+
+
+# The accounts are split into files matched by an include glob.
+MAIN = """
+    include "accounts/*.beancount"
+"""
+
+NEW_FILE = """
+    2023-02-01 * "Salary"
+      Assets:Cash  50 USD
+      Equity:Opening
+"""
+
+
+@pytest.fixture()
+def registry(cache_dir: Path) -> Iterator[LedgerRegistry]:
+    registry = LedgerRegistry(LoaderConfig(cache_dir=cache_dir))
+    yield registry
+    registry.clear()
+
+
+def test_acquire_shares_the_snapshot_until_the_file_changes(
+    write_file: Callable[[str, str], Path],
+    registry: LedgerRegistry,
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+
+    first = registry.acquire(path)
+    assert registry.acquire(path) is first
+    assert registry.refcount(first) == 2  # noqa: PLR2004
+
+    write_file("main.beancount", EDITED)
+    second = registry.acquire(path)
+
+    # The old snapshot stays alive for its holders and the new one is current.
+    assert second is not first
+    assert second.fingerprint != first.fingerprint
+    assert registry.refcount(first) == 2  # noqa: PLR2004
+    assert registry.refcount(second) == 1
+
+    registry.release(first)
+    registry.release(first)
+    assert registry.refcount(first) == 0
+    assert registry.acquire(path) is second
+
+    # Going back to the old contents loads it again once it's been dropped.
+    write_file("main.beancount", LEDGER)
+    third = registry.acquire(path)
+    assert third is not first
+    assert third.fingerprint == first.fingerprint
+
+
+def test_released_old_snapshot_is_reused_while_held(
+    write_file: Callable[[str, str], Path],
+    registry: LedgerRegistry,
+) -> None:
+    path = write_file("main.beancount", LEDGER)
+    first = registry.acquire(path)
+    write_file("main.beancount", EDITED)
+    registry.release(registry.acquire(path))
+
+    # The files went back to a snapshot that somebody still holds.
+    write_file("main.beancount", LEDGER)
+    assert registry.acquire(path) is first
+    assert registry.refcount(first) == 2  # noqa: PLR2004
+
+
+def test_session_ledger_swaps_its_lease_on_every_rerun(
+    write_file: Callable[[str, str], Path],
+    registry: LedgerRegistry,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(st, "session_state", {})
+    path = write_file("main.beancount", LEDGER)
+
+    first = session_ledger(path, registry, watch=False)
+    assert registry.refcount(first) == 1
+    assert session_ledger(path, registry, watch=False) is first
+    assert registry.refcount(first) == 1
+
+    write_file("main.beancount", EDITED)
+    second = session_ledger(path, registry, watch=False)
+    assert second is not first
+    assert registry.refcount(first) == 0
+    assert registry.refcount(second) == 1
+
+    # Discarding the session state releases the last lease.
+    st.session_state.clear()
+    assert registry.refcount(second) == 0
+
+
+def test_watcher_reloads_when_a_file_matches_an_include_glob(
+    write_file: Callable[[str, str], Path],
+    registry: LedgerRegistry,
+) -> None:
+    path = write_file("main.beancount", MAIN)
+    (path.parent / "accounts").mkdir()
+    write_file("accounts/a.beancount", LEDGER)
+
+    registry.watch(path, interval=0.01)
+    first = registry.acquire(path)
+    registry.release(first)
+    write_file("accounts/b.beancount", NEW_FILE)
+
+    deadline = time.monotonic() + 10
+    current = first
+    while current is first and time.monotonic() < deadline:
+        time.sleep(0.01)
+        current = registry.acquire(path)
+        registry.release(current)
+
+    assert current is not first
+    assert len(current.entries) == len(first.entries) + 1
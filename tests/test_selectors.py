@@ -0,0 +1,122 @@
+import datetime
+import re
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from beancount.core import data
+from finlit.data.datasets.networth_history import NetworthHistoryDataset
+from finlit.data.ledger import Ledger
+from finlit.data.selectors import PostingSelector
+
+LEDGER = """
+    2023-01-01 commodity ARS
+    2023-01-01 open Assets:Cash
+    2023-01-01 open Assets:Inv
+    2023-01-01 open Assets:Inversiones:ARG:GGAL
+    2023-01-01 open Assets:Inversiones:USA:SPY
+    2023-01-01 open Liabilities:Card
+    2023-01-01 open Expenses:Food
+    2023-01-01 open Equity:Opening
+
+    2023-01-01 price ARS 0.01 USD
+    2023-01-01 price GGAL 400 ARS
+    2023-01-01 price SPY 380 USD
+
+    2023-01-02 * "Opening" #start
+      Assets:Cash  100000 ARS
+      Assets:Cash  1000 USD
+      Equity:Opening
+
+    2023-01-03 * "Buy" #invest #arg
+      Assets:Inversiones:ARG:GGAL  10 GGAL {400 ARS}
+      Assets:Cash  -4000 ARS
+
+    2023-01-04 * "Buy" #invest
+      Assets:Inversiones:USA:SPY  1 SPY {380 USD}
+      Assets:Inv  20 USD
+      Assets:Cash  -400 USD
+
+    2023-01-05 * "Dinner"
+      Expenses:Food  3000 ARS
+      Liabilities:Card
+"""
+
+SELECTORS = [
+    PostingSelector(),
+    PostingSelector(accounts=("Assets:Inversiones",)),
+    PostingSelector(accounts=("Assets:Inv", "Liabilities")),
+    PostingSelector(patterns=("GGAL|SPY$",)),
+    PostingSelector(accounts=("Assets",), patterns=(":USA",)),
+    PostingSelector(tags=("invest", "start")),
+    PostingSelector(currencies=("USD", "GGAL")),
+    PostingSelector(accounts=("Assets",), tags=("invest",), currencies=("USD",)),
+    PostingSelector(accounts=("Assets:Unknown",)),
+]
+
+
+def selects(
+    selector: PostingSelector, entry: data.Transaction, posting: data.Posting
+) -> bool:
+    """
+    Return whether the selector keeps the posting, one posting at a time.
+    """
+    name = posting.account
+    by_prefix = not selector.accounts or any(
+        name == prefix or name.startswith(prefix + ":")
+        for prefix in selector.accounts
+    )
+    by_pattern = not selector.patterns or any(
+        re.search(pattern, name) for pattern in selector.patterns
+    )
+    by_tag = not selector.tags or bool(set(selector.tags) & set(entry.tags))
+    by_currency = (
+        not selector.currencies or posting.units.currency in selector.currencies
+    )
+    return by_prefix and by_pattern and by_tag and by_currency
+
+
+@pytest.fixture()
+def ledger(
+    write_file: Callable[[str, str], Path],
+    load: Callable[..., Ledger],
+) -> Ledger:
+    return load(write_file("main.beancount", LEDGER), cache_dir=None)
+
+
+@pytest.mark.parametrize("selector", SELECTORS, ids=repr)
+def test_masks_select_the_same_postings_as_a_filter(
+    ledger: Ledger, selector: PostingSelector
+) -> None:
+    expected = [
+        selects(selector, entry, posting)
+        for entry in data.filter_txns(ledger.entries)
+        for posting in entry.postings
+    ]
+
+    mask = selector.mask(ledger.postings, ledger.accounts)
+    assert mask.tolist() == expected
+
+
+def test_selectors_value_like_filter_functions(ledger: Ledger) -> None:
+    selectors = {
+        "investments": PostingSelector(accounts=("Assets:Inversiones",)),
+        "usd": PostingSelector(currencies=("USD",)),
+    }
+    functions = {
+        "investments": lambda posting: posting.account.startswith(
+            "Assets:Inversiones:"
+        ),
+        "usd": lambda posting: posting.units.currency == "USD",
+    }
+    dataset = NetworthHistoryDataset(ledger)
+    days = [datetime.date(2023, 1, 1) + datetime.timedelta(days=n) for n in range(8)]
+
+    for name, selector in selectors.items():
+        selected = dataset.value_on(days, filter_func=selector)
+        filtered = dataset.value_on(days, filter_func=functions[name])
+
+        pd.testing.assert_frame_equal(selected, filtered)
+        assert np.any(selected["net_worth"] != 0)